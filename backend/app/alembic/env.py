@@ -1,18 +1,25 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
+import os
+
+from sqlalchemy import engine_from_config, inspect
 from sqlalchemy import pool
 
 from alembic import context
 
 # Importa os modelos
 from models import Base
+from database import SQLALCHEMY_DATABASE_URL
 target_metadata = Base.metadata  # Use o metadata dos seus modelos
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# DATABASE_URL (database.py) tem prioridade sobre o sqlalchemy.url do alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -45,6 +52,15 @@ def run_migrations_online() -> None:
             connection=connection, target_metadata=target_metadata
         )
 
+        # Banco vazio (ex.: Postgres novo): as primeiras revisões supõem as tabelas criadas
+        # pelo create_all da aplicação, então cria o schema atual e marca como head
+        if not inspect(connection).has_table("users"):
+            with context.begin_transaction():
+                target_metadata.create_all(connection)
+                context.get_context().stamp(context.script, "heads")
+            connection.commit()
+            return
+
         with context.begin_transaction():
             context.run_migrations()
 
@@ -0,0 +1,48 @@
+"""Add weekly_leaderboard table
+
+Revision ID: 3b7c1e9a5d42
+Revises: manual_add_challenge_points
+Create Date: 2025-03-10 21:10:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1e9a5d42'
+down_revision: Union[str, None] = 'manual_add_challenge_points'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table('weekly_leaderboard',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('week_start', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('weekly_score', sa.Integer(), nullable=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('profile_image', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_weekly_leaderboard_week_rank', 'weekly_leaderboard',
+                   ['week_start', 'rank'], unique=False)
+    op.create_index(op.f('ix_weekly_leaderboard_id'), 'weekly_leaderboard', ['id'], unique=False)
+
+    # Popula o ranking a partir dos WeeklyPoints já existentes
+    op.execute("""
+        INSERT INTO weekly_leaderboard (week_start, user_id, rank, weekly_score, username, profile_image)
+        SELECT wp.week_start, wp.user_id,
+               RANK() OVER (PARTITION BY wp.week_start ORDER BY wp.checkin_count DESC),
+               wp.checkin_count, u.username, u.profile_image
+        FROM weekly_points wp JOIN users u ON u.id = wp.user_id
+        WHERE wp.checkin_count > 0
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_weekly_leaderboard_id'), table_name='weekly_leaderboard')
+    op.drop_index('idx_weekly_leaderboard_week_rank', table_name='weekly_leaderboard')
+    op.drop_table('weekly_leaderboard')
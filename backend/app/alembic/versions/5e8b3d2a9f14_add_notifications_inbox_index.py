@@ -0,0 +1,43 @@
+"""Add notifications inbox index
+
+Revision ID: 5e8b3d2a9f14
+Revises: d1f5a8c3e672
+Create Date: 2025-03-16 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b3d2a9f14'
+down_revision: Union[str, None] = 'd1f5a8c3e672'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # A tabela de notificações era criada apenas pelo create_all da aplicação
+    if not inspector.has_table('notifications'):
+        op.create_table('notifications',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('related_user_id', sa.Integer(), nullable=True),
+            sa.Column('challenge_id', sa.Integer(), nullable=True),
+            sa.Column('type', sa.String(), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('read', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['challenge_id'], ['challenges.id'], ),
+            sa.ForeignKeyConstraint(['related_user_id'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    op.create_index('idx_notifications_user_read_created', 'notifications',
+                   ['user_id', 'read', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_notifications_user_read_created', table_name='notifications')
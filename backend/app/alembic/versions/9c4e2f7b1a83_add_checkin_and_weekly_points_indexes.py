@@ -0,0 +1,53 @@
+"""Add composite indexes for check-in hot queries
+
+Revision ID: 9c4e2f7b1a83
+Revises: 3b7c1e9a5d42
+Create Date: 2025-03-12 22:40:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e2f7b1a83'
+down_revision: Union[str, None] = '3b7c1e9a5d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHECKIN_INDEXES = {
+    'idx_checkins_user_timestamp': ['user_id', 'timestamp'],
+    'idx_checkins_challenge_user': ['challenge_id', 'user_id'],
+    'idx_checkins_challenge_timestamp': ['challenge_id', 'timestamp'],
+}
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Bancos antigos foram criados antes de checkins.challenge_id existir
+    columns = [col['name'] for col in inspector.get_columns('checkins')]
+    if 'challenge_id' not in columns:
+        op.add_column('checkins', sa.Column('challenge_id', sa.Integer(), nullable=True))
+
+    existing = {ix['name'] for ix in inspector.get_indexes('checkins')}
+    for name, cols in CHECKIN_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'checkins', cols, unique=False)
+
+    # Remove semanas duplicadas antes da restrição de unicidade
+    # (a checagem de consistência recalcula as contagens depois)
+    op.execute("""
+        DELETE FROM weekly_points
+        WHERE id NOT IN (SELECT MIN(id) FROM weekly_points GROUP BY user_id, week_start)
+    """)
+    op.create_index('uq_weekly_points_user_week', 'weekly_points',
+                   ['user_id', 'week_start'], unique=True)
+    op.create_index('idx_weekly_points_week_count', 'weekly_points',
+                   ['week_start', 'checkin_count'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_weekly_points_week_count', table_name='weekly_points')
+    op.drop_index('uq_weekly_points_user_week', table_name='weekly_points')
+    for name in reversed(list(CHECKIN_INDEXES)):
+        op.drop_index(name, table_name='checkins')
@@ -0,0 +1,43 @@
+"""Normalize SQLite keyset timestamps to microsecond precision
+
+Revision ID: a3c5e7f9b2d4
+Revises: b8e4d2f6a9c3
+Create Date: 2025-03-28 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f9b2d4'
+down_revision: Union[str, None] = 'b8e4d2f6a9c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Colunas paginadas por (timestamp, id)
+KEYSET_COLUMNS = (
+    ("checkins", "timestamp"),
+    ("notifications", "created_at"),
+)
+
+def upgrade() -> None:
+    # No SQLite as datas são texto: CURRENT_TIMESTAMP grava 'YYYY-MM-DD HH:MM:SS' e o
+    # SQLAlchemy compara com 'YYYY-MM-DD HH:MM:SS.ffffff'. Com os dois formatos misturados
+    # o cursor não acha as linhas do mesmo segundo e a página se repete; completa os
+    # valores antigos com os microssegundos
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    tables = set(sa.inspect(bind).get_table_names())
+    for table, column in KEYSET_COLUMNS:
+        if table in tables:
+            op.execute(
+                f"UPDATE {table} SET {column} = {column} || '.000000' "
+                f"WHERE length({column}) = 19"
+            )
+
+
+def downgrade() -> None:
+    # Os valores completados continuam válidos no formato antigo
+    pass
@@ -0,0 +1,29 @@
+"""Add data_versions table
+
+Revision ID: a7d3c9e1f2b4
+Revises: 5e8b3d2a9f14
+Create Date: 2025-03-19 21:15:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3c9e1f2b4'
+down_revision: Union[str, None] = '5e8b3d2a9f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Versões usadas nos ETags; recursos sem linha valem versão 0
+    op.create_table('data_versions',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('data_versions')
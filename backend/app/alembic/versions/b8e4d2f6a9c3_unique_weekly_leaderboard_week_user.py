@@ -0,0 +1,36 @@
+"""Unique (week_start, user_id) on weekly_leaderboard
+
+Revision ID: b8e4d2f6a9c3
+Revises: f3a9c2e7b5d1
+Create Date: 2025-03-27 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4d2f6a9c3'
+down_revision: Union[str, None] = 'f3a9c2e7b5d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # O check-in passa a fazer upsert só da linha do usuário (e deslocar os ranks afetados).
+    # Linhas duplicadas por check-ins concorrentes também deixaram ranks errados:
+    # reconstrói o ranking a partir de weekly_points antes da restrição de unicidade
+    op.execute("DELETE FROM weekly_leaderboard")
+    op.execute("""
+        INSERT INTO weekly_leaderboard (week_start, user_id, rank, weekly_score, username, profile_image)
+        SELECT wp.week_start, wp.user_id,
+               RANK() OVER (PARTITION BY wp.week_start ORDER BY wp.checkin_count DESC),
+               wp.checkin_count, u.username, u.profile_image
+        FROM weekly_points wp JOIN users u ON u.id = wp.user_id
+        WHERE wp.checkin_count > 0
+    """)
+    op.create_index('uq_weekly_leaderboard_week_user', 'weekly_leaderboard',
+                   ['week_start', 'user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_weekly_leaderboard_week_user', table_name='weekly_leaderboard')
@@ -0,0 +1,37 @@
+"""Unique week_start on weekly_updates
+
+Revision ID: c4e8f1a2b3d5
+Revises: a7d3c9e1f2b4
+Create Date: 2025-03-21 20:40:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8f1a2b3d5'
+down_revision: Union[str, None] = 'a7d3c9e1f2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # A tabela weekly_updates era criada apenas pelo create_all da aplicação
+    if not inspector.has_table('weekly_updates'):
+        op.create_table('weekly_updates',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('week_start', sa.DateTime(), nullable=False),
+            sa.Column('week_end', sa.DateTime(), nullable=False),
+            sa.Column('processed_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_weekly_updates_id'), 'weekly_updates', ['id'], unique=False)
+
+    # Checkpoint do fechamento semanal: impede fechar a mesma semana duas vezes
+    op.create_index('uq_weekly_updates_week_start', 'weekly_updates', ['week_start'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_weekly_updates_week_start', table_name='weekly_updates')
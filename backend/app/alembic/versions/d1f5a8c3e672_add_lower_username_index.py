@@ -0,0 +1,24 @@
+"""Add functional index on lower(username)
+
+Revision ID: d1f5a8c3e672
+Revises: 9c4e2f7b1a83
+Create Date: 2025-03-14 20:05:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f5a8c3e672'
+down_revision: Union[str, None] = '9c4e2f7b1a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Permite que o filtro func.lower(User.username) use índice
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_username_lower', table_name='users')
@@ -0,0 +1,34 @@
+"""Unique (challenge_id, user_id, period_start) on challenge_points
+
+Revision ID: e2b6d4f8a1c7
+Revises: c4e8f1a2b3d5
+Create Date: 2025-03-23 18:10:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6d4f8a1c7'
+down_revision: Union[str, None] = 'c4e8f1a2b3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # challenge_points passa a ser mantida a cada check-in: uma linha por participante e semana.
+    # Remove períodos duplicados antes da restrição de unicidade
+    # (POST /admin/recalculate-challenge-points reconstrói as contagens a partir dos check-ins)
+    op.execute("""
+        DELETE FROM challenge_points
+        WHERE id NOT IN (SELECT MIN(id) FROM challenge_points GROUP BY challenge_id, user_id, period_start)
+    """)
+    op.drop_index('idx_challenge_points_user_period', table_name='challenge_points')
+    op.create_index('idx_challenge_points_user_period', 'challenge_points',
+                   ['challenge_id', 'user_id', 'period_start'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_challenge_points_user_period', table_name='challenge_points')
+    op.create_index('idx_challenge_points_user_period', 'challenge_points',
+                   ['challenge_id', 'user_id', 'period_start'], unique=False)
@@ -0,0 +1,34 @@
+"""Add backfill_checkpoints table
+
+Revision ID: f3a9c2e7b5d1
+Revises: e2b6d4f8a1c7
+Create Date: 2025-03-25 20:40:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c2e7b5d1'
+down_revision: Union[str, None] = 'e2b6d4f8a1c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Checkpoint dos backfills retomáveis (backfill.py): uma linha por job
+    op.create_table('backfill_checkpoints',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('scope', sa.Text(), nullable=True),
+        sa.Column('last_key', sa.Integer(), nullable=True),
+        sa.Column('processed', sa.Integer(), nullable=False),
+        sa.Column('rows_written', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('backfill_checkpoints')
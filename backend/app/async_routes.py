@@ -0,0 +1,207 @@
+# backend/app/async_routes.py
+"""Rotas quentes em modo assíncrono (DATABASE_ASYNC=1).
+
+Mesmos caminhos e respostas das rotas de routes.py; o main inclui este router antes
+do síncrono, então estas versões têm prioridade. As demais rotas continuam síncronas.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from jose import JWTError
+from . import schemas, crud_async, auth, events, cache, versions
+from .database import get_async_db
+from .pagination import MAX_PAGE_SIZE
+from .routes import (
+    oauth2_scheme,
+    user_payload,
+    points_ranking_cache_key,
+    weekly_ranking_cache_key,
+    overall_ranking_cache_key,
+    overall_ranking_payload,
+    current_week_range,
+    weekly_ranking_payload,
+    challenge_ranking_range,
+    challenge_ranking_payload,
+)
+
+router = APIRouter()
+
+async def cached(key: str, tags, build):
+    """response_cache.get_or_set para builders assíncronos (o acesso ao Redis é curto e com timeout)."""
+    versioned_key, value = cache.response_cache.lookup(key, tags)
+    if value is None:
+        value = await build()
+        cache.response_cache.store(versioned_key, value)
+    return value
+
+async def check_not_modified(request: Request, response: Response, db: AsyncSession, keys, *extra):
+    """Equivalente assíncrono de routes.check_not_modified."""
+    etag, last_modified = await versions.current_async(db, keys, request.url.path, request.url.query, *extra)
+    return versions.not_modified(request, response, etag, last_modified)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    try:
+        token_data = auth.decode_token(token)
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+    if token_data is None or not token_data.username:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+
+    user = await crud_async.get_user_by_username_cached(db, token_data.username)
+    if user is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return user
+
+@router.get("/users/{user_id}/checkins/period/", response_model=list[schemas.CheckIn])
+async def get_checkins_by_period(
+    user_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    request: Request,
+    response: Response,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    not_modified = await check_not_modified(request, response, db, [versions.user_checkins_key(user_id)])
+    if not_modified:
+        return not_modified
+    try:
+        checkins, next_cursor = await crud_async.get_checkins_by_period(db, user_id, start_date, end_date, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return checkins
+
+@router.get("/users/{user_id}/checkins/", response_model=list[schemas.CheckIn])
+async def get_checkins(
+    user_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    not_modified = await check_not_modified(request, response, db, [versions.user_checkins_key(user_id)])
+    if not_modified:
+        return not_modified
+    try:
+        checkins, next_cursor = await crud_async.get_all_checkins_by_user(db, user_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return checkins
+
+@router.get("/users/{user_id}/checkins/week/", response_model=list[schemas.CheckIn])
+async def get_weekly_checkins(
+    request: Request,
+    response: Response,
+    user_id: int,
+    week_offset: int = 0,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Mesmo cálculo de semana da rota síncrona
+    today = datetime.now()
+    start_of_week = today - timedelta(days=today.weekday()+1)
+    start_of_week = start_of_week + timedelta(weeks=week_offset)
+    end_of_week = start_of_week + timedelta(days=6)
+    not_modified = await check_not_modified(
+        request, response, db, [versions.user_checkins_key(user_id)], start_of_week.date()
+    )
+    if not_modified:
+        return not_modified
+    return await crud_async.get_checkins_by_user_between(db, user_id, start_of_week, end_of_week)
+
+@router.get("/ranking/", response_model=list[schemas.User])
+async def get_ranking(request: Request, response: Response, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
+    not_modified = await check_not_modified(request, response, db, [versions.USERS, versions.RANKING])
+    if not_modified:
+        return not_modified
+
+    async def build():
+        return [user_payload(u) for u in await crud_async.get_ranking(db, limit)]
+
+    key, tags = points_ranking_cache_key(limit)
+    return await cached(key, tags, build)
+
+@router.get("/ranking/weekly")
+async def weekly_ranking(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    start_of_week, end_of_week = current_week_range()
+    not_modified = await check_not_modified(request, response, db, [versions.USERS, versions.RANKING], start_of_week)
+    if not_modified:
+        return not_modified
+
+    async def build():
+        leaderboard = await crud_async.get_weekly_leaderboard(db, start_of_week)
+        return weekly_ranking_payload(leaderboard, start_of_week, end_of_week)
+
+    key, tags = weekly_ranking_cache_key(start_of_week)
+    return await cached(key, tags, build)
+
+@router.get("/ranking/overall")
+async def overall_ranking(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    not_modified = await check_not_modified(request, response, db, [versions.USERS, versions.RANKING])
+    if not_modified:
+        return not_modified
+
+    async def build():
+        return overall_ranking_payload(await crud_async.get_overall_ranking(db))
+
+    key, tags = overall_ranking_cache_key()
+    return await cached(key, tags, build)
+
+@router.get("/challenges/{challenge_id}/ranking")
+async def challenge_ranking(
+    challenge_id: int,
+    period: str = "weekly",
+    start: datetime = None,
+    end: datetime = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    participation = await crud_async.get_approved_participation(db, challenge_id, current_user.id)
+    if not participation:
+        raise HTTPException(status_code=403, detail="Você não participa deste desafio")
+
+    challenge = await crud_async.get_challenge(db, challenge_id)
+    if not challenge:
+        raise HTTPException(status_code=404, detail="Desafio não encontrado")
+
+    start, end = challenge_ranking_range(period, start, end)
+    ranked = await crud_async.get_challenge_ranking(db, challenge_id, start, end)
+    return challenge_ranking_payload(ranked, challenge.title)
+
+@router.post("/checkin/", response_model=schemas.CheckIn)
+async def create_checkin(
+    checkin: schemas.CheckInCreate,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if checkin.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Não autorizado")
+    db_checkin = await crud_async.create_checkin(db, checkin)
+    events.publish(events.user_topic(current_user.id), "checkin", {
+        "id": db_checkin.id,
+        "user_id": db_checkin.user_id,
+        "challenge_id": db_checkin.challenge_id,
+        "timestamp": db_checkin.timestamp,
+        "duration": db_checkin.duration,
+        "description": db_checkin.description
+    })
+    return db_checkin
+
+@router.get("/notifications/unread-count")
+async def get_unread_count(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    not_modified = await check_not_modified(
+        request, response, db, [versions.NOTIFICATIONS, versions.user_notifications_key(current_user.id)]
+    )
+    if not_modified:
+        return not_modified
+    return {"unread_count": await crud_async.unread_count(db, current_user.id)}
@@ -0,0 +1,203 @@
+# backend/app/backfill.py
+"""Backfills retomáveis: processam chaves em lotes e gravam um checkpoint a cada lote.
+
+Um job (subclasse de Backfill) informa as próximas chaves (ids inteiros crescentes) e
+como processar um lote delas. run() grava o lote e o checkpoint (tabela
+backfill_checkpoints) no mesmo commit: se o processo cair, a próxima execução continua
+do último lote commitado, sem refazer nem perder trabalho. Um checkpoint gravado com
+outro escopo (ex.: outro --challenge-id) não é retomado: o job recomeça do início.
+"""
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from . import models, crud, cache, scoring, versions
+
+import logging
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+
+# Linhas por INSERT ... ON CONFLICT (6 colunas cada, abaixo do limite de parâmetros do SQLite)
+UPSERT_CHUNK_SIZE = 500
+
+class Backfill(ABC):
+    """Base dos jobs: subclasses definem ``name``, next_keys() e process_batch()."""
+    name = None
+
+    def scope(self) -> dict:
+        """Parâmetros que definem o que o job cobre; ficam gravados no checkpoint."""
+        return {}
+
+    @abstractmethod
+    def next_keys(self, db: Session, after, limit: int) -> list:
+        """Até ``limit`` chaves maiores que ``after`` (None: desde o início), em ordem crescente."""
+
+    @abstractmethod
+    def process_batch(self, db: Session, keys) -> int:
+        """Processa um lote sem commit; retorna quantas linhas foram gravadas."""
+
+    def after_commit(self, keys):
+        """Chamado depois do commit de cada lote (ex.: invalidar caches)."""
+
+def load_checkpoint(db: Session, job: Backfill, restart: bool = False):
+    """Checkpoint do job; é zerado com ``restart`` ou quando o escopo mudou."""
+    scope = json.dumps(job.scope(), sort_keys=True, default=str)
+    checkpoint = db.get(models.BackfillCheckpoint, job.name)
+    if checkpoint is None:
+        checkpoint = models.BackfillCheckpoint(name=job.name)
+        db.add(checkpoint)
+    elif not restart and checkpoint.scope == scope:
+        return checkpoint
+    elif not restart:
+        logger.warning(f"Backfill {job.name}: scope changed ({checkpoint.scope} -> {scope}), starting over")
+
+    now = datetime.utcnow()
+    checkpoint.scope = scope
+    checkpoint.last_key = None
+    checkpoint.processed = 0
+    checkpoint.rows_written = 0
+    checkpoint.started_at = now
+    checkpoint.updated_at = now
+    checkpoint.finished_at = None
+    return checkpoint
+
+def run(db: Session, job: Backfill, batch_size: int = BATCH_SIZE, restart: bool = False, progress=None):
+    """Executa (ou retoma) o job até o fim; ``progress(checkpoint)`` é chamado a cada lote.
+
+    Retorna o checkpoint. Um job já concluído com o mesmo escopo só roda de novo com ``restart``.
+    """
+    checkpoint = load_checkpoint(db, job, restart)
+    db.commit()
+    if checkpoint.finished_at is not None:
+        logger.info(f"Backfill {job.name} already finished at {checkpoint.finished_at}")
+        return checkpoint
+    if checkpoint.last_key is not None:
+        logger.info(f"Backfill {job.name}: resuming after key {checkpoint.last_key} ({checkpoint.processed} done)")
+
+    while True:
+        keys = job.next_keys(db, checkpoint.last_key, batch_size)
+        if not keys:
+            checkpoint.finished_at = checkpoint.updated_at = datetime.utcnow()
+            db.commit()
+            break
+        try:
+            rows = job.process_batch(db, keys)
+            checkpoint.last_key = keys[-1]
+            checkpoint.processed += len(keys)
+            checkpoint.rows_written += rows
+            checkpoint.updated_at = datetime.utcnow()
+            # Lote e checkpoint no mesmo commit
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.error(f"Backfill {job.name}: batch {keys[0]}..{keys[-1]} failed; "
+                         f"checkpoint stays at {checkpoint.last_key}")
+            raise
+        job.after_commit(keys)
+        if progress:
+            progress(checkpoint)
+
+    logger.info(f"Backfill {job.name} finished: {checkpoint.processed} keys, {checkpoint.rows_written} rows")
+    return checkpoint
+
+def upsert_challenge_points(db: Session, rows):
+    """INSERT ... ON CONFLICT (desafio, usuário, semana) DO UPDATE, em blocos."""
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        statement = insert(models.ChallengePoints).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[
+                models.ChallengePoints.challenge_id,
+                models.ChallengePoints.user_id,
+                models.ChallengePoints.period_start,
+            ],
+            set_={
+                "period_end": statement.excluded.period_end,
+                "checkin_count": statement.excluded.checkin_count,
+                "points": statement.excluded.points,
+            }
+        ))
+
+class ChallengePointsBackfill(Backfill):
+    """Reconstrói challenge_points e o progresso/pontos dos participantes aprovados, desafio a desafio.
+
+    ``challenge_id`` limita a um desafio; ``since`` refaz só as semanas a partir da que
+    contém essa data (o progresso dos participantes continua sendo o total do desafio).
+    """
+    name = "challenge_points"
+
+    def __init__(self, challenge_id: int = None, since: datetime = None):
+        self.challenge_id = challenge_id
+        self.since = since
+
+    def scope(self) -> dict:
+        return {"challenge_id": self.challenge_id, "since": self.since.isoformat() if self.since else None}
+
+    def next_keys(self, db: Session, after, limit: int) -> list:
+        query = select(models.Challenge.id).order_by(models.Challenge.id).limit(limit)
+        if after is not None:
+            query = query.where(models.Challenge.id > after)
+        if self.challenge_id is not None:
+            query = query.where(models.Challenge.id == self.challenge_id)
+        return list(db.execute(query).scalars())
+
+    def process_batch(self, db: Session, challenge_ids) -> int:
+        rules = {
+            rule.challenge_id: rule for rule in db.query(models.ChallengeRules).filter(
+                models.ChallengeRules.challenge_id.in_(challenge_ids)
+            )
+        }
+        counts = {}
+        for challenge_id, user_id, start, checkin_count in crud.count_challenges_weekly_checkins(
+            db, challenge_ids, self.since
+        ):
+            counts.setdefault(challenge_id, []).append((user_id, start, checkin_count))
+        rows = []
+        for challenge_id in challenge_ids:
+            rule = scoring.rule_for(rules.get(challenge_id))
+            rows.extend(crud.challenge_period_rows(challenge_id, counts.get(challenge_id, []), rule))
+
+        # Semanas do escopo que não têm mais check-ins
+        points = models.ChallengePoints
+        in_scope = [points.challenge_id.in_(challenge_ids)]
+        if self.since is not None:
+            in_scope.append(points.period_start >= crud.get_week_boundaries(self.since)[0])
+        current = {(row["challenge_id"], row["user_id"], row["period_start"]) for row in rows}
+        stale = [
+            row.id for row in db.execute(
+                select(points.id, points.challenge_id, points.user_id, points.period_start).where(*in_scope)
+            ) if (row.challenge_id, row.user_id, row.period_start) not in current
+        ]
+        if stale:
+            db.execute(delete(points).where(points.id.in_(stale)))
+        if rows:
+            upsert_challenge_points(db, rows)
+
+        # Progresso = total de check-ins do desafio, somado das semanas já gravadas
+        totals = {}
+        for challenge_id, user_id, total in db.execute(
+            select(points.challenge_id, points.user_id, func.sum(points.checkin_count)).where(
+                points.challenge_id.in_(challenge_ids)
+            ).group_by(points.challenge_id, points.user_id)
+        ):
+            totals.setdefault(challenge_id, {})[user_id] = int(total or 0)
+        participants = {}
+        for participant in db.query(models.ChallengeParticipant).filter(
+            models.ChallengeParticipant.challenge_id.in_(challenge_ids),
+            models.ChallengeParticipant.approved == True
+        ):
+            participants.setdefault(participant.challenge_id, []).append(participant)
+        for challenge_id, challenge_participants in participants.items():
+            crud.score_participants(
+                challenge_participants, totals.get(challenge_id, {}), scoring.rule_for(rules.get(challenge_id))
+            )
+
+        versions.bump(db, *[versions.challenge_key(challenge_id) for challenge_id in challenge_ids])
+        return len(rows) + len(stale)
+
+    def after_commit(self, keys):
+        cache.response_cache.invalidate(*[cache.challenge_tag(challenge_id) for challenge_id in keys])
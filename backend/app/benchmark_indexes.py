@@ -0,0 +1,134 @@
+# benchmark_indexes.py
+"""Mede as consultas quentes de check-in antes e depois dos índices compostos.
+
+Uso:
+    python benchmark_indexes.py [--users 200] [--checkins 200000] [--repeat 200] [--db caminho.db]
+
+Sem --db, gera um banco SQLite temporário com dados sintéticos. Para cada consulta
+imprime o EXPLAIN QUERY PLAN e o tempo médio, primeiro sem os índices da revisão
+9c4e2f7b1a83 e depois com eles.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+# Adicione o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Base, CheckIn, WeeklyPoints
+
+# Índices criados pela migração 9c4e2f7b1a83
+HOT_INDEXES = [
+    ix for ix in list(CheckIn.__table__.indexes) + list(WeeklyPoints.__table__.indexes)
+    if ix.name.startswith(("idx_", "uq_"))
+]
+
+# Consultas equivalentes às geradas pelo crud/routes nos caminhos quentes
+HOT_QUERIES = {
+    "update_weekly_points (WeeklyPoints por usuário/semana)":
+        "SELECT * FROM weekly_points WHERE user_id = :user_id AND week_start = :week_start",
+    "get_checkins_by_user_between":
+        "SELECT * FROM checkins WHERE user_id = :user_id AND timestamp >= :start AND timestamp <= :end",
+    "update_challenge_points (contagem no desafio)":
+        "SELECT count(*) FROM checkins WHERE user_id = :user_id AND challenge_id = :challenge_id",
+    "challenge_ranking (check-ins do desafio no período)":
+        "SELECT user_id, count(id) FROM checkins WHERE challenge_id = :challenge_id "
+        "AND timestamp >= :start AND timestamp <= :end GROUP BY user_id",
+    "weekly_ranking (semana com check-ins)":
+        "SELECT * FROM weekly_points WHERE week_start = :week_start AND checkin_count > 0",
+}
+
+def week_start(ts):
+    start = ts - timedelta(days=(ts.weekday() + 1) % 7)
+    return start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def fmt(ts):
+    return ts.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def populate(engine, users, checkins, challenges=20):
+    """Gera check-ins aleatórios em ~3 anos e os WeeklyPoints correspondentes."""
+    random.seed(42)
+    origin = datetime(2022, 1, 1)
+    span = 3 * 365 * 24 * 3600
+    rows = []
+    weekly = {}
+    for i in range(checkins):
+        user_id = random.randint(1, users)
+        ts = origin + timedelta(seconds=random.randint(0, span))
+        challenge_id = random.randint(1, challenges) if random.random() < 0.5 else None
+        rows.append({"user_id": user_id, "challenge_id": challenge_id, "timestamp": fmt(ts)})
+        key = (user_id, fmt(week_start(ts)))
+        weekly[key] = weekly.get(key, 0) + 1
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username) VALUES (:id, :username)"),
+                     [{"id": i, "username": f"user{i}"} for i in range(1, users + 1)])
+        conn.execute(text("INSERT INTO checkins (user_id, challenge_id, timestamp) "
+                          "VALUES (:user_id, :challenge_id, :timestamp)"), rows)
+        conn.execute(text("INSERT INTO weekly_points (user_id, week_start, week_end, checkin_count, points) "
+                          "VALUES (:user_id, :week_start, :week_start, :count, 0)"),
+                     [{"user_id": u, "week_start": w, "count": c} for (u, w), c in weekly.items()])
+    return origin, span
+
+def sample_params(users, origin, span, challenges=20):
+    start = origin + timedelta(seconds=random.randint(0, span))
+    end = start + timedelta(days=7)
+    return {
+        "user_id": random.randint(1, users),
+        "challenge_id": random.randint(1, challenges),
+        "week_start": fmt(week_start(start)),
+        "start": fmt(start),
+        "end": fmt(end),
+    }
+
+def run(engine, label, users, origin, span, repeat):
+    print(f"\n=== {label} ===")
+    random.seed(7)
+    params = [sample_params(users, origin, span) for _ in range(repeat)]
+    with engine.connect() as conn:
+        for name, sql in HOT_QUERIES.items():
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params[0]).fetchall()
+            began = time.perf_counter()
+            for p in params:
+                conn.execute(text(sql), p).fetchall()
+            elapsed = (time.perf_counter() - began) / repeat * 1000
+            print(f"\n{name}: {elapsed:.3f} ms/consulta")
+            for row in plan:
+                print(f"    {row[-1]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--checkins", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--db", help="arquivo SQLite a usar (é recriado)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+
+    print(f"Gerando {args.checkins} check-ins para {args.users} usuários em {path}")
+    origin, span = populate(engine, args.users, args.checkins)
+
+    for index in HOT_INDEXES:
+        index.drop(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    run(engine, "Antes da migração (sem índices compostos)", args.users, origin, span, args.repeat)
+
+    for index in HOT_INDEXES:
+        index.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    run(engine, "Depois da migração (índices compostos)", args.users, origin, span, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmark_scoring.py
+"""Mede a pontuação em lote do scoring.py (laço em Python x passada NumPy).
+
+Uso:
+    python benchmark_scoring.py [--rows 1000000] [--repeat 3] [--seed 42]
+
+Gera ``--rows`` linhas (usuário, período) com contagens de check-ins de 0 a 7 e pontua
+em dois cenários: todas as linhas com a regra semanal padrão (recálculo do ranking) e
+cada linha com a regra do seu desafio (recálculo dos desafios). Para cada cenário
+imprime o melhor tempo e linhas/s de cada implementação e confere que os resultados
+são idênticos. Sem NumPy instalado só o laço em Python é medido.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from app import scoring
+from app.scoring import WEEKLY_RULE, ScoringRule
+
+# Regras típicas de desafios (limiar, pontos mínimos, unidade extra, pontos extras)
+CHALLENGE_RULES = [
+    ScoringRule(3, 10, 1, 3),
+    ScoringRule(2, 5, 2, 4),
+    ScoringRule(4, 15, 1, 5),
+    ScoringRule(1, 2, 1, 1),
+]
+
+def best_of(repeat, func, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run(label, counts, params, repeat):
+    print(f"\n=== {label} ({len(counts)} linhas) ===")
+    elapsed, expected = best_of(repeat, scoring.score_python, counts, *params)
+    print(f"python: {elapsed * 1000:.1f} ms  {len(counts) / elapsed:,.0f} linhas/s")
+    if scoring.np is None:
+        print("numpy: não instalado")
+        return
+    elapsed_np, result = best_of(repeat, lambda: scoring.score_array(counts, *params).tolist())
+    print(f"numpy:  {elapsed_np * 1000:.1f} ms  {len(counts) / elapsed_np:,.0f} linhas/s  "
+          f"({elapsed / elapsed_np:.1f}x)")
+    if result != expected:
+        mismatches = sum(1 for a, b in zip(result, expected) if a != b)
+        raise SystemExit(f"resultados divergentes em {mismatches} linhas")
+    print("resultados idênticos")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    counts = [rng.randint(0, 7) for _ in range(args.rows)]
+    run("Regra semanal padrão", counts, WEEKLY_RULE, args.repeat)
+
+    # Uma regra por linha, como no recálculo de vários desafios de uma vez
+    rules = [rng.choice(CHALLENGE_RULES) for _ in range(args.rows)]
+    params = [list(column) for column in zip(*rules)]
+    run("Regra por desafio", counts, params, args.repeat)
+
+if __name__ == "__main__":
+    main()
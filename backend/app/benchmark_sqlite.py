@@ -0,0 +1,133 @@
+# benchmark_sqlite.py
+"""Mede escrita e leitura concorrentes no SQLite com e sem os PRAGMAs do database.py.
+
+Uso:
+    python benchmark_sqlite.py [--writers 4] [--readers 8] [--seconds 10] [--profile production]
+
+Para cada configuração cria um banco temporário novo, sobe threads escritoras que
+repetem o padrão de um check-in (INSERT em checkins + UPDATE em weekly_points/users,
+em dois commits) e threads leitoras que consultam o ranking semanal e o histórico.
+Imprime check-ins/s, latência de leitura (p50/p95/máx) e quantas operações falharam
+com "database is locked".
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# Adicione o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Base
+from database import create_db_engine, sqlite_settings
+
+USERS = 200
+
+# Comportamento padrão do SQLite: journal DELETE, synchronous=FULL, sem busy_timeout extra
+BASELINE = {}
+
+READ_QUERIES = [
+    "SELECT u.id, u.username, wp.checkin_count FROM weekly_points wp JOIN users u ON u.id = wp.user_id "
+    "WHERE wp.week_start = :week_start AND wp.checkin_count > 0 ORDER BY wp.checkin_count DESC",
+    "SELECT * FROM checkins WHERE user_id = :user_id ORDER BY timestamp DESC, id DESC LIMIT 10",
+]
+
+def week_start(ts):
+    start = ts - timedelta(days=(ts.weekday() + 1) % 7)
+    return start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def fmt(ts):
+    return ts.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def prepare(pragmas):
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    engine = create_db_engine(f"sqlite:///{path}", sqlite_pragmas=pragmas, pool_size=32, max_overflow=0)
+    Base.metadata.create_all(engine)
+    current_week = fmt(week_start(datetime.utcnow()))
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, points) VALUES (:id, :username, 0)"),
+                     [{"id": i, "username": f"user{i}"} for i in range(1, USERS + 1)])
+        conn.execute(text("INSERT INTO weekly_points (user_id, week_start, week_end, checkin_count, points) "
+                          "VALUES (:user_id, :week_start, :week_start, 0, 0)"),
+                     [{"user_id": i, "week_start": current_week} for i in range(1, USERS + 1)])
+    return engine, current_week
+
+def writer(engine, current_week, stop, stats):
+    rng = random.Random()
+    while not stop.is_set():
+        user_id = rng.randint(1, USERS)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO checkins (user_id, timestamp) VALUES (:user_id, :timestamp)"),
+                             {"user_id": user_id, "timestamp": fmt(datetime.utcnow())})
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE weekly_points SET checkin_count = checkin_count + 1 "
+                                  "WHERE user_id = :user_id AND week_start = :week_start"),
+                             {"user_id": user_id, "week_start": current_week})
+                conn.execute(text("UPDATE users SET points = points + 1 WHERE id = :user_id"),
+                             {"user_id": user_id})
+            stats["writes"] += 1
+        except OperationalError:
+            stats["write_errors"] += 1
+
+def reader(engine, current_week, stop, stats, latencies):
+    rng = random.Random()
+    while not stop.is_set():
+        sql = rng.choice(READ_QUERIES)
+        began = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(text(sql), {"week_start": current_week, "user_id": rng.randint(1, USERS)}).fetchall()
+            latencies.append(time.perf_counter() - began)
+        except OperationalError:
+            stats["read_errors"] += 1
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run(label, pragmas, args):
+    engine, current_week = prepare(pragmas)
+    stop = threading.Event()
+    stats = {"writes": 0, "write_errors": 0, "read_errors": 0}
+    latencies = []
+    threads = [threading.Thread(target=writer, args=(engine, current_week, stop, stats)) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(engine, current_week, stop, stats, latencies))
+                for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    print(f"\n=== {label} ===")
+    print(f"PRAGMAs: {pragmas or 'padrão do SQLite'}")
+    print(f"escrita: {stats['writes'] / args.seconds:.1f} check-ins/s ({stats['write_errors']} com erro)")
+    print(f"leitura: {len(latencies) / args.seconds:.1f} consultas/s  "
+          f"p50 {percentile(latencies, 0.50) * 1000:.2f} ms  p95 {percentile(latencies, 0.95) * 1000:.2f} ms  "
+          f"máx {max(latencies, default=0) * 1000:.2f} ms ({stats['read_errors']} com erro)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profile", default="production", help="perfil de database.SQLITE_PROFILES")
+    args = parser.parse_args()
+
+    run("Sem PRAGMAs (journal DELETE, synchronous FULL)", BASELINE, args)
+    run(f"Perfil {args.profile}", sqlite_settings(args.profile), args)
+
+if __name__ == "__main__":
+    main()
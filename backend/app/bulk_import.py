@@ -0,0 +1,192 @@
+# backend/app/bulk_import.py
+"""Importação em lote de check-ins (NDJSON ou CSV), para migrar históricos de outros apps.
+
+As linhas são validadas por lote (usuários e desafios resolvidos com uma consulta por
+lote) e inseridas com executemany. A pontuação é refeita uma única vez no final, para
+cada (usuário, semana) e (usuário, desafio) distintos, e tudo entra em um único commit:
+uma falha no meio não deixa check-ins sem pontuação.
+
+Campos por linha (os mesmos do export de check-ins; ``id`` é ignorado):
+    user_id ou username, timestamp (ISO 8601; com fuso é convertido para UTC),
+    duration, description, challenge_id (opcional; exige participação aprovada)
+"""
+import csv
+import json
+import time
+from datetime import datetime, timezone
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from . import models, crud, cache, versions
+
+BATCH_SIZE = 1000
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Quantos erros de linha voltam no relatório
+MAX_REPORTED_ERRORS = 100
+
+def iter_records(lines, fmt: str):
+    """(número da linha, dict) a partir de um iterável de linhas de texto."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, None
+            continue
+        yield line_no, record
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def parse_timestamp(value) -> datetime:
+    timestamp = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if timestamp.tzinfo is not None:
+        # O banco guarda UTC sem fuso (como datetime.utcnow() no crud)
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def parse_record(record: dict) -> dict:
+    """Converte e valida os campos de uma linha; levanta ValueError com o motivo."""
+    if not isinstance(record, dict):
+        raise ValueError("linha inválida")
+    row = {}
+    if not _blank(record.get("user_id")):
+        row["user_id"] = int(record["user_id"])
+    elif not _blank(record.get("username")):
+        row["username"] = str(record["username"]).strip()
+    else:
+        raise ValueError("informe user_id ou username")
+    if _blank(record.get("timestamp")):
+        raise ValueError("timestamp obrigatório")
+    row["timestamp"] = parse_timestamp(record["timestamp"])
+    row["duration"] = None if _blank(record.get("duration")) else float(record["duration"])
+    row["description"] = None if _blank(record.get("description")) else str(record["description"])
+    row["challenge_id"] = None if _blank(record.get("challenge_id")) else int(record["challenge_id"])
+    return row
+
+class ImportReport:
+    def __init__(self):
+        self.received = 0
+        self.imported = 0
+        self.errors = []
+        self.rejected = 0
+        self.weeks_rescored = 0
+        self.challenges_rescored = 0
+        self.started = time.perf_counter()
+
+    def reject(self, line_no: int, reason: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": reason})
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "weeks_rescored": self.weeks_rescored,
+            "challenges_rescored": self.challenges_rescored,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.imported / elapsed, 1) if elapsed else None,
+        }
+
+def resolve_batch(db: Session, batch, report: ImportReport):
+    """Resolve usuários e participações do lote com uma consulta cada; devolve as linhas válidas."""
+    usernames = {row["username"].lower() for _, row in batch if "username" in row}
+    by_username = {}
+    if usernames:
+        by_username = dict(db.execute(
+            select(func.lower(models.User.username), models.User.id).where(
+                func.lower(models.User.username).in_(usernames)
+            )
+        ).all())
+    for _, row in batch:
+        if "username" in row:
+            row["user_id"] = by_username.get(row.pop("username").lower())
+
+    user_ids = {row["user_id"] for _, row in batch if row["user_id"] is not None}
+    known_users = set(db.execute(select(models.User.id).where(models.User.id.in_(user_ids))).scalars())
+
+    challenge_ids = {row["challenge_id"] for _, row in batch if row["challenge_id"] is not None}
+    approved = set()
+    if challenge_ids:
+        approved = set(db.execute(
+            select(models.ChallengeParticipant.user_id, models.ChallengeParticipant.challenge_id).where(
+                models.ChallengeParticipant.challenge_id.in_(challenge_ids),
+                models.ChallengeParticipant.user_id.in_(user_ids),
+                models.ChallengeParticipant.approved == True
+            )
+        ).all())
+
+    valid = []
+    for line_no, row in batch:
+        if row["user_id"] not in known_users:
+            report.reject(line_no, "usuário não encontrado")
+        elif row["challenge_id"] is not None and (row["user_id"], row["challenge_id"]) not in approved:
+            report.reject(line_no, "usuário não participa do desafio (ou não foi aprovado)")
+        else:
+            valid.append(row)
+    return valid
+
+def import_checkins(db: Session, lines, fmt: str, batch_size: int = BATCH_SIZE, progress=None) -> ImportReport:
+    """Importa os check-ins de ``lines`` e refaz a pontuação afetada; ``progress(report)`` é chamado a cada lote."""
+    report = ImportReport()
+    weeks = set()
+    challenges = set()
+
+    def flush(batch):
+        rows = resolve_batch(db, batch, report)
+        if rows:
+            # Insert do Core: executemany direto, sem o agrupamento por colunas do bulk insert do ORM
+            db.execute(insert(models.CheckIn.__table__), rows)
+        for row in rows:
+            weeks.add((row["user_id"], crud.get_week_boundaries(row["timestamp"])[0]))
+            if row["challenge_id"] is not None:
+                challenges.add((row["user_id"], row["challenge_id"]))
+        report.imported += len(rows)
+        if progress:
+            progress(report)
+
+    try:
+        batch = []
+        for line_no, record in iter_records(lines, fmt):
+            report.received += 1
+            try:
+                batch.append((line_no, parse_record(record)))
+            except (TypeError, ValueError) as e:
+                report.reject(line_no, str(e) or "valor inválido")
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        report.weeks_rescored = len(weeks)
+        crud.rescore_weeks(db, weeks)
+        report.challenges_rescored = len({challenge_id for _, challenge_id in challenges})
+        crud.rescore_challenge_participants(db, challenges)
+        versions.bump(db, *{versions.user_checkins_key(user_id) for user_id, _ in weeks})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if weeks:
+        crud.invalidate_ranking_cache(all_weeks=True)
+    if challenges:
+        cache.response_cache.invalidate(*{cache.challenge_tag(challenge_id) for _, challenge_id in challenges})
+    return report
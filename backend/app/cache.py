@@ -0,0 +1,183 @@
+# backend/app/cache.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# Redis do cache de respostas; vazio = só a memória de cada processo
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://redis:6379/1")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+# Depois de uma falha no Redis, tempo usando só a memória antes de tentar de novo
+REDIS_RETRY_SECONDS = 30
+
+ENTRY_PREFIX = "resp:"
+TAG_PREFIX = "tag:"
+
+# Tags das respostas em cache; as escritas invalidam as tags afetadas
+USERS_TAG = "users"                    # username/foto aparecem em todos os rankings
+POINTS_RANKING_TAG = "ranking:points"  # /ranking/ (User.points)
+OVERALL_RANKING_TAG = "ranking:overall"
+WEEKS_RANKING_TAG = "ranking:weeks"    # todas as semanas de uma vez (recálculos)
+CHALLENGES_TAG = "challenges"          # todos os desafios de uma vez (recálculos)
+
+def week_tag(week_start) -> str:
+    return f"ranking:week:{week_start:%Y-%m-%d}"
+
+def challenge_tag(challenge_id: int) -> str:
+    return f"challenge:{challenge_id}"
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} não é serializável")
+
+class TTLCache:
+    """Cache LRU em memória com expiração por item, seguro entre threads.
+
+    Usado para dados pequenos e quentes do processo (ex.: username -> id do usuário).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemoryBackend:
+    """Entradas e versões de tags na memória do processo."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.entries = TTLCache(maxsize=maxsize, ttl=RESPONSE_CACHE_TTL_SECONDS)
+        self.versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl: float):
+        self.entries.set(key, value, ttl)
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return [self.versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self.versions[tag] = self.versions.get(tag, 0) + 1
+
+class RedisBackend:
+    """Entradas com expiração no Redis e uma chave-contador (INCR) por tag."""
+
+    def __init__(self, url: str):
+        import redis
+        self._redis = redis.Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=0.5)
+
+    def get(self, key):
+        return self._redis.get(ENTRY_PREFIX + key)
+
+    def set(self, key, value, ttl: float):
+        self._redis.set(ENTRY_PREFIX + key, value, ex=max(1, int(ttl)))
+
+    def tag_versions(self, tags):
+        return [int(v or 0) for v in self._redis.mget([TAG_PREFIX + tag for tag in tags])]
+
+    def bump(self, tags):
+        pipe = self._redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(TAG_PREFIX + tag)
+        pipe.execute()
+
+class ResponseCache:
+    """Cache de respostas JSON com invalidação por tag.
+
+    Cada entrada é gravada sob uma chave que inclui a versão atual das suas tags;
+    invalidar uma tag só incrementa o contador, e as entradas antigas deixam de ser
+    encontradas (e expiram pelo TTL). Sem Redis, ou com ele fora do ar, usa a memória
+    do processo — o TTL limita o quanto um worker pode ficar desatualizado.
+    """
+
+    def __init__(self, redis_url: str = RESPONSE_CACHE_REDIS_URL, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.memory = MemoryBackend()
+        self.redis = RedisBackend(redis_url) if redis_url else None
+        self._redis_down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _call(self, method: str, *args):
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return getattr(self.redis, method)(*args)
+            except Exception as e:
+                logger.warning(f"Cache Redis indisponível ({e}); usando memória por {REDIS_RETRY_SECONDS}s")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return getattr(self.memory, method)(*args)
+
+    def tag_versions(self, tags):
+        return self._call("tag_versions", list(tags))
+
+    def invalidate(self, *tags):
+        if tags:
+            self._call("bump", list(tags))
+
+    def lookup(self, key: str, tags):
+        """Retorna (chave versionada, valor ou None)."""
+        versioned_key = f"{key}|{'.'.join(map(str, self.tag_versions(tags)))}"
+        raw = self._call("get", versioned_key)
+        if raw is None:
+            self.misses += 1
+            return versioned_key, None
+        self.hits += 1
+        return versioned_key, json.loads(raw)
+
+    def store(self, versioned_key: str, value, ttl: float = None):
+        raw = json.dumps(value, default=_json_default, ensure_ascii=False)
+        self._call("set", versioned_key, raw, self.ttl if ttl is None else ttl)
+
+    def get_or_set(self, key: str, tags, build, ttl: float = None):
+        """Devolve a resposta em cache ou chama build() e guarda o resultado (precisa ser JSON)."""
+        versioned_key, value = self.lookup(key, tags)
+        if value is None:
+            value = build()
+            self.store(versioned_key, value, ttl)
+        return value
+
+response_cache = ResponseCache()
@@ -2,10 +2,19 @@
 from celery.schedules import crontab
 
 beat_schedule = {
-    # 'update-weekly-ranking-every-sunday': {
-    #     'task': 'backend.app.tasks.update_weekly_ranking',
-    #     'schedule': crontab(hour=1, minute=0, day_of_week=0),
-    # },
+    # Domingo 01:00 (UTC): fecha a semana que terminou no sábado e as que ficaram para trás
+    'update-weekly-ranking-every-sunday': {
+        'task': 'tasks.update_weekly_ranking',
+        'schedule': crontab(hour=1, minute=0, day_of_week=0),
+    },
+    'check-points-consistency-every-night': {
+        'task': 'tasks.check_points_consistency',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'prune-read-notifications-every-night': {
+        'task': 'tasks.prune_notifications',
+        'schedule': crontab(hour=4, minute=0),
+    },
 }
 
 broker_url = 'redis://redis:6379/0'
@@ -1,7 +1,13 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
-from . import models, schemas, config
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import and_, bindparam, delete, func, insert, literal, select, tuple_, type_coerce, update, DateTime, Integer
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import os
+from . import models, schemas, config, auth, cache, versions, scoring
+from .pagination import keyset_page
 
 import logging
 logging.basicConfig(level=logging.DEBUG)
@@ -13,172 +19,543 @@ def get_all_users(db: Session):
 def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     db_user = models.User(username=user.username, password_hash=hashed_password, is_admin=user.is_admin)
     db.add(db_user)
+    versions.bump(db, versions.USERS)
     db.commit()
+    cache.response_cache.invalidate(cache.USERS_TAG)
     db.refresh(db_user)
     return db_user
 
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(func.lower(models.User.username) == username.lower()).first()
 
+def get_user_by_username_cached(db: Session, username: str):
+    """Como get_user_by_username, mas resolve o id pelo cache e busca pela chave primária."""
+    key = username.lower()
+    user_id = auth.user_id_cache.get(key)
+    if user_id is not None:
+        user = db.get(models.User, user_id)
+        if user is not None and user.username.lower() == key:
+            return user
+        auth.user_id_cache.delete(key)
+    user = get_user_by_username(db, username)
+    if user is not None:
+        auth.user_id_cache.set(key, user.id)
+    return user
+
 def get_week_boundaries(timestamp: datetime):
-    """Get the Sunday (start) and Saturday (end) of the week for a given timestamp."""
+    """Get the Sunday (start) and Saturday (end) of the week for a given timestamp.
+
+    Aware timestamps (CheckIn.timestamp read back from Postgres) are converted to
+    naive UTC first, so the keys compare equal to the naive week_start columns.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
     start = timestamp - timedelta(days=(timestamp.weekday() + 1) % 7)  # Move to previous Sunday
     start = start.replace(hour=0, minute=0, second=0, microsecond=0)
     end = start + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999)  # Saturday end
     return start, end
 
-def calculate_weekly_points(checkin_count: int) -> int:
-    """Calculate points based on weekly check-ins."""
-    if checkin_count < config.MIN_TRAINING_DAYS:
-        return 0
-    return 10 + 3 * (checkin_count - config.MIN_TRAINING_DAYS)
+def invalidate_ranking_cache(*timestamps, all_weeks: bool = False):
+    """Descarta as respostas de ranking em cache depois de uma mudança de pontos já commitada."""
+    tags = [cache.POINTS_RANKING_TAG, cache.OVERALL_RANKING_TAG]
+    if all_weeks:
+        tags.append(cache.WEEKS_RANKING_TAG)
+    tags += [cache.week_tag(get_week_boundaries(ts)[0]) for ts in timestamps]
+    cache.response_cache.invalidate(*tags)
 
-def recalculate_all_points(db: Session):
-    """Recalculate WeeklyPoints and total points for all users based on existing check-ins."""
-    logger.debug("Starting recalculation of all points")
-    
-    # Limpa os registros existentes de WeeklyPoints
-    db.query(models.WeeklyPoints).delete()
-    db.commit()
-    logger.debug("Cleared existing WeeklyPoints")
+def week_start_expr(db: Session, column):
+    """Expressão SQL que leva um timestamp ao domingo 00:00 da sua semana."""
+    if db.get_bind().dialect.name == "postgresql":
+        if getattr(column.type, "timezone", False):
+            # timestamptz -> timestamp em UTC: a semana sai sem fuso, como as chaves de
+            # get_week_boundaries e as colunas week_start/period_start
+            column = func.timezone("UTC", column, type_=DateTime)
+        # date_trunc('week') começa na segunda; desloca um dia para cair no domingo
+        expr = func.date_trunc("week", column + timedelta(days=1)) - timedelta(days=1)
+    else:
+        # strftime('%w') devolve 0 para domingo
+        expr = func.datetime(column, "start of day", func.printf("-%d days", func.strftime("%w", column)))
+    return type_coerce(expr, DateTime)
 
-    # Obtém todos os check-ins ordenados por timestamp
-    checkins = db.query(models.CheckIn).order_by(models.CheckIn.timestamp.asc()).all()
-    logger.debug(f"Total check-ins found: {len(checkins)}")
-    
-    # Processa check-ins por semana e usuário
-    weekly_counts = {}  # (user_id, week_start) -> checkin_count
-    for i, checkin in enumerate(checkins):
-        week_start, week_end = get_week_boundaries(checkin.timestamp)
-        key = (checkin.user_id, week_start)
-        weekly_counts[key] = weekly_counts.get(key, 0) + 1
-        logger.debug(f"Checkin {i+1}/{len(checkins)}: user_id={checkin.user_id}, timestamp={checkin.timestamp}, week_start={week_start}, count={weekly_counts[key]}")
-    
-    logger.debug(f"Weekly counts: {weekly_counts}")
-    
-    # Cria WeeklyPoints para cada entrada
-    for (user_id, week_start), checkin_count in weekly_counts.items():
-        week_end = week_start + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999)
-        weekly_points = models.WeeklyPoints(
-            user_id=user_id,
-            week_start=week_start,
-            week_end=week_end,
-            checkin_count=checkin_count,
-            points=calculate_weekly_points(checkin_count)
+def count_weekly_checkins(db: Session, since: datetime = None, user_ids=None):
+    """Conta check-ins por (usuário, semana) com um único GROUP BY."""
+    week_start = week_start_expr(db, models.CheckIn.timestamp).label("week_start")
+    query = db.query(
+        models.CheckIn.user_id,
+        week_start,
+        func.count(models.CheckIn.id)
+    ).filter(models.CheckIn.user_id.isnot(None))
+    if since:
+        query = query.filter(models.CheckIn.timestamp >= since)
+    if user_ids is not None:
+        query = query.filter(models.CheckIn.user_id.in_(user_ids))
+    return query.group_by(models.CheckIn.user_id, week_start).all()
+
+def weekly_points_total():
+    """Subconsulta correlacionada com a soma de WeeklyPoints.points de cada usuário."""
+    return select(func.coalesce(func.sum(models.WeeklyPoints.points), 0)).where(
+        models.WeeklyPoints.user_id == models.User.id
+    ).scalar_subquery()
+
+def refresh_user_points(db: Session, user_ids=None):
+    """Recalcula User.points a partir de WeeklyPoints em um único UPDATE."""
+    total_points = weekly_points_total()
+    query = db.query(models.User)
+    if user_ids is not None:
+        query = query.filter(models.User.id.in_(user_ids))
+    query.update({models.User.points: total_points}, synchronize_session=False)
+
+def weekly_leaderboard_statements(week_start: datetime = None, since: datetime = None):
+    """DELETE + INSERT ... SELECT that rebuild the leaderboard for one week (or every week from ``since``).
+
+    Ranks are computed in SQL with RANK(), so ties share a position (1, 1, 3).
+    Plain Core statements, so the sync and async sessions can both run them.
+    """
+    stale = delete(models.WeeklyLeaderboard)
+    source = select(
+        models.WeeklyPoints.week_start,
+        models.WeeklyPoints.user_id,
+        func.rank().over(
+            partition_by=models.WeeklyPoints.week_start,
+            order_by=models.WeeklyPoints.checkin_count.desc()
+        ),
+        models.WeeklyPoints.checkin_count,
+        models.User.username,
+        models.User.profile_image
+    ).join(models.User, models.User.id == models.WeeklyPoints.user_id).where(
+        models.WeeklyPoints.checkin_count > 0
+    )
+    if week_start is not None:
+        stale = stale.where(models.WeeklyLeaderboard.week_start == week_start)
+        source = source.where(models.WeeklyPoints.week_start == week_start)
+    elif since is not None:
+        stale = stale.where(models.WeeklyLeaderboard.week_start >= since)
+        source = source.where(models.WeeklyPoints.week_start >= since)
+    return [
+        stale,
+        insert(models.WeeklyLeaderboard).from_select(
+            ["week_start", "user_id", "rank", "weekly_score", "username", "profile_image"],
+            source
+        ),
+    ]
+
+def weekly_count_statement(dialect_name: str, user_id: int, week_start: datetime, week_end: datetime, delta: int):
+    """Atomic ``checkin_count + delta`` on one user's week, returning (id, new count, old points).
+
+    +1 is an INSERT ... ON CONFLICT DO UPDATE (creates the week at 1); -1 is an
+    UPDATE of an existing week with a positive count, so a missing week returns no
+    row and the caller skips it. The row lock taken here serializes the writers of
+    the same (week, user) until commit; other users and weeks are not blocked.
+    """
+    table = models.WeeklyPoints.__table__
+    if delta > 0:
+        dialect_insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+        statement = dialect_insert(table).values(
+            user_id=user_id, week_start=week_start, week_end=week_end, checkin_count=delta, points=0
+        ).on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.week_start],
+            set_={"checkin_count": func.coalesce(table.c.checkin_count, 0) + delta}
         )
-        db.add(weekly_points)
-        logger.debug(f"Added WeeklyPoints: user_id={user_id}, week_start={week_start}, checkin_count={checkin_count}, points={weekly_points.points}")
-        db.flush()
-
-    # Atualiza os pontos totais dos usuários
-    users = db.query(models.User).all()
-    for user in users:
-        total_points = db.query(func.sum(models.WeeklyPoints.points)).filter(
-            models.WeeklyPoints.user_id == user.id
-        ).scalar() or 0
-        user.points = total_points
-        logger.debug(f"Updated user {user.id} ({user.username}) points to {total_points}")
-    
+    else:
+        statement = update(table).where(
+            table.c.user_id == user_id,
+            table.c.week_start == week_start,
+            table.c.checkin_count > 0
+        ).values(checkin_count=table.c.checkin_count + delta)
+    return statement.returning(table.c.id, table.c.checkin_count, table.c.points)
+
+def weekly_points_delta_statements(dialect_name: str, week_start: datetime, user_id: int, row, delta: int):
+    """Statements that follow weekly_count_statement: the week's points, User.points and the leaderboard."""
+    new_count = row.checkin_count
+    old_count = new_count - delta
+    old_points = row.points or 0
+    new_points = scoring.score(new_count)
+    statements = []
+    if new_points != old_points:
+        statements += [
+            update(models.WeeklyPoints.__table__).where(
+                models.WeeklyPoints.__table__.c.id == row.id
+            ).values(points=new_points),
+            update(models.User.__table__).where(models.User.__table__.c.id == user_id).values(
+                points=func.coalesce(models.User.__table__.c.points, 0) + (new_points - old_points)
+            ),
+        ]
+    return statements + weekly_leaderboard_delta_statements(dialect_name, week_start, user_id, old_count, new_count)
+
+def weekly_leaderboard_delta_statements(dialect_name: str, week_start: datetime, user_id: int,
+                                        old_count: int, new_count: int):
+    """Statements that apply one user's check-in count change to a week's leaderboard.
+
+    With RANK() a user's rank is 1 + the number of users with a strictly higher
+    count, so going from ``old_count`` to ``new_count`` only shifts the rows whose
+    count lies between the two; the user's own row is upserted (deleted at 0).
+    Each statement is atomic, but the week is not locked as a whole: concurrent
+    writers of the same week can leave a rank off by one, which the nightly
+    check_points_consistency rebuilds.
+    """
+    if old_count == new_count:
+        return []
+    board = models.WeeklyLeaderboard.__table__
+    low, high = sorted((old_count, new_count))
+    statements = [
+        update(board).where(
+            board.c.week_start == week_start,
+            board.c.user_id != user_id,
+            board.c.weekly_score >= low,
+            board.c.weekly_score < high
+        ).values(rank=board.c.rank + (1 if new_count > old_count else -1))
+    ]
+    if new_count <= 0:
+        statements.append(delete(board).where(board.c.week_start == week_start, board.c.user_id == user_id))
+        return statements
+
+    higher = select(func.count()).select_from(board).where(
+        board.c.week_start == week_start,
+        board.c.user_id != user_id,
+        board.c.weekly_score > new_count
+    ).scalar_subquery()
+    users = models.User.__table__
+    dialect_insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+    upsert = dialect_insert(board).from_select(
+        ["week_start", "user_id", "rank", "weekly_score", "username", "profile_image"],
+        select(
+            literal(week_start, DateTime), literal(user_id, Integer), higher + 1,
+            literal(new_count, Integer), users.c.username, users.c.profile_image
+        ).where(users.c.id == user_id)
+    )
+    statements.append(upsert.on_conflict_do_update(
+        index_elements=[board.c.week_start, board.c.user_id],
+        set_={"rank": upsert.excluded.rank, "weekly_score": upsert.excluded.weekly_score}
+    ))
+    return statements
+
+def refresh_weekly_leaderboard(db: Session, week_start: datetime = None, since: datetime = None):
+    """Rebuild the materialized weekly leaderboard (see weekly_leaderboard_statements)."""
+    db.flush()
+    for statement in weekly_leaderboard_statements(week_start, since):
+        db.execute(statement)
+
+def weekly_leaderboard_query(week_start: datetime):
+    return select(models.WeeklyLeaderboard).where(
+        models.WeeklyLeaderboard.week_start == week_start
+    ).order_by(models.WeeklyLeaderboard.rank, models.WeeklyLeaderboard.user_id)
+
+def get_weekly_leaderboard(db: Session, week_start: datetime):
+    return db.execute(weekly_leaderboard_query(week_start)).scalars().all()
+
+def sync_leaderboard_profile(db: Session, user):
+    """Propaga username/profile_image para as linhas já materializadas do ranking."""
+    db.query(models.WeeklyLeaderboard).filter(models.WeeklyLeaderboard.user_id == user.id).update(
+        {
+            models.WeeklyLeaderboard.username: user.username,
+            models.WeeklyLeaderboard.profile_image: user.profile_image
+        },
+        synchronize_session=False
+    )
+
+def recalculate_all_points(db: Session, since: datetime = None):
+    """Recalculate WeeklyPoints and total points for all users based on existing check-ins.
+
+    The weeks are bucketed with a single GROUP BY, written back with one bulk
+    insert and the users' totals are refreshed with one UPDATE. When ``since``
+    is given only the weeks from the one containing ``since`` onwards are rebuilt.
+    """
+    logger.debug(f"Starting recalculation of points (since={since})")
+
+    cutoff = get_week_boundaries(since)[0] if since else None
+
+    # Remove as semanas que serão reconstruídas
+    stale = db.query(models.WeeklyPoints)
+    if cutoff:
+        stale = stale.filter(models.WeeklyPoints.week_start >= cutoff)
+    stale.delete(synchronize_session=False)
+
+    counts = count_weekly_checkins(db, cutoff)
+    points = scoring.score_many([checkin_count for _, _, checkin_count in counts])
+    rows = [
+        {
+            "user_id": user_id,
+            "week_start": start,
+            "week_end": start + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999),
+            "checkin_count": checkin_count,
+            "points": week_points,
+        }
+        for (user_id, start, checkin_count), week_points in zip(counts, points)
+    ]
+    if rows:
+        db.execute(insert(models.WeeklyPoints), rows)
+
+    refresh_user_points(db)
+    refresh_weekly_leaderboard(db, since=cutoff)
+    # Semanas já fechadas podem ter mudado de vencedor
+    refresh_weeks_won(db)
+    versions.bump(db, versions.RANKING)
     db.commit()
-    logger.debug("Recalculation completed")
+    invalidate_ranking_cache(all_weeks=True)
+    logger.debug(f"Recalculation completed: {len(rows)} weekly rows rebuilt")
+    return len(rows)
 
-# Em crud.py
-def recalculate_all_challenge_points(db: Session):
-    """Recalcula pontos para todos os participantes de todos os desafios."""
-    logger.debug("Iniciando recálculo de pontos para todos os desafios")
-    
-    # Obtém todos os desafios
-    challenges = db.query(models.Challenge).all()
-    for challenge in challenges:
-        logger.debug(f"Processando desafio {challenge.id}: {challenge.title}")
-        
-        # Obtém regras do desafio
-        rules = db.query(models.ChallengeRules).filter(
-            models.ChallengeRules.challenge_id == challenge.id
-        ).first()
-        
-        # Obtém todos os participantes aprovados
-        participants = db.query(models.ChallengeParticipant).filter(
-            models.ChallengeParticipant.challenge_id == challenge.id,
-            models.ChallengeParticipant.approved == True
-        ).all()
-        
-        for participant in participants:
-            # Conta check-ins do desafio
-            checkin_count = db.query(models.CheckIn).filter(
-                models.CheckIn.user_id == participant.user_id,
-                models.CheckIn.challenge_id == challenge.id
-            ).count()
-            
-            # Atualiza progresso
-            participant.progress = checkin_count
-            
-            # Calcula pontos
-            if rules:
-                challenge_points = calculate_challenge_points(checkin_count, rules)
-            else:
-                # Fallback para regra padrão
-                challenge_points = checkin_count * 5
-            
-            participant.challenge_points = challenge_points
-            logger.debug(f"Usuário {participant.user_id}: {checkin_count} check-ins, {challenge_points} pontos")
-    
+def count_challenge_weekly_checkins(db: Session, challenge_id: int, user_ids=None):
+    """Conta os check-ins do desafio por (usuário, semana) com um único GROUP BY."""
+    week_start = week_start_expr(db, models.CheckIn.timestamp).label("week_start")
+    query = db.query(
+        models.CheckIn.user_id,
+        week_start,
+        func.count(models.CheckIn.id)
+    ).filter(
+        models.CheckIn.challenge_id == challenge_id,
+        models.CheckIn.user_id.isnot(None)
+    )
+    if user_ids is not None:
+        query = query.filter(models.CheckIn.user_id.in_(user_ids))
+    return query.group_by(models.CheckIn.user_id, week_start).all()
+
+def challenge_period_rows(challenge_id: int, counts, rule: scoring.ScoringRule):
+    """Linhas de ChallengePoints para (user_id, semana, contagem), pontuadas de uma vez."""
+    points = scoring.score_many([checkin_count for _, _, checkin_count in counts], rule)
+    return [
+        {
+            "challenge_id": challenge_id,
+            "user_id": user_id,
+            "period_start": start,
+            "period_end": get_week_boundaries(start)[1],
+            "checkin_count": checkin_count,
+            "points": period_points,
+        }
+        for (user_id, start, checkin_count), period_points in zip(counts, points)
+    ]
+
+def score_participants(participants, totals, rule: scoring.ScoringRule):
+    """Progresso (total de check-ins) e pontos dos participantes a partir de ``totals``."""
+    progress = [totals.get(participant.user_id, 0) for participant in participants]
+    for participant, count, points in zip(participants, progress, scoring.score_many(progress, rule)):
+        participant.progress = count
+        participant.challenge_points = points
+
+# Desafios por lote (e por transação) no recálculo dos desafios
+RECALC_CHUNK_SIZE = int(os.getenv("RECALC_CHUNK_SIZE", "20"))
+# Threads do recálculo; no SQLite as escritas são serializadas e fica sempre 1
+RECALC_WORKERS = int(os.getenv("RECALC_WORKERS", "4"))
+
+def count_challenges_weekly_checkins(db: Session, challenge_ids, since: datetime = None):
+    """Conta os check-ins de vários desafios por (desafio, usuário, semana) com um único GROUP BY.
+
+    ``since`` limita às semanas a partir da que contém essa data.
+    """
+    week_start = week_start_expr(db, models.CheckIn.timestamp).label("week_start")
+    query = db.query(
+        models.CheckIn.challenge_id,
+        models.CheckIn.user_id,
+        week_start,
+        func.count(models.CheckIn.id)
+    ).filter(
+        models.CheckIn.challenge_id.in_(challenge_ids),
+        models.CheckIn.user_id.isnot(None)
+    )
+    if since is not None:
+        query = query.filter(models.CheckIn.timestamp >= get_week_boundaries(since)[0])
+    return query.group_by(models.CheckIn.challenge_id, models.CheckIn.user_id, week_start).all()
+
+class RecalculationReport:
+    """Resultado do recálculo dos desafios; ``diffs`` lista o que mudou (ou mudaria, em dry_run)."""
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.challenges = 0
+        self.chunks = 0
+        self.periods_inserted = 0
+        self.periods_updated = 0
+        self.periods_deleted = 0
+        self.participants_updated = 0
+        self.diffs = []
+
+    def merge(self, other: "RecalculationReport"):
+        self.challenges += other.challenges
+        self.chunks += other.chunks
+        self.periods_inserted += other.periods_inserted
+        self.periods_updated += other.periods_updated
+        self.periods_deleted += other.periods_deleted
+        self.participants_updated += other.participants_updated
+        self.diffs.extend(other.diffs)
+
+    def as_dict(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "challenges": self.challenges,
+            "chunks": self.chunks,
+            "periods_inserted": self.periods_inserted,
+            "periods_updated": self.periods_updated,
+            "periods_deleted": self.periods_deleted,
+            "participants_updated": self.participants_updated,
+            "diffs": sorted(self.diffs, key=lambda diff: diff["challenge_id"]),
+        }
+
+def recalculate_challenge_chunk(db: Session, challenge_ids, dry_run: bool = False) -> RecalculationReport:
+    """Recalcula um lote de desafios em uma única transação, gravando só o que mudou.
+
+    Uma consulta para as regras, uma para as contagens, uma para as linhas atuais de
+    ChallengePoints e uma para os participantes aprovados, qualquer que seja o tamanho
+    do lote. Com ``dry_run`` nada é gravado.
+    """
+    report = RecalculationReport(dry_run)
+    report.challenges = len(challenge_ids)
+    report.chunks = 1
+
+    rules = {
+        rule.challenge_id: rule for rule in db.query(models.ChallengeRules).filter(
+            models.ChallengeRules.challenge_id.in_(challenge_ids)
+        )
+    }
+    counts = {}
+    for challenge_id, user_id, start, checkin_count in count_challenges_weekly_checkins(db, challenge_ids):
+        counts.setdefault(challenge_id, []).append((user_id, start, checkin_count))
+    points_table = models.ChallengePoints.__table__
+    existing = {
+        (row.challenge_id, row.user_id, row.period_start): row for row in db.execute(
+            select(
+                points_table.c.id, points_table.c.challenge_id, points_table.c.user_id,
+                points_table.c.period_start, points_table.c.checkin_count, points_table.c.points
+            ).where(points_table.c.challenge_id.in_(challenge_ids))
+        )
+    }
+    participants = {}
+    for participant in db.query(models.ChallengeParticipant).filter(
+        models.ChallengeParticipant.challenge_id.in_(challenge_ids),
+        models.ChallengeParticipant.approved == True
+    ):
+        participants.setdefault(participant.challenge_id, []).append(participant)
+
+    inserts, updates = [], []
+    diffs = {}
+    for challenge_id in challenge_ids:
+        rule = scoring.rule_for(rules.get(challenge_id))
+        challenge_counts = counts.get(challenge_id, [])
+        diff = {"challenge_id": challenge_id, "periods_inserted": 0, "periods_updated": 0,
+                "periods_deleted": 0, "participants": []}
+
+        for row in challenge_period_rows(challenge_id, challenge_counts, rule):
+            current = existing.pop((challenge_id, row["user_id"], row["period_start"]), None)
+            if current is None:
+                inserts.append(row)
+                diff["periods_inserted"] += 1
+            elif (current.checkin_count, current.points) != (row["checkin_count"], row["points"]):
+                updates.append({"row_id": current.id, "new_count": row["checkin_count"], "new_points": row["points"]})
+                diff["periods_updated"] += 1
+
+        totals = {}
+        for user_id, _, checkin_count in challenge_counts:
+            totals[user_id] = totals.get(user_id, 0) + checkin_count
+        challenge_participants = participants.get(challenge_id, [])
+        progress = [totals.get(participant.user_id, 0) for participant in challenge_participants]
+        for participant, count, points in zip(challenge_participants, progress, scoring.score_many(progress, rule)):
+            if (participant.progress, participant.challenge_points) == (count, points):
+                continue
+            diff["participants"].append({
+                "user_id": participant.user_id,
+                "progress": [participant.progress, count],
+                "challenge_points": [participant.challenge_points, points],
+            })
+            if not dry_run:
+                participant.progress = count
+                participant.challenge_points = points
+        diffs[challenge_id] = diff
+
+    # Sobraram as semanas que não têm mais check-ins
+    for challenge_id, _, _ in existing:
+        diffs[challenge_id]["periods_deleted"] += 1
+    for diff in diffs.values():
+        if diff["periods_inserted"] or diff["periods_updated"] or diff["periods_deleted"] or diff["participants"]:
+            report.diffs.append(diff)
+            report.periods_inserted += diff["periods_inserted"]
+            report.periods_updated += diff["periods_updated"]
+            report.periods_deleted += diff["periods_deleted"]
+            report.participants_updated += len(diff["participants"])
+
+    if dry_run or not report.diffs:
+        db.rollback()
+        return report
+
+    if existing:
+        db.execute(delete(points_table).where(points_table.c.id.in_([row.id for row in existing.values()])))
+    if updates:
+        db.execute(
+            update(points_table).where(points_table.c.id == bindparam("row_id")).values(
+                checkin_count=bindparam("new_count"), points=bindparam("new_points")
+            ),
+            updates
+        )
+    if inserts:
+        db.execute(insert(points_table), inserts)
+    changed = [diff["challenge_id"] for diff in report.diffs]
+    versions.bump(db, *[versions.challenge_key(challenge_id) for challenge_id in changed])
     db.commit()
-    logger.debug("Recálculo de pontos para desafios concluído")
-    
-def update_weekly_points(db: Session, user_id: int, timestamp: datetime):
-    """Update WeeklyPoints for the given user and week."""
-    logger.debug(f"Updating points for user {user_id} at {timestamp}")
+    cache.response_cache.invalidate(*[cache.challenge_tag(challenge_id) for challenge_id in changed])
+    return report
+
+def recalculate_all_challenge_points(db: Session, dry_run: bool = False, workers: int = RECALC_WORKERS,
+                                     chunk_size: int = RECALC_CHUNK_SIZE) -> RecalculationReport:
+    """Recalcula ChallengePoints e os pontos dos participantes aprovados de todos os desafios.
+
+    Os desafios são independentes: vão em lotes de ``chunk_size``, cada lote na sua
+    própria sessão e transação (commits curtos, sem travar a API durante o recálculo
+    inteiro), e os lotes rodam em até ``workers`` threads. Com ``dry_run`` só relata as
+    diferenças. Rodar de novo é seguro: um lote que falhou é refeito por inteiro.
+    """
+    challenge_ids = [challenge_id for (challenge_id,) in db.query(models.Challenge.id).order_by(models.Challenge.id)]
+    # Encerra a transação de leitura: os lotes escrevem por outras conexões
+    db.rollback()
+    bind = db.get_bind()
+    if bind.dialect.name == "sqlite":
+        workers = 1
+    make_session = sessionmaker(bind=bind, autoflush=False)
+
+    def run_chunk(chunk):
+        with make_session() as session:
+            return recalculate_challenge_chunk(session, chunk, dry_run)
+
+    chunks = [challenge_ids[i:i + chunk_size] for i in range(0, len(challenge_ids), max(1, chunk_size))]
+    report = RecalculationReport(dry_run)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="challenge-recalc") as executor:
+        for chunk_report in executor.map(run_chunk, chunks):
+            report.merge(chunk_report)
+    logger.info(
+        f"Challenge recalculation{' (dry run)' if dry_run else ''}: {report.challenges} challenges "
+        f"in {report.chunks} chunks, {len(report.diffs)} changed"
+    )
+    return report
+
+def update_weekly_points(db: Session, user_id: int, timestamp: datetime, delta: int):
+    """Apply a +1/-1 check-in delta to the user's week without rescanning history.
+
+    Adjusts WeeklyPoints.checkin_count, adds the resulting point difference
+    to User.points and shifts only the affected rows of that week's
+    leaderboard. The count changes in one atomic statement (weekly_count_statement);
+    a -1 on a week with nothing counted is skipped. Does not commit: the caller owns the transaction and bumps
+    versions.RANKING with versions.bump_after_commit() once it has committed.
+    """
     week_start, week_end = get_week_boundaries(timestamp)
-    logger.debug(f"Week: {week_start} to {week_end}")
-    
-    # Get or create WeeklyPoints entry
-    weekly_points = db.query(models.WeeklyPoints).filter(
-        models.WeeklyPoints.user_id == user_id,
-        models.WeeklyPoints.week_start == week_start
-    ).first()
-    
-    if not weekly_points:
-        weekly_points = models.WeeklyPoints(
-            user_id=user_id,
-            week_start=week_start,
-            week_end=week_end,
-            checkin_count=0,
-            points=0
-        )
-        db.add(weekly_points)
-        db.flush()  # Ensure the new record is in the DB before querying check-ins
-    
-    # Count check-ins for the week
-    checkin_count = db.query(models.CheckIn).filter(
-        models.CheckIn.user_id == user_id,
-        models.CheckIn.timestamp >= week_start,
-        models.CheckIn.timestamp <= week_end
-    ).count()
-    
-    # Update WeeklyPoints
-    weekly_points.checkin_count = checkin_count
-    weekly_points.points = calculate_weekly_points(checkin_count)
-    db.flush()  # Ensure WeeklyPoints is updated before summing
-    
-    # Update user's total points
-    total_points = db.query(func.sum(models.WeeklyPoints.points)).filter(
-        models.WeeklyPoints.user_id == user_id
-    ).scalar() or 0
-    
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user:
-        user.points = total_points
-    
-    logger.debug(f"Checkin count: {checkin_count}, Points: {weekly_points.points}, Total: {total_points}")
-    db.commit()  # Final commit to save all changes
+    dialect_name = db.get_bind().dialect.name
+    row = db.execute(weekly_count_statement(dialect_name, user_id, week_start, week_end, delta)).first()
+    if row is None:
+        # -1 numa semana sem check-ins contados: nada a desfazer
+        logger.debug(f"User {user_id} week {week_start}: nothing to remove")
+        return
+    for statement in weekly_points_delta_statements(dialect_name, week_start, user_id, row, delta):
+        db.execute(statement)
+    logger.debug(f"User {user_id} week {week_start}: count={row.checkin_count}")
 
 def create_checkin(db: Session, checkin: schemas.CheckInCreate):
     db_checkin = models.CheckIn(**checkin.dict(exclude_unset=True))
+    if db_checkin.timestamp is None:
+        # Mesmo valor do server_default (CURRENT_TIMESTAMP é UTC), necessário para achar a semana
+        db_checkin.timestamp = datetime.utcnow()
     db.add(db_checkin)
+    update_weekly_points(db, checkin.user_id, db_checkin.timestamp, +1)
+    versions.bump(db, versions.user_checkins_key(checkin.user_id))
     db.commit()
+    versions.bump_after_commit(db, versions.RANKING)
+    invalidate_ranking_cache(db_checkin.timestamp)
     db.refresh(db_checkin)
-    update_weekly_points(db, checkin.user_id, db_checkin.timestamp)
     return db_checkin
 
 def update_checkin(db: Session, checkin, update: schemas.CheckInUpdate):
@@ -186,23 +563,267 @@ def update_checkin(db: Session, checkin, update: schemas.CheckInUpdate):
     update_data = update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(checkin, key, value)
+
+    # Só move o check-in de semana se o timestamp mudou de semana
+    if checkin.timestamp is None:
+        checkin.timestamp = original_timestamp
+    moved = get_week_boundaries(checkin.timestamp)[0] != get_week_boundaries(original_timestamp)[0]
+    if moved:
+        update_weekly_points(db, checkin.user_id, original_timestamp, -1)
+        update_weekly_points(db, checkin.user_id, checkin.timestamp, +1)
+        if checkin.challenge_id:
+            move_challenge_checkin(db, checkin, original_timestamp)
+    versions.bump(db, versions.user_checkins_key(checkin.user_id))
     db.commit()
+    if moved:
+        versions.bump_after_commit(db, versions.RANKING)
+        invalidate_ranking_cache(original_timestamp, checkin.timestamp)
+        if checkin.challenge_id:
+            cache.response_cache.invalidate(cache.challenge_tag(checkin.challenge_id))
     db.refresh(checkin)
-    
-    # Update points for both weeks if timestamp changed
-    if 'timestamp' in update_data and update_data['timestamp'] != original_timestamp:
-        update_weekly_points(db, checkin.user_id, original_timestamp)
-        update_weekly_points(db, checkin.user_id, checkin.timestamp)
-    else:
-        update_weekly_points(db, checkin.user_id, checkin.timestamp)
     return checkin
 
 def delete_checkin(db: Session, checkin):
-    timestamp = checkin.timestamp
-    user_id = checkin.user_id
+    update_weekly_points(db, checkin.user_id, checkin.timestamp, -1)
+    if checkin.challenge_id:
+        update_challenge_points(db, checkin.user_id, checkin.challenge_id, checkin.timestamp, -1)
     db.delete(checkin)
+    versions.bump(db, versions.user_checkins_key(checkin.user_id))
     db.commit()
-    update_weekly_points(db, user_id, timestamp)
+    versions.bump_after_commit(db, versions.RANKING)
+    invalidate_ranking_cache(checkin.timestamp)
+    if checkin.challenge_id:
+        cache.response_cache.invalidate(cache.challenge_tag(checkin.challenge_id))
+
+def find_points_drift(db: Session):
+    """Compare WeeklyPoints and User.points against the real check-ins.
+
+    Returns the (user_id, week_start) pairs whose stored count differs from the
+    check-in table and the users whose total differs from their weekly rows.
+    """
+    actual = {(user_id, start): count for user_id, start, count in count_weekly_checkins(db)}
+    stored = {
+        (wp.user_id, wp.week_start): wp.checkin_count or 0
+        for wp in db.query(
+            models.WeeklyPoints.user_id,
+            models.WeeklyPoints.week_start,
+            models.WeeklyPoints.checkin_count
+        )
+    }
+    weeks = sorted(
+        key for key in set(actual) | set(stored)
+        if actual.get(key, 0) != stored.get(key, 0)
+    )
+
+    total_points = weekly_points_total()
+    users = [
+        user_id for user_id, in db.query(models.User.id).filter(
+            func.coalesce(models.User.points, 0) != total_points
+        )
+    ]
+    return {"weeks": weeks, "users": users}
+
+def find_leaderboard_drift(db: Session, week_start: datetime):
+    """Users whose materialized (rank, weekly_score) in the week differs from RANK() over WeeklyPoints."""
+    counts = dict(db.query(models.WeeklyPoints.user_id, models.WeeklyPoints.checkin_count).filter(
+        models.WeeklyPoints.week_start == week_start,
+        models.WeeklyPoints.checkin_count > 0
+    ))
+    expected = {
+        user_id: (1 + sum(other > count for other in counts.values()), count)
+        for user_id, count in counts.items()
+    }
+    stored = {
+        user_id: (rank, weekly_score)
+        for user_id, rank, weekly_score in db.query(
+            models.WeeklyLeaderboard.user_id,
+            models.WeeklyLeaderboard.rank,
+            models.WeeklyLeaderboard.weekly_score
+        ).filter(models.WeeklyLeaderboard.week_start == week_start)
+    }
+    return sorted(user_id for user_id in set(expected) | set(stored) if expected.get(user_id) != stored.get(user_id))
+
+def check_points_consistency(db: Session, repair: bool = True):
+    """Periodic safety net for the delta write path: detect and optionally fix drift.
+
+    Also checks the current week's leaderboard, whose ranks the concurrent deltas
+    can leave off by one (see weekly_leaderboard_delta_statements).
+    """
+    drift = find_points_drift(db)
+    current_week = get_week_boundaries(datetime.utcnow())[0]
+    drift["leaderboard"] = find_leaderboard_drift(db, current_week)
+    if drift["weeks"] or drift["users"]:
+        logger.warning(f"Points drift detected: {len(drift['weeks'])} weeks, {len(drift['users'])} users")
+    if drift["leaderboard"]:
+        logger.warning(f"Leaderboard drift detected: {len(drift['leaderboard'])} users in week {current_week}")
+    if not repair:
+        return drift
+    if drift["weeks"]:
+        # Também refaz o ranking materializado das semanas a partir da mais antiga
+        recalculate_all_points(db, since=min(week_start for _, week_start in drift["weeks"]))
+    elif drift["users"] or drift["leaderboard"]:
+        if drift["users"]:
+            refresh_user_points(db, drift["users"])
+        if drift["leaderboard"]:
+            refresh_weekly_leaderboard(db, week_start=current_week)
+        versions.bump(db, versions.RANKING)
+        db.commit()
+        invalidate_ranking_cache(current_week)
+    return drift
+
+def weekly_winners_statement(weeks):
+    """(user_id, week_start) dos vencedores de cada semana em ``weeks`` (lista ou subquery).
+
+    Vence quem tem o maior checkin_count da semana, desde que atinja MIN_TRAINING_DAYS;
+    empates dão a vitória a todos. Um único GROUP BY para todas as semanas.
+    """
+    top = select(
+        models.WeeklyPoints.week_start,
+        func.max(models.WeeklyPoints.checkin_count).label("top")
+    ).where(
+        models.WeeklyPoints.week_start.in_(weeks),
+        models.WeeklyPoints.checkin_count >= config.MIN_TRAINING_DAYS
+    ).group_by(models.WeeklyPoints.week_start).subquery()
+    return select(models.WeeklyPoints.user_id, models.WeeklyPoints.week_start).join(
+        top, and_(
+            models.WeeklyPoints.week_start == top.c.week_start,
+            models.WeeklyPoints.checkin_count == top.c.top
+        )
+    )
+
+def close_weeks(db: Session, now: datetime = None):
+    """Fecha as semanas encerradas que ainda não têm WeeklyUpdate: soma weeks_won dos vencedores.
+
+    Idempotente: cada semana fechada ganha uma linha em weekly_updates (única por
+    week_start) na mesma transação do incremento, então rodar de novo não conta duas
+    vezes e uma execução atrasada recupera todas as semanas que ficaram para trás.
+    Retorna as semanas fechadas.
+    """
+    current_week = get_week_boundaries(now or datetime.utcnow())[0]
+    closed = select(models.WeeklyUpdate.week_start)
+    weeks = [
+        week_start for (week_start,) in db.query(models.WeeklyPoints.week_start).filter(
+            models.WeeklyPoints.week_start < current_week,
+            models.WeeklyPoints.week_start.notin_(closed)
+        ).distinct().order_by(models.WeeklyPoints.week_start)
+    ]
+    if not weeks:
+        return []
+
+    wins = {}
+    for user_id, _ in db.execute(weekly_winners_statement(weeks)):
+        wins[user_id] = wins.get(user_id, 0) + 1
+    if wins:
+        users = models.User.__table__
+        db.execute(
+            update(users).where(users.c.id == bindparam("winner_id")).values(
+                weeks_won=func.coalesce(users.c.weeks_won, 0) + bindparam("won")
+            ),
+            [{"winner_id": user_id, "won": won} for user_id, won in wins.items()]
+        )
+    db.execute(insert(models.WeeklyUpdate), [
+        {"week_start": week_start, "week_end": get_week_boundaries(week_start)[1]} for week_start in weeks
+    ])
+    versions.bump(db, versions.RANKING)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outra execução fechou as mesmas semanas primeiro
+        db.rollback()
+        logger.info("Weekly close skipped: weeks already closed by a concurrent run")
+        return []
+    cache.response_cache.invalidate(cache.OVERALL_RANKING_TAG)
+    logger.info(f"Closed {len(weeks)} weeks ({weeks[0]:%Y-%m-%d} .. {weeks[-1]:%Y-%m-%d}), {len(wins)} winners")
+    return weeks
+
+def refresh_weeks_won(db: Session):
+    """Recalcula weeks_won de todos os usuários a partir das semanas já fechadas (sem commit).
+
+    Para quando check-ins de semanas fechadas mudam (edição, exclusão, recálculo).
+    """
+    winners = weekly_winners_statement(select(models.WeeklyUpdate.week_start)).subquery()
+    db.query(models.User).update(
+        {
+            models.User.weeks_won: select(func.count()).where(
+                winners.c.user_id == models.User.id
+            ).scalar_subquery()
+        },
+        synchronize_session=False
+    )
+
+# Pares por DELETE ... WHERE (user_id, week_start) IN (...), abaixo do limite de parâmetros do SQLite
+RESCORE_CHUNK_SIZE = 400
+
+def rescore_weeks(db: Session, pairs):
+    """Recalcula WeeklyPoints só dos pares (user_id, week_start) informados, a partir dos check-ins.
+
+    Para cargas em lote: cada semana afetada é recontada uma vez (um GROUP BY para
+    todas), em vez de um delta por check-in. Atualiza os totais dos usuários, o
+    ranking materializado e weeks_won das semanas já fechadas. Não faz commit.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    user_ids = {user_id for user_id, _ in pairs}
+    since = min(week_start for _, week_start in pairs)
+
+    ordered = sorted(pairs)
+    for i in range(0, len(ordered), RESCORE_CHUNK_SIZE):
+        db.query(models.WeeklyPoints).filter(
+            tuple_(models.WeeklyPoints.user_id, models.WeeklyPoints.week_start).in_(ordered[i:i + RESCORE_CHUNK_SIZE])
+        ).delete(synchronize_session=False)
+    counts = [row for row in count_weekly_checkins(db, since, user_ids) if (row[0], row[1]) in pairs]
+    points = scoring.score_many([checkin_count for _, _, checkin_count in counts])
+    rows = [
+        {
+            "user_id": user_id,
+            "week_start": start,
+            "week_end": get_week_boundaries(start)[1],
+            "checkin_count": checkin_count,
+            "points": week_points,
+        }
+        for (user_id, start, checkin_count), week_points in zip(counts, points)
+    ]
+    if rows:
+        db.execute(insert(models.WeeklyPoints), rows)
+
+    refresh_user_points(db, user_ids)
+    refresh_weekly_leaderboard(db, since=since)
+    if since < get_week_boundaries(datetime.utcnow())[0]:
+        refresh_weeks_won(db)
+    versions.bump(db, versions.RANKING)
+    return len(rows)
+
+def rescore_challenge_participants(db: Session, pairs):
+    """Recalcula ChallengePoints e progresso/pontos dos pares (user_id, challenge_id), um GROUP BY por desafio.
+
+    Não faz commit.
+    """
+    by_challenge = {}
+    for user_id, challenge_id in pairs:
+        by_challenge.setdefault(challenge_id, set()).add(user_id)
+
+    for challenge_id, user_ids in by_challenge.items():
+        rule = scoring.rule_for(get_challenge_rules(db, challenge_id))
+        db.query(models.ChallengePoints).filter(
+            models.ChallengePoints.challenge_id == challenge_id,
+            models.ChallengePoints.user_id.in_(user_ids)
+        ).delete(synchronize_session=False)
+        counts = count_challenge_weekly_checkins(db, challenge_id, user_ids)
+        rows = challenge_period_rows(challenge_id, counts, rule)
+        if rows:
+            db.execute(insert(models.ChallengePoints), rows)
+
+        totals = {}
+        for user_id, _, checkin_count in counts:
+            totals[user_id] = totals.get(user_id, 0) + checkin_count
+        participants = db.query(models.ChallengeParticipant).filter(
+            models.ChallengeParticipant.challenge_id == challenge_id,
+            models.ChallengeParticipant.user_id.in_(user_ids)
+        ).all()
+        score_participants(participants, totals, rule)
+        versions.bump(db, versions.challenge_key(challenge_id))
+    return len(by_challenge)
 
 def get_checkins_by_user_between(db: Session, user_id: int, start_date: datetime, end_date: datetime):
     return db.query(models.CheckIn).filter(
@@ -211,8 +832,93 @@ def get_checkins_by_user_between(db: Session, user_id: int, start_date: datetime
         models.CheckIn.timestamp <= end_date
     ).all()
 
-def get_all_checkins_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 10):
-    return db.query(models.CheckIn).filter(models.CheckIn.user_id == user_id).offset(skip).limit(limit).all()
+def get_all_checkins_by_user(db: Session, user_id: int, limit: int = 10, cursor: str = None):
+    """Histórico de check-ins do usuário, mais recentes primeiro. Retorna (itens, next_cursor)."""
+    query = db.query(models.CheckIn).filter(models.CheckIn.user_id == user_id)
+    return keyset_page(query, models.CheckIn.timestamp, models.CheckIn.id, cursor, limit)
+
+def get_checkins_by_period(db: Session, user_id: int, start_date: datetime, end_date: datetime,
+                           limit: int = 100, cursor: str = None):
+    """Check-ins do usuário no intervalo em ordem cronológica. Retorna (itens, next_cursor)."""
+    query = db.query(models.CheckIn).filter(
+        models.CheckIn.user_id == user_id,
+        models.CheckIn.timestamp >= start_date,
+        models.CheckIn.timestamp <= end_date
+    )
+    return keyset_page(query, models.CheckIn.timestamp, models.CheckIn.id, cursor, limit, descending=False)
+
+def get_challenge_activity(db: Session, challenge_id: int, limit: int = 10, cursor: str = None):
+    """Página do feed de check-ins do desafio (todos os participantes), mais recentes primeiro."""
+    query = db.query(
+        models.CheckIn,
+        models.User.username,
+        models.User.profile_image
+    ).outerjoin(models.User, models.User.id == models.CheckIn.user_id).filter(
+        models.CheckIn.challenge_id == challenge_id
+    )
+    return keyset_page(
+        query, models.CheckIn.timestamp, models.CheckIn.id, cursor, limit,
+        key=lambda row: (row[0].timestamp, row[0].id)
+    )
+
+def is_whole_weeks(start: datetime, end: datetime) -> bool:
+    """True quando [start, end] cobre semanas inteiras (domingo 00:00 até sábado 23:59:59.999999)."""
+    return (
+        start is not None and end is not None
+        and start == get_week_boundaries(start)[0]
+        and end == get_week_boundaries(end)[1]
+    )
+
+def challenge_ranking_statement(challenge_id: int, start: datetime = None, end: datetime = None):
+    """Pontuação de cada participante aprovado em uma única consulta agrupada.
+
+    Sem ``start``/``end`` usa o progresso acumulado do participante. Intervalos de
+    semanas inteiras somam as linhas de ChallengePoints; os demais contam os
+    check-ins do desafio no intervalo. As linhas saem ordenadas pela pontuação.
+    """
+    participant = models.ChallengeParticipant
+    if start is None:
+        score = func.coalesce(participant.progress, 0)
+        statement = select(
+            participant.user_id, models.User.username, models.User.profile_image, score.label("score")
+        ).join(models.User, models.User.id == participant.user_id)
+    elif is_whole_weeks(start, end):
+        score = func.coalesce(func.sum(models.ChallengePoints.checkin_count), 0)
+        statement = select(
+            participant.user_id, models.User.username, models.User.profile_image, score.label("score")
+        ).join(models.User, models.User.id == participant.user_id).outerjoin(
+            models.ChallengePoints, and_(
+                models.ChallengePoints.challenge_id == participant.challenge_id,
+                models.ChallengePoints.user_id == participant.user_id,
+                models.ChallengePoints.period_start >= start,
+                models.ChallengePoints.period_start <= end
+            )
+        ).group_by(
+            participant.id, participant.user_id, models.User.username, models.User.profile_image
+        )
+    else:
+        checkin_filter = [
+            models.CheckIn.user_id == participant.user_id,
+            models.CheckIn.challenge_id == participant.challenge_id,
+            models.CheckIn.timestamp >= start,
+        ]
+        if end is not None:
+            checkin_filter.append(models.CheckIn.timestamp <= end)
+        score = func.count(models.CheckIn.id)
+        statement = select(
+            participant.user_id, models.User.username, models.User.profile_image, score.label("score")
+        ).join(models.User, models.User.id == participant.user_id).outerjoin(
+            models.CheckIn, and_(*checkin_filter)
+        ).group_by(
+            participant.id, participant.user_id, models.User.username, models.User.profile_image
+        )
+    return statement.where(
+        participant.challenge_id == challenge_id,
+        participant.approved == True
+    ).order_by(score.desc(), participant.id)
+
+def get_challenge_ranking(db: Session, challenge_id: int, start: datetime = None, end: datetime = None):
+    return db.execute(challenge_ranking_statement(challenge_id, start, end)).all()
 
 def update_user_status_and_points(db: Session, user_id: int):
     # Define início da semana (supondo domingo como início)
@@ -240,53 +946,64 @@ def get_checkin(db: Session, checkin_id: int):
 def get_all_users(db: Session):
     return db.query(models.User).all()
 
-def calculate_challenge_points(checkin_count, rules):
-    """Calcula pontos baseado nas regras específicas do desafio."""
-    if not rules or checkin_count < rules.min_threshold:
-        return 0
-    
-    base_points = rules.min_points
-    additional_count = max(0, checkin_count - rules.min_threshold)
-    additional_points = (additional_count // rules.additional_unit) * rules.additional_points
-    
-    return base_points + additional_points
+def get_challenge_rules(db: Session, challenge_id: int):
+    return db.query(models.ChallengeRules).filter(models.ChallengeRules.challenge_id == challenge_id).first()
 
-def update_challenge_points(db: Session, user_id: int, challenge_id: int):
-    """Atualiza a pontuação do usuário em um desafio específico."""
-    # Buscar o desafio e suas regras
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
-    if not challenge:
-        return
-    
-    rules = db.query(models.ChallengeRules).filter(
-        models.ChallengeRules.challenge_id == challenge_id
+def update_challenge_period_points(db: Session, challenge_id: int, user_id: int, timestamp: datetime, delta: int, rules):
+    """Aplica o delta de um check-in de desafio à linha de ChallengePoints da sua semana. Não faz commit."""
+    period_start, period_end = get_week_boundaries(timestamp)
+    period = db.query(models.ChallengePoints).filter(
+        models.ChallengePoints.challenge_id == challenge_id,
+        models.ChallengePoints.user_id == user_id,
+        models.ChallengePoints.period_start == period_start
     ).first()
-    
-    # Buscar a participação do usuário
+    if not period:
+        if delta < 0:
+            return
+        period = models.ChallengePoints(
+            challenge_id=challenge_id,
+            user_id=user_id,
+            period_start=period_start,
+            period_end=period_end,
+            checkin_count=0,
+            points=0
+        )
+        db.add(period)
+    period.checkin_count = max(0, (period.checkin_count or 0) + delta)
+    period.points = scoring.score(period.checkin_count, scoring.rule_for(rules))
+    if period.checkin_count == 0:
+        # Semana sem check-ins não tem linha, como no recálculo
+        db.delete(period)
+
+def update_challenge_points(db: Session, user_id: int, challenge_id: int, timestamp: datetime, delta: int):
+    """Apply a +1/-1 challenge check-in delta without recounting the user's history.
+
+    Adjusts the week's ChallengePoints row and the participant's progress and
+    total points. Does not commit: the caller owns the transaction.
+    """
+    rules = get_challenge_rules(db, challenge_id)
+    update_challenge_period_points(db, challenge_id, user_id, timestamp, delta, rules)
+
     participant = db.query(models.ChallengeParticipant).filter(
         models.ChallengeParticipant.challenge_id == challenge_id,
         models.ChallengeParticipant.user_id == user_id
     ).first()
-    
-    if not participant:
-        return
-    
-    # Contar checkins do desafio
-    checkin_count = db.query(models.CheckIn).filter(
-        models.CheckIn.user_id == user_id,
-        models.CheckIn.challenge_id == challenge_id
-    ).count()
-    
-    # Calcular pontos
-    if rules:
-        challenge_points = calculate_challenge_points(checkin_count, rules)
-    else:
-        # Fallback para a regra padrão
-        challenge_points = calculate_weekly_points(checkin_count)
-    
-    # Atualizar pontos do participante
-    participant.progress = checkin_count
-    participant.challenge_points = challenge_points
-    db.commit()
-    
-    return participant
\ No newline at end of file
+    if participant:
+        participant.progress = max(0, (participant.progress or 0) + delta)
+        participant.challenge_points = scoring.score(participant.progress, scoring.rule_for(rules))
+    versions.bump(db, versions.challenge_key(challenge_id))
+    return participant
+
+def move_challenge_checkin(db: Session, checkin, original_timestamp: datetime):
+    """Check-in de desafio que mudou de semana: passa a contagem de uma linha de ChallengePoints para a outra."""
+    rules = get_challenge_rules(db, checkin.challenge_id)
+    update_challenge_period_points(db, checkin.challenge_id, checkin.user_id, original_timestamp, -1, rules)
+    update_challenge_period_points(db, checkin.challenge_id, checkin.user_id, checkin.timestamp, +1, rules)
+    versions.bump(db, versions.challenge_key(checkin.challenge_id))
+
+def get_challenge_points_history(db: Session, challenge_id: int, user_id: int):
+    """Períodos do usuário no desafio, mais recentes primeiro."""
+    return db.query(models.ChallengePoints).filter(
+        models.ChallengePoints.challenge_id == challenge_id,
+        models.ChallengePoints.user_id == user_id
+    ).order_by(models.ChallengePoints.period_start.desc()).all()
@@ -0,0 +1,138 @@
+# backend/app/crud_async.py
+"""Versões assíncronas (AsyncSession) das funções do crud usadas nos caminhos quentes.
+
+As consultas são as mesmas do crud síncrono: reaproveitam os statements Core de lá
+(weekly_count_statement, challenge_ranking_statement, apply_keyset), só a
+execução muda para ``await db.execute``.
+"""
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas, auth, versions
+from .crud import (
+    get_week_boundaries,
+    weekly_count_statement,
+    weekly_points_delta_statements,
+    weekly_leaderboard_query,
+    challenge_ranking_statement,
+    invalidate_ranking_cache,
+)
+from .pagination import apply_keyset, split_page
+
+import logging
+logger = logging.getLogger(__name__)
+
+def _checkin_key(checkin):
+    return checkin.timestamp, checkin.id
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(
+        select(models.User).where(func.lower(models.User.username) == username.lower()).limit(1)
+    )
+    return result.scalars().first()
+
+async def get_user_by_username_cached(db: AsyncSession, username: str):
+    """Mesmo contrato de crud.get_user_by_username_cached, compartilhando o cache de ids."""
+    key = username.lower()
+    user_id = auth.user_id_cache.get(key)
+    if user_id is not None:
+        user = await db.get(models.User, user_id)
+        if user is not None and user.username.lower() == key:
+            return user
+        auth.user_id_cache.delete(key)
+    user = await get_user_by_username(db, username)
+    if user is not None:
+        auth.user_id_cache.set(key, user.id)
+    return user
+
+async def get_ranking(db: AsyncSession, limit: int = 10):
+    result = await db.execute(
+        select(models.User).order_by(models.User.points.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
+async def get_overall_ranking(db: AsyncSession):
+    result = await db.execute(select(models.User).order_by(models.User.weeks_won.desc()))
+    return result.scalars().all()
+
+async def get_weekly_leaderboard(db: AsyncSession, week_start: datetime):
+    result = await db.execute(weekly_leaderboard_query(week_start))
+    return result.scalars().all()
+
+async def get_checkins_by_user_between(db: AsyncSession, user_id: int, start_date: datetime, end_date: datetime):
+    result = await db.execute(select(models.CheckIn).where(
+        models.CheckIn.user_id == user_id,
+        models.CheckIn.timestamp >= start_date,
+        models.CheckIn.timestamp <= end_date
+    ))
+    return result.scalars().all()
+
+async def get_all_checkins_by_user(db: AsyncSession, user_id: int, limit: int = 10, cursor: str = None):
+    """Histórico de check-ins do usuário, mais recentes primeiro. Retorna (itens, next_cursor)."""
+    statement = select(models.CheckIn).where(models.CheckIn.user_id == user_id)
+    statement, limit = apply_keyset(statement, models.CheckIn.timestamp, models.CheckIn.id, cursor, limit)
+    result = await db.execute(statement)
+    return split_page(result.scalars().all(), limit, _checkin_key)
+
+async def get_checkins_by_period(db: AsyncSession, user_id: int, start_date: datetime, end_date: datetime,
+                                 limit: int = 100, cursor: str = None):
+    """Check-ins do usuário no intervalo em ordem cronológica. Retorna (itens, next_cursor)."""
+    statement = select(models.CheckIn).where(
+        models.CheckIn.user_id == user_id,
+        models.CheckIn.timestamp >= start_date,
+        models.CheckIn.timestamp <= end_date
+    )
+    statement, limit = apply_keyset(
+        statement, models.CheckIn.timestamp, models.CheckIn.id, cursor, limit, descending=False
+    )
+    result = await db.execute(statement)
+    return split_page(result.scalars().all(), limit, _checkin_key)
+
+async def get_approved_participation(db: AsyncSession, challenge_id: int, user_id: int):
+    result = await db.execute(select(models.ChallengeParticipant).where(
+        models.ChallengeParticipant.challenge_id == challenge_id,
+        models.ChallengeParticipant.user_id == user_id,
+        models.ChallengeParticipant.approved == True
+    ).limit(1))
+    return result.scalars().first()
+
+async def get_challenge(db: AsyncSession, challenge_id: int):
+    return await db.get(models.Challenge, challenge_id)
+
+async def get_challenge_ranking(db: AsyncSession, challenge_id: int, start: datetime = None, end: datetime = None):
+    result = await db.execute(challenge_ranking_statement(challenge_id, start, end))
+    return result.all()
+
+async def update_weekly_points(db: AsyncSession, user_id: int, timestamp: datetime, delta: int):
+    """Equivalente a crud.update_weekly_points; também não faz commit."""
+    week_start, week_end = get_week_boundaries(timestamp)
+    connection = await db.connection()
+    dialect_name = connection.dialect.name
+    result = await db.execute(weekly_count_statement(dialect_name, user_id, week_start, week_end, delta))
+    row = result.first()
+    if row is None:
+        logger.debug(f"User {user_id} week {week_start}: nothing to remove")
+        return
+    for statement in weekly_points_delta_statements(dialect_name, week_start, user_id, row, delta):
+        await db.execute(statement)
+    logger.debug(f"User {user_id} week {week_start}: count={row.checkin_count}")
+
+async def create_checkin(db: AsyncSession, checkin: schemas.CheckInCreate):
+    db_checkin = models.CheckIn(**checkin.dict(exclude_unset=True))
+    if db_checkin.timestamp is None:
+        db_checkin.timestamp = datetime.utcnow()
+    db.add(db_checkin)
+    await update_weekly_points(db, checkin.user_id, db_checkin.timestamp, +1)
+    await versions.bump_async(db, versions.user_checkins_key(checkin.user_id))
+    await db.commit()
+    await versions.bump_after_commit_async(db, versions.RANKING)
+    invalidate_ranking_cache(db_checkin.timestamp)
+    await db.refresh(db_checkin)
+    return db_checkin
+
+async def unread_count(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(select(func.count(models.Notification.id)).where(
+        models.Notification.user_id == user_id,
+        models.Notification.read == False
+    ))
+    return result.scalar()
@@ -0,0 +1,200 @@
+# backend/app/events.py
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# Redis para distribuir eventos entre os workers da API e o worker do Celery; só é usado
+# quando configurado explicitamente. Vazio = pub/sub só em processo: o fan-out de
+# notificações deixa de ir para o Celery, senão os eventos publicados lá não chegariam
+# às conexões SSE.
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", "")
+# Eventos pendentes por conexão antes de ela ser considerada lenta e encerrada
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+# Intervalo do heartbeat enviado às conexões ociosas (segundos)
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+REDIS_CHANNEL_PREFIX = "events:"
+# Depois de uma falha no Redis, tempo publicando só neste processo antes de tentar de novo
+REDIS_RETRY_SECONDS = 30
+# Espera máxima entre as tentativas de reconectar o listener (segundos)
+LISTENER_MAX_BACKOFF = 30
+
+# Marcador colocado na fila quando o cliente não acompanha o ritmo dos eventos
+OVERFLOW = object()
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+def challenge_topic(challenge_id: int) -> str:
+    return f"challenge:{challenge_id}"
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} não é serializável")
+
+class Subscription:
+    """Conexão inscrita em alguns tópicos, com fila limitada no event loop dela."""
+
+    def __init__(self, topics, loop, maxsize: int):
+        self.topics = set(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _put(self, message: str):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Backpressure: descarta o que está pendente e encerra a conexão;
+            # o cliente reconecta e recarrega o estado pela API normal
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    def deliver(self, message: str):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # Event loop já encerrado
+            pass
+
+class LocalBroker:
+    """Pub/sub em processo. publish() pode ser chamado de qualquer thread."""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics, maxsize: int = EVENTS_QUEUE_SIZE) -> Subscription:
+        subscription = Subscription(topics, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def dispatch(self, topic: str, message: str):
+        with self._lock:
+            targets = [s for s in self._subscriptions if topic in s.topics]
+        for subscription in targets:
+            subscription.deliver(message)
+
+    def publish(self, topic: str, message: str):
+        self.dispatch(topic, message)
+
+class RedisBroker(LocalBroker):
+    """Publica no Redis; cada worker escuta o canal e entrega às suas conexões."""
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis
+        # Timeouts curtos: publish roda no caminho de escrita e não pode segurar a requisição
+        self._redis = redis.Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        # O listener fica bloqueado esperando mensagens: sem timeout de leitura, com health check
+        self._pubsub_redis = redis.Redis.from_url(url, socket_connect_timeout=0.5, health_check_interval=30)
+        self._listener = None
+        self._down_until = 0.0
+
+    def _listen(self, on_connected):
+        pubsub = self._pubsub_redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.psubscribe(REDIS_CHANNEL_PREFIX + "*")
+            on_connected()
+            for item in pubsub.listen():
+                channel = item["channel"].decode()
+                data = item["data"].decode() if isinstance(item["data"], bytes) else item["data"]
+                self.dispatch(channel[len(REDIS_CHANNEL_PREFIX):], data)
+        finally:
+            pubsub.close()
+
+    def _run_listener(self):
+        failures = 0
+
+        def on_connected():
+            nonlocal failures
+            if failures:
+                logger.info("Conexão de eventos com o Redis restabelecida")
+            failures = 0
+
+        while True:
+            try:
+                self._listen(on_connected)
+            except Exception as e:
+                failures += 1
+                delay = min(LISTENER_MAX_BACKOFF, 2 ** (failures - 1))
+                # Um aviso por queda; as tentativas seguintes só em debug
+                log = logger.warning if failures == 1 else logger.debug
+                log(f"Conexão de eventos com o Redis perdida ({e}); nova tentativa em {delay}s")
+                time.sleep(delay)
+
+    def subscribe(self, topics, maxsize: int = EVENTS_QUEUE_SIZE) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._run_listener, name="events-redis", daemon=True)
+                self._listener.start()
+        return super().subscribe(topics, maxsize)
+
+    def publish(self, topic: str, message: str):
+        """Melhor esforço: com o Redis fora, entrega só neste processo até a próxima tentativa."""
+        if time.monotonic() >= self._down_until:
+            try:
+                self._redis.publish(REDIS_CHANNEL_PREFIX + topic, message)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Falha ao publicar evento no Redis ({e}); entregando só neste processo "
+                    f"por {REDIS_RETRY_SECONDS}s"
+                )
+                self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        self.dispatch(topic, message)
+
+broker = RedisBroker(EVENTS_REDIS_URL) if EVENTS_REDIS_URL else LocalBroker()
+
+def is_shared() -> bool:
+    """Os eventos publicados em outro processo (ex.: worker do Celery) chegam a este?"""
+    return isinstance(broker, RedisBroker)
+
+def publish(topic: str, event_type: str, data: dict):
+    """Publica um evento; nunca propaga erro para o caminho de escrita."""
+    try:
+        message = json.dumps({"type": event_type, "data": data}, default=_json_default, ensure_ascii=False)
+        broker.publish(topic, message)
+    except Exception:
+        logger.exception(f"Falha ao publicar evento {event_type} em {topic}")
+
+def format_sse(message: str) -> str:
+    event_type = json.loads(message)["type"]
+    return f"event: {event_type}\ndata: {message}\n\n"
+
+async def sse_stream(request, topics, heartbeat: float = None):
+    """Gerador SSE: entrega os eventos dos tópicos e envia heartbeat quando ocioso."""
+    heartbeat = EVENTS_HEARTBEAT_SECONDS if heartbeat is None else heartbeat
+    subscription = broker.subscribe(topics)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if message is OVERFLOW:
+                yield "event: overflow\ndata: {}\n\n"
+                break
+            yield format_sse(message)
+    finally:
+        broker.unsubscribe(subscription)
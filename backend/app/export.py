@@ -0,0 +1,91 @@
+# backend/app/export.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from . import models
+
+# Linhas lidas do banco por lote (yield_per) e enviadas por bloco na resposta
+BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CHECKIN_COLUMNS = (
+    models.CheckIn.id,
+    models.CheckIn.user_id,
+    models.CheckIn.challenge_id,
+    models.CheckIn.timestamp,
+    models.CheckIn.duration,
+    models.CheckIn.description,
+)
+
+WEEKLY_POINTS_COLUMNS = (
+    models.WeeklyPoints.user_id,
+    models.WeeklyPoints.week_start,
+    models.WeeklyPoints.week_end,
+    models.WeeklyPoints.checkin_count,
+    models.WeeklyPoints.points,
+)
+
+def checkins_statement(user_id: int = None, challenge_id: int = None):
+    statement = select(*CHECKIN_COLUMNS)
+    if user_id is not None:
+        statement = statement.where(models.CheckIn.user_id == user_id)
+    if challenge_id is not None:
+        statement = statement.where(models.CheckIn.challenge_id == challenge_id)
+    return statement.order_by(models.CheckIn.timestamp, models.CheckIn.id)
+
+def weekly_points_statement(user_id: int = None):
+    statement = select(*WEEKLY_POINTS_COLUMNS)
+    if user_id is not None:
+        statement = statement.where(models.WeeklyPoints.user_id == user_id)
+    return statement.order_by(models.WeeklyPoints.user_id, models.WeeklyPoints.week_start)
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} não é serializável")
+
+def iter_export(session_factory, statement, fmt: str, batch_size: int = BATCH_SIZE):
+    """Gera o export em blocos, lendo o resultado com yield_per.
+
+    Abre a própria sessão porque o gerador é consumido depois que a rota retorna;
+    a memória fica limitada a um lote independentemente do total de linhas.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        columns = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        for partition in result.partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+                    for row in partition
+                )
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+                    for row in partition
+                )
+    finally:
+        db.close()
+
+def streaming_export(session_factory, statement, fmt: str, filename: str):
+    return StreamingResponse(
+        iter_export(session_factory, statement, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
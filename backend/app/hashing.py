@@ -0,0 +1,70 @@
+# backend/app/hashing.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class HashingQueueFull(Exception):
+    """Fila do executor de hashing cheia: a requisição deve ser recusada (503)."""
+
+class HashingExecutor:
+    """Executor dedicado e limitado para trabalho de CPU caro (bcrypt).
+
+    Mantém o hashing fora do threadpool do Starlette, para que uma rajada de
+    logins não trave as demais rotas síncronas. Aceita no máximo ``max_pending``
+    tarefas (rodando + na fila) e registra métricas de fila e latência.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingQueueFull()
+            self.pending += 1
+        enqueued_at = time.monotonic()
+
+        def job():
+            started_at = time.monotonic()
+            with self._lock:
+                self.running += 1
+                self.wait_seconds_total += started_at - enqueued_at
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.run_seconds_total += time.monotonic() - started_at
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "queued": self.pending - self.running,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds_total / done * 1000, 2),
+                "avg_run_ms": round(self.run_seconds_total / done * 1000, 2),
+            }
@@ -0,0 +1,53 @@
+# import_checkins.py
+"""Importa check-ins em lote a partir de um arquivo NDJSON ou CSV.
+
+Uso:
+    python import_checkins.py checkins.ndjson [--format csv] [--batch-size 1000]
+
+O formato vem da extensão (.csv ou .ndjson/.jsonl) quando --format não é informado.
+Colunas/campos: user_id (ou username), timestamp, duration, description, challenge_id.
+Tudo entra em uma transação: as linhas inválidas são listadas e as válidas só ficam
+gravadas se a importação terminar. Imprime o progresso e a vazão a cada lote.
+"""
+import argparse
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from app.database import SessionLocal
+from app import bulk_import
+
+def print_progress(report):
+    rate = report.imported / report.elapsed if report.elapsed else 0
+    print(f"  {report.received} lidas, {report.imported} inseridas, {report.rejected} rejeitadas "
+          f"({rate:.0f} linhas/s)", end="\r", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=bulk_import.IMPORT_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=bulk_import.BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as lines:
+            report = bulk_import.import_checkins(db, lines, fmt, args.batch_size, progress=print_progress)
+    finally:
+        db.close()
+
+    result = report.as_dict()
+    print()
+    for error in result["errors"]:
+        print(f"linha {error['line']}: {error['error']}")
+    if report.rejected > len(result["errors"]):
+        print(f"... e mais {report.rejected - len(result['errors'])} linhas rejeitadas")
+    print(f"{result['imported']} check-ins importados de {result['received']} linhas em {result['elapsed_seconds']}s "
+          f"({result['rows_per_second']} linhas/s); {result['weeks_rescored']} semanas e "
+          f"{result['challenges_rescored']} desafios repontuados")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# loadtest_async.py
+"""Compara a vazão das rotas quentes entre o modo síncrono e o assíncrono.
+
+Suba duas instâncias da API, uma com DATABASE_ASYNC=0 e outra com DATABASE_ASYNC=1:
+
+    DATABASE_ASYNC=0 uvicorn app.main:app --port 8000
+    DATABASE_ASYNC=1 uvicorn app.main:app --port 8001
+
+e rode:
+
+    python loadtest_async.py --sync-url http://localhost:8000 --async-url http://localhost:8001 \\
+        [--token JWT] [--user-id 1] [--challenge-id 1] [--concurrency 50] [--requests 2000]
+
+Para cada instância imprime requisições/s, p50/p95 de latência e erros por rota.
+Com --url mede uma única instância.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+def hot_paths(user_id: int, challenge_id: int = None, authenticated: bool = False):
+    paths = [
+        "/ranking/",
+        "/ranking/weekly",
+        "/ranking/overall",
+        f"/users/{user_id}/checkins/",
+        f"/users/{user_id}/checkins/week/",
+    ]
+    if authenticated:
+        paths.append("/notifications/unread-count")
+        if challenge_id is not None:
+            paths.append(f"/challenges/{challenge_id}/ranking")
+    return paths
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_path(client, path: str, concurrency: int, total: int):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            began = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    return {
+        "rps": total / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+async def run_instance(label: str, base_url: str, paths, args):
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        # Aquecimento: abre conexões e popula caches antes de medir
+        for path in paths:
+            await client.get(path)
+        print(f"\n=== {label} ({base_url}) ===")
+        for path in paths:
+            stats = await run_path(client, path, args.concurrency, args.requests)
+            results[path] = stats
+            print(f"{path:45} {stats['rps']:9.1f} req/s  p50 {stats['p50']:7.1f} ms  "
+                  f"p95 {stats['p95']:7.1f} ms  erros {stats['errors']}")
+    return results
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="mede só esta instância")
+    parser.add_argument("--sync-url", default="http://localhost:8000")
+    parser.add_argument("--async-url", default="http://localhost:8001")
+    parser.add_argument("--token", help="JWT para as rotas autenticadas")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--challenge-id", type=int)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="requisições por rota")
+    args = parser.parse_args()
+
+    paths = hot_paths(args.user_id, args.challenge_id, authenticated=bool(args.token))
+    if args.url:
+        await run_instance("instância", args.url, paths, args)
+        return
+
+    sync_results = await run_instance("síncrono", args.sync_url, paths, args)
+    async_results = await run_instance("assíncrono", args.async_url, paths, args)
+
+    print("\n=== Comparação (assíncrono / síncrono) ===")
+    for path in paths:
+        ratio = async_results[path]["rps"] / sync_results[path]["rps"]
+        print(f"{path:45} {ratio:6.2f}x req/s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,94 @@
+import os
 import time
 import logging
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from . import metrics
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("debug.middleware")
 
+# Requisições acima disso vão para o log com as consultas mais caras
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_TOP_QUERIES = 5
+# Tamanho máximo de cada statement no log de requisições lentas
+STATEMENT_LOG_LENGTH = 300
+
+METRICS_PATH = "/metrics"
+
+def request_path(scope: Scope) -> str:
+    """Caminho da requisição sem o root_path (app servida atrás de um prefixo)."""
+    path = scope.get("path", "")
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):] or "/"
+    return path
+
+def route_label(scope: Scope) -> str:
+    """Template da rota (ex.: /challenges/{challenge_id}), para não abrir uma série por id."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
 class LoggingMiddleware:
-    def __init__(self, app: ASGIApp):
+    """Instrumentação das requisições HTTP.
+
+    Mede latência, status, tamanho da resposta e as consultas SQL de cada requisição
+    (ver metrics.py), publica em /metrics e registra as requisições lentas com as
+    consultas que mais pesaram. Em respostas em streaming (SSE, exportações) a
+    latência vai até o primeiro pedaço do corpo: a duração do stream não é lentidão.
+    """
+
+    def __init__(self, app: ASGIApp, slow_request_seconds: float = SLOW_REQUEST_SECONDS):
         self.app = app
+        self.slow_request_seconds = slow_request_seconds
+        metrics.instrument_engines()
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
-        if scope["type"] == "http":
-            method = scope.get("method")
-            path = scope.get("path")
-            logger.debug(f"Incoming request: {method} {path}")
-        await self.app(scope, receive, send)
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope.get("method")
+        path = scope.get("path")
+        logger.debug(f"Incoming request: {method} {path}")
+        if request_path(scope) == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        status_code = 500
+        size = 0
+        first_chunk_at = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, size, first_chunk_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if first_chunk_at is None and message.get("more_body", False):
+                    first_chunk_at = time.perf_counter()
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (first_chunk_at or time.perf_counter()) - started
+            metrics.current_request.reset(token)
+            route = route_label(scope)
+            slow = elapsed >= self.slow_request_seconds
+            metrics.registry.observe_request(method, route, status_code, elapsed, size, stats, slow)
+            logger.debug(f"{method} {path} {status_code} {elapsed * 1000:.1f} ms, {size} bytes, "
+                         f"{stats.queries} queries ({stats.db_seconds * 1000:.1f} ms)")
+            if slow:
+                self.log_slow_request(method, path, route, status_code, elapsed, stats)
+
+    def log_slow_request(self, method, path, route, status_code, elapsed, stats: metrics.RequestStats):
+        lines = [
+            f"Slow request: {method} {path} ({route}) {status_code} in {elapsed * 1000:.1f} ms, "
+            f"{stats.queries} queries ({stats.db_seconds * 1000:.1f} ms in the database)"
+        ]
+        for seconds, count, statement in stats.top_queries(SLOW_REQUEST_TOP_QUERIES):
+            statement = " ".join(statement.split())[:STATEMENT_LOG_LENGTH]
+            lines.append(f"  {seconds * 1000:.1f} ms / {count}x  {statement}")
+        logger.warning("\n".join(lines))
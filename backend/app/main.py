@@ -7,7 +7,7 @@ import os
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.dirname(SCRIPT_DIR))
 
-from app.database import engine, Base
+from app.database import engine, Base, ASYNC_DATABASE
 from app.logger_middleware import LoggingMiddleware
 
 from app import routes
@@ -26,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 static_dir = os.path.join(os.getcwd(), "static")
@@ -34,4 +35,9 @@ if not os.path.exists(static_dir):
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+if ASYNC_DATABASE:
+    # Versões async das rotas quentes; incluídas antes para ter prioridade no roteamento
+    from app import async_routes
+    app.include_router(async_routes.router)
+
 app.include_router(routes.router)
@@ -0,0 +1,179 @@
+# backend/app/metrics.py
+"""Métricas das requisições HTTP no formato de texto do Prometheus (GET /metrics).
+
+O LoggingMiddleware registra por rota a latência, o tamanho da resposta e quantas
+consultas SQL a requisição fez (e quanto tempo elas levaram). As consultas são medidas
+por eventos do SQLAlchemy em todas as Engines, inclusive a sync_engine por trás da
+AsyncEngine, e atribuídas à requisição corrente por um ContextVar, que acompanha as
+rotas síncronas no threadpool.
+
+Os valores ficam em memória, por processo: com vários workers do uvicorn cada um
+expõe os seus.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# GET /metrics exige "Authorization: Bearer <METRICS_TOKEN>"; sem token responde 404
+# (a API é pública), exceto com APP_ENV=test
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+class RequestStats:
+    """Consultas SQL de uma requisição, agregadas por statement."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = {}
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        entry = self.statements.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def top_queries(self, limit: int = 5):
+        """(tempo total, execuções, statement) dos statements mais caros."""
+        ranked = sorted(
+            ((seconds, count, statement) for statement, (count, seconds) in self.statements.items()),
+            reverse=True
+        )
+        return ranked[:limit]
+
+current_request: ContextVar = ContextVar("current_request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+_instrumented = False
+
+def instrument_engines():
+    """Liga a contagem de consultas em todas as Engines (idempotente)."""
+    global _instrumented
+    if not _instrumented:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _instrumented = True
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_number(value)}"
+
+INF_LABEL = 'le="+Inf"'
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        # labels -> [contagem por bucket (não cumulativa), soma, total]
+        self.values = {}
+
+    def observe(self, labels, value):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * len(self.buckets), 0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labels, labels, f'le="{_format_number(float(bound))}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labels, labels, INF_LABEL)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_number(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {count}"
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Latência das requisições HTTP.",
+            LATENCY_BUCKETS, ("method", "route", "status")
+        )
+        self.response_size = Histogram(
+            "http_response_size_bytes", "Tamanho do corpo das respostas HTTP.",
+            SIZE_BUCKETS, ("method", "route")
+        )
+        self.db_queries = Histogram(
+            "http_request_db_queries", "Consultas SQL por requisição.",
+            QUERY_COUNT_BUCKETS, ("method", "route")
+        )
+        self.db_duration = Histogram(
+            "http_request_db_duration_seconds", "Tempo total em consultas SQL por requisição.",
+            LATENCY_BUCKETS, ("method", "route")
+        )
+        self.slow_requests = Counter(
+            "http_slow_requests_total", "Requisições acima do limite do log de lentas.", ("method", "route")
+        )
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, size: int,
+                        stats: RequestStats, slow: bool = False):
+        with self._lock:
+            self.request_duration.observe((method, route, str(status)), seconds)
+            self.response_size.observe((method, route), size)
+            self.db_queries.observe((method, route), stats.queries)
+            self.db_duration.observe((method, route), stats.db_seconds)
+            if slow:
+                self.slow_requests.inc((method, route))
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for metric in (self.request_duration, self.response_size, self.db_queries,
+                           self.db_duration, self.slow_requests):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
@@ -1,139 +1,58 @@
 # migrate_challenge_points.py
-from sqlalchemy import create_engine, func, Index
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime, timedelta
+"""Backfill retomável da tabela challenge_points a partir dos check-ins.
+
+Uso:
+    python migrate_challenge_points.py [--challenge-id 3] [--since 2025-01-01] [--batch-size 20] [--restart]
+
+Processa os desafios em lotes: grava as semanas de cada participante (upsert em
+bloco), remove as semanas sem check-ins e atualiza progresso e pontos dos participantes
+aprovados. Cada lote é commitado junto com o checkpoint (tabela backfill_checkpoints):
+se a execução cair, rodar de novo com o mesmo escopo continua do último lote.
+--restart recomeça do início; um backfill já concluído só roda de novo com --restart.
+"""
+import argparse
 import logging
 import os
 import sys
+from datetime import datetime
 
-# Adicione o diretório atual ao path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
 
-# Importe seus modelos
-from models import Challenge, ChallengeParticipant, CheckIn, ChallengeRules, ChallengePoints, Base
-from database import engine 
+from app.database import SessionLocal
+from app import backfill
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def print_progress(checkpoint):
+    logger.info(f"Desafios até o id {checkpoint.last_key}: {checkpoint.processed} processados, "
+                f"{checkpoint.rows_written} linhas gravadas")
 
-def get_period_boundaries(timestamp):
-    """Obtém domingo (início) e sábado (fim) da semana para uma data."""
-    start = timestamp - timedelta(days=(timestamp.weekday() + 1) % 7)  # Move para domingo anterior
-    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
-    end = start + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999)  # Sábado fim
-    return start, end
-
-def calculate_challenge_points(checkin_count, rules):
-    """Calcula pontos baseado nas regras específicas do desafio."""
-    if not rules or checkin_count < rules.min_threshold:
-        return 0
-    
-    base_points = rules.min_points
-    additional_count = max(0, checkin_count - rules.min_threshold)
-    additional_points = (additional_count // rules.additional_unit) * rules.additional_points
-    
-    return base_points + additional_points
-
-def migrate_challenge_points():
-    """Migra pontos de desafios existentes para a nova tabela challenge_points."""
+def migrate_challenge_points(challenge_id: int = None, since: datetime = None,
+                             batch_size: int = backfill.BATCH_SIZE, restart: bool = False):
+    """Migra (ou retoma a migração de) pontos de desafios para a tabela challenge_points."""
     db = SessionLocal()
     try:
         logger.info("Iniciando migração de pontos para a tabela challenge_points")
-        
-        # Obtém todos os desafios
-        challenges = db.query(Challenge).all()
-        logger.info(f"Processando {len(challenges)} desafios")
-        
-        for challenge in challenges:
-            logger.info(f"Desafio {challenge.id}: {challenge.title}")
-            rules = db.query(ChallengeRules).filter(
-                ChallengeRules.challenge_id == challenge.id
-            ).first()
-            
-            # Obtém todos os participantes aprovados
-            participants = db.query(ChallengeParticipant).filter(
-                ChallengeParticipant.challenge_id == challenge.id,
-                ChallengeParticipant.approved == True
-            ).all()
-            logger.info(f"Processando {len(participants)} participantes")
-            
-            for participant in participants:
-                # Obtém todos os check-ins deste usuário para este desafio
-                checkins = db.query(CheckIn).filter(
-                    CheckIn.user_id == participant.user_id,
-                    CheckIn.challenge_id == challenge.id
-                ).order_by(CheckIn.timestamp).all()
-                
-                if not checkins:
-                    logger.info(f"Usuário {participant.user_id}: nenhum check-in encontrado")
-                    continue
-                
-                # Agrupa check-ins por período (semana)
-                grouped_checkins = {}
-                total_points = 0
-                
-                for checkin in checkins:
-                    period_start, period_end = get_period_boundaries(checkin.timestamp)
-                    period_key = period_start.isoformat()
-                    
-                    if period_key not in grouped_checkins:
-                        grouped_checkins[period_key] = {
-                            "start": period_start,
-                            "end": period_end,
-                            "count": 0
-                        }
-                    
-                    grouped_checkins[period_key]["count"] += 1
-                
-                # Cria registros de pontuação para cada período
-                for period_key, period_data in grouped_checkins.items():
-                    checkin_count = period_data["count"]
-                    
-                    # Calcula pontos
-                    if rules:
-                        points = calculate_challenge_points(checkin_count, rules)
-                    else:
-                        # Fallback para regra padrão
-                        points = checkin_count * 5
-                    
-                    total_points += points
-                    
-                    # Verifica se já existe registro para este período
-                    existing = db.query(ChallengePoints).filter(
-                        ChallengePoints.challenge_id == challenge.id,
-                        ChallengePoints.user_id == participant.user_id,
-                        ChallengePoints.period_start == period_data["start"]
-                    ).first()
-                    
-                    if existing:
-                        existing.checkin_count = checkin_count
-                        existing.points = points
-                    else:
-                        # Cria novo registro
-                        new_record = ChallengePoints(
-                            challenge_id=challenge.id,
-                            user_id=participant.user_id,
-                            period_start=period_data["start"],
-                            period_end=period_data["end"],
-                            checkin_count=checkin_count,
-                            points=points
-                        )
-                        db.add(new_record)
-                
-                # Atualiza pontos totais do participante
-                participant.challenge_points = total_points
-                logger.info(f"Usuário {participant.user_id}: {len(checkins)} check-ins, {total_points} pontos totais")
-        
-        db.commit()
-        logger.info("Migração de pontos concluída")
+        job = backfill.ChallengePointsBackfill(challenge_id=challenge_id, since=since)
+        checkpoint = backfill.run(db, job, batch_size=batch_size, restart=restart, progress=print_progress)
+        logger.info(f"Migração de pontos concluída: {checkpoint.processed} desafios, "
+                    f"{checkpoint.rows_written} linhas gravadas")
     except Exception as e:
-        db.rollback()
-        logger.error(f"Erro durante a migração: {e}")
+        logger.error(f"Erro durante a migração (rode de novo para retomar): {e}")
         raise
     finally:
         db.close()
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--challenge-id", type=int)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="refaz só as semanas a partir desta data")
+    parser.add_argument("--batch-size", type=int, default=backfill.BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignora o checkpoint e recomeça do início")
+    args = parser.parse_args()
+    migrate_challenge_points(args.challenge_id, args.since, args.batch_size, args.restart)
+
 if __name__ == "__main__":
-    migrate_challenge_points()
+    main()
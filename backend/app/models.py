@@ -1,5 +1,6 @@
 import random
 import string
+from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -15,6 +16,27 @@ class WeeklyPoints(Base):
     points = Column(Integer, default=0)            # Calculated points for the week
     user = relationship("User", back_populates="weekly_points")
 
+    __table_args__ = (
+        Index('uq_weekly_points_user_week', "user_id", "week_start", unique=True),
+        Index('idx_weekly_points_week_count', "week_start", "checkin_count"),
+    )
+
+class WeeklyLeaderboard(Base):
+    __tablename__ = "weekly_leaderboard"
+    id = Column(Integer, primary_key=True, index=True)
+    week_start = Column(DateTime, nullable=False)  # Sunday of the week
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    rank = Column(Integer, nullable=False)          # Rank with ties (1, 1, 3, ...)
+    weekly_score = Column(Integer, default=0)       # Check-ins in the week
+    username = Column(String)                       # Copied from users to avoid the join on reads
+    profile_image = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index('idx_weekly_leaderboard_week_rank', "week_start", "rank"),
+        # Uma linha por usuário e semana: alvo do upsert incremental do check-in
+        Index('uq_weekly_leaderboard_week_user', "week_start", "user_id", unique=True),
+    )
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -28,17 +50,31 @@ class User(Base):
     weekly_points = relationship("WeeklyPoints", back_populates="user")
     created_challenges = relationship("Challenge", back_populates="creator")
 
+    # get_user_by_username compara lower(username)
+    __table_args__ = (
+        Index('ix_users_username_lower', func.lower(username)),
+    )
+
 class CheckIn(Base):
     __tablename__ = "checkins"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     # Novo campo para vincular o checkin a um desafio; permite nulo para checkins gerais
     challenge_id = Column(Integer, ForeignKey("challenges.id"), nullable=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Default no Python (UTC, com microssegundos): no SQLite o CURRENT_TIMESTAMP grava só até
+    # os segundos, em outro formato de texto, e a paginação por (timestamp, id) compara texto
+    timestamp = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
     duration = Column(Float, nullable=True)
     description = Column(Text, nullable=True)
     challenge_id = Column(Integer, ForeignKey("challenges.id"), nullable=True)
 
+    # Índices compostos para os caminhos quentes (pontos semanais, histórico, desafios)
+    __table_args__ = (
+        Index('idx_checkins_user_timestamp', "user_id", "timestamp"),
+        Index('idx_checkins_challenge_user', "challenge_id", "user_id"),
+        Index('idx_checkins_challenge_timestamp', "challenge_id", "timestamp"),
+    )
+
 
 class WeeklyUpdate(Base):
     __tablename__ = "weekly_updates"
@@ -47,6 +83,11 @@ class WeeklyUpdate(Base):
     week_end = Column(DateTime, nullable=False)
     processed_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        # Uma linha por semana fechada: é o checkpoint do fechamento semanal
+        Index('uq_weekly_updates_week_start', "week_start", unique=True),
+    )
+
 def generate_challenge_code(length=6):
     return ''.join(random.choices(string.ascii_uppercase, k=length))
 
@@ -110,7 +151,7 @@ class ChallengePoints(Base):
     
     # Índices compostos para consultas eficientes
     __table_args__ = (
-        Index('idx_challenge_points_user_period', "challenge_id", "user_id", "period_start"),
+        Index('idx_challenge_points_user_period', "challenge_id", "user_id", "period_start", unique=True),
     )
 class Achievement(Base):
     __tablename__ = "achievements"
@@ -138,8 +179,40 @@ class Notification(Base):
     type = Column(String, nullable=False)  # "invite", "checkin", "achievement", etc.
     message = Column(Text, nullable=False)
     read = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=func.now())
+    # Mesmo formato dos cursores da caixa de entrada (ver CheckIn.timestamp)
+    created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", foreign_keys=[user_id], backref="notifications")
     related_user = relationship("User", foreign_keys=[related_user_id])
-    challenge = relationship("Challenge")
\ No newline at end of file
+    challenge = relationship("Challenge")
+
+    # Caixa de entrada e contagem de não lidas por usuário
+    __table_args__ = (
+        Index('idx_notifications_user_read_created', "user_id", "read", "created_at"),
+    )
+
+class DataVersion(Base):
+    """Contador de versão por recurso lido com ETag (ex.: "ranking", "challenge:3").
+
+    Incrementado pelas escritas na mesma transação dos dados (ver versions.py).
+    """
+    __tablename__ = "data_versions"
+    key = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+class BackfillCheckpoint(Base):
+    """Progresso de um backfill retomável (ver backfill.py): uma linha por job.
+
+    ``last_key`` é a última chave processada e commitada junto com o lote; ``scope``
+    guarda os parâmetros da execução (JSON) para não retomar com um escopo diferente.
+    """
+    __tablename__ = "backfill_checkpoints"
+    name = Column(String, primary_key=True)
+    scope = Column(Text, nullable=True)
+    last_key = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    rows_written = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
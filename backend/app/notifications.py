@@ -0,0 +1,199 @@
+# backend/app/notifications.py
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, func
+from sqlalchemy.orm import Session
+from . import models, database, events, versions
+from .pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+# Broker do Celery; vazio desativa o Celery e usa só a fila em processo
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
+
+# Notificações lidas mais antigas que isso são removidas pela limpeza periódica
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+
+def fan_out(db: Session, user_ids, message: str, type: str, related_user_id: int = None, challenge_id: int = None):
+    """Cria a mesma notificação para vários usuários com um único INSERT em lote. Não faz commit.
+
+    Devolve as linhas criadas (id, user_id, read, created_at), na ordem de user_ids.
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "related_user_id": related_user_id,
+            "challenge_id": challenge_id,
+            "type": type,
+            "message": message,
+            "read": False,
+        }
+        for user_id in user_ids
+    ]
+    if not rows:
+        return []
+    statement = insert(models.Notification).returning(
+        models.Notification.id,
+        models.Notification.user_id,
+        models.Notification.read,
+        models.Notification.created_at,
+        sort_by_parameter_order=True
+    )
+    created = db.execute(statement, rows).all()
+    versions.bump(db, *[versions.user_notifications_key(user_id) for user_id in user_ids])
+    return created
+
+def notify_challenge_checkin(db: Session, challenge_id: int, related_user_id: int, message: str):
+    """Notifica os demais participantes aprovados do desafio em uma transação."""
+    participant_ids = [
+        user_id for user_id, in db.query(models.ChallengeParticipant.user_id).filter(
+            models.ChallengeParticipant.challenge_id == challenge_id,
+            models.ChallengeParticipant.user_id != related_user_id,
+            models.ChallengeParticipant.approved == True
+        )
+    ]
+    created = fan_out(db, participant_ids, message, "checkin",
+                      related_user_id=related_user_id, challenge_id=challenge_id)
+    db.commit()
+    # Mesmo payload de routes.create_notification
+    for notification in created:
+        events.publish(events.user_topic(notification.user_id), "notification", {
+            "id": notification.id,
+            "user_id": notification.user_id,
+            "related_user_id": related_user_id,
+            "challenge_id": challenge_id,
+            "type": "checkin",
+            "message": message,
+            "read": notification.read,
+            "created_at": notification.created_at
+        })
+    return len(created)
+
+def get_inbox(db: Session, user_id: int, limit: int = 20, cursor: str = None, unread_only: bool = False):
+    """Página da caixa de entrada, mais recentes primeiro. Retorna (itens, next_cursor)."""
+    query = db.query(models.Notification).filter(models.Notification.user_id == user_id)
+    if unread_only:
+        query = query.filter(models.Notification.read == False)
+    return keyset_page(query, models.Notification.created_at, models.Notification.id, cursor, limit)
+
+def unread_count(db: Session, user_id: int) -> int:
+    return db.query(func.count(models.Notification.id)).filter(
+        models.Notification.user_id == user_id,
+        models.Notification.read == False
+    ).scalar()
+
+def mark_all_read(db: Session, user_id: int) -> int:
+    updated = db.query(models.Notification).filter(
+        models.Notification.user_id == user_id,
+        models.Notification.read == False
+    ).update({models.Notification.read: True}, synchronize_session=False)
+    if updated:
+        versions.bump(db, versions.user_notifications_key(user_id))
+    db.commit()
+    return updated
+
+def prune_read_notifications(db: Session, older_than_days: int = None, batch_size: int = 5000) -> int:
+    """Remove notificações já lidas e antigas em lotes curtos, cada um com seu commit."""
+    days = NOTIFICATION_RETENTION_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = 0
+    while True:
+        ids = [
+            notification_id for notification_id, in db.query(models.Notification.id).filter(
+                models.Notification.read == True,
+                models.Notification.created_at < cutoff
+            ).limit(batch_size)
+        ]
+        if not ids:
+            break
+        db.query(models.Notification).filter(models.Notification.id.in_(ids)).delete(synchronize_session=False)
+        versions.bump(db, versions.NOTIFICATIONS)
+        db.commit()
+        removed += len(ids)
+    logger.info(f"Notificações removidas pela retenção: {removed}")
+    return removed
+
+class _LocalQueue:
+    """Fila em processo usada quando o Celery/Redis não está disponível."""
+
+    def __init__(self, session_factory, maxsize: int = 1000):
+        self.session_factory = session_factory
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="notifications", daemon=True)
+                self._thread.start()
+
+    def _work(self):
+        while True:
+            args = self._queue.get()
+            try:
+                self.run(*args)
+            except Exception:
+                logger.exception("Falha ao enviar notificações de check-in")
+            finally:
+                self._queue.task_done()
+
+    def run(self, *args):
+        db = self.session_factory()
+        try:
+            notify_challenge_checkin(db, *args)
+        finally:
+            db.close()
+
+    def put(self, *args):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            # Fila cheia: processa na própria requisição em vez de perder as notificações
+            self.run(*args)
+
+    def join(self):
+        self._queue.join()
+
+local_queue = _LocalQueue(lambda: database.SessionLocal())
+
+# Depois de uma falha no broker, evita tentar de novo por este tempo (segundos)
+CELERY_RETRY_AFTER = 60
+
+_celery_app = None
+_celery_down_until = 0.0
+
+def _celery():
+    global _celery_app
+    if _celery_app is None:
+        from celery import Celery
+        _celery_app = Celery("tasks", broker=CELERY_BROKER_URL)
+        # Falha rápido se o Redis não responder, em vez de segurar a requisição
+        _celery_app.conf.broker_connection_timeout = 1
+        _celery_app.conf.broker_transport_options = {"socket_connect_timeout": 1, "max_retries": 0}
+    return _celery_app
+
+def dispatch_challenge_checkin(challenge_id: int, related_user_id: int, message: str):
+    """Envia o fan-out para o worker do Celery, ou para a fila local se o broker não responder.
+
+    Sem barramento de eventos compartilhado o fan-out fica sempre na fila local: os
+    eventos "notification" publicados pelo worker do Celery se perderiam.
+    """
+    global _celery_down_until
+    if CELERY_BROKER_URL and events.is_shared() and time.monotonic() >= _celery_down_until:
+        try:
+            _celery().send_task(
+                "tasks.notify_challenge_checkin",
+                args=(challenge_id, related_user_id, message),
+                retry=False
+            )
+            return
+        except Exception as e:
+            _celery_down_until = time.monotonic() + CELERY_RETRY_AFTER
+            logger.warning(f"Celery indisponível ({e}); usando fila local de notificações")
+    local_queue.put(challenge_id, related_user_id, message)
@@ -0,0 +1,67 @@
+# backend/app/pagination.py
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+# Limite rígido de itens por página em qualquer endpoint paginado
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Gera um cursor opaco a partir da posição (timestamp, id) do último item."""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Inverte encode_cursor. Lança ValueError para cursores inválidos."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Cursor inválido") from e
+
+def apply_keyset(query, timestamp_column, id_column, cursor: str = None, limit: int = 10,
+                 descending: bool = True):
+    """Aplica filtro, ordem e LIMIT de keyset a uma Query ou a um select().
+
+    Busca um item a mais para saber se existe próxima página (ver split_page).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                timestamp_column < timestamp,
+                and_(timestamp_column == timestamp, id_column < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                timestamp_column > timestamp,
+                and_(timestamp_column == timestamp, id_column > row_id)
+            ))
+
+    if descending:
+        query = query.order_by(timestamp_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(timestamp_column.asc(), id_column.asc())
+    return query.limit(limit + 1), limit
+
+def split_page(rows, limit: int, key):
+    """Corta o item extra buscado por apply_keyset e gera o next_cursor."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*key(rows[-1]))
+    return rows, next_cursor
+
+def keyset_page(query, timestamp_column, id_column, cursor: str = None, limit: int = 10,
+                descending: bool = True, key=None):
+    """Pagina ``query`` por (timestamp, id) sem OFFSET.
+
+    Retorna (itens, next_cursor); next_cursor é None na última página.
+    ``key`` extrai (timestamp, id) de cada linha quando ela não é o próprio modelo.
+    """
+    key = key or (lambda row: (getattr(row, timestamp_column.key), getattr(row, id_column.key)))
+    query, limit = apply_keyset(query, timestamp_column, id_column, cursor, limit, descending)
+    return split_page(query.all(), limit, key)
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from datetime import datetime, timedelta
-import os, shutil
+import io, os, secrets, shutil
 import logging
-from . import schemas, crud, auth, database, models
+from . import schemas, crud, auth, database, models, export, notifications, events, cache, versions, bulk_import, metrics
 from .config import MIN_TRAINING_DAYS
+from .pagination import MAX_PAGE_SIZE
 
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
+from .hashing import HashingQueueFull
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -22,11 +26,27 @@ def get_db():
     finally:
         db.close()
 
+def check_not_modified(request: Request, response: Response, db: Session, keys, *extra):
+    """Validação condicional pelas versões de ``keys``; devolve o 304 ou None para seguir com a consulta."""
+    etag, last_modified = versions.current(db, keys, request.url.path, request.url.query, *extra)
+    return versions.not_modified(request, response, etag, last_modified)
+
 @router.post("/token", response_model=schemas.LoginResponse)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_username(db, form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # Rota assíncrona: o banco vai para o threadpool e o bcrypt para o executor dedicado
+    user = await run_in_threadpool(crud.get_user_by_username, db, form_data.username)
+    if not user:
         raise HTTPException(status_code=400, detail="Credenciais incorretas")
+    try:
+        valid, new_hash = await auth.verify_password_async(form_data.password, user.password_hash)
+    except HashingQueueFull:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente")
+    if not valid:
+        raise HTTPException(status_code=400, detail="Credenciais incorretas")
+    if new_hash:
+        # Custo do bcrypt mudou: regrava o hash sem migração em massa
+        user.password_hash = new_hash
+        await run_in_threadpool(db.commit)
     access_token = auth.create_access_token(data={"sub": user.username})
     return {
         "access_token": access_token,
@@ -46,11 +66,39 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if token_data is None or not token_data.username:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
     
-    user = crud.get_user_by_username(db, token_data.username)
+    user = crud.get_user_by_username_cached(db, token_data.username)
     if user is None:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     return user
 
+def get_current_user_short_session(token: str = Depends(oauth2_scheme)):
+    """get_current_user com uma sessão própria, fechada antes de a rota responder.
+
+    Para as rotas que devolvem streams longos (exportações): com get_db a conexão do
+    pool ficaria presa até o fim do stream, além da que o gerador já usa.
+    """
+    db = database.SessionLocal()
+    try:
+        return get_current_user(token, db)
+    finally:
+        db.close()
+
+
+@router.get("/admin/password-hashing")
+def password_hashing_metrics(current_user: schemas.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return auth.password_hasher.metrics()
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    # Sem METRICS_TOKEN o endpoint não existe (exceto com APP_ENV=test)
+    if not metrics.METRICS_TOKEN:
+        if database.APP_ENV != "test":
+            raise HTTPException(status_code=404, detail="Not Found")
+    elif not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {metrics.METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Não autorizado")
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 @router.get("/admin/users", response_model=list[schemas.User])
 def list_users(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
@@ -61,13 +109,16 @@ def list_users(db: Session = Depends(get_db), current_user: schemas.User = Depen
 
 ### Endpoint de registro de usuário
 @router.post("/register/", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_username(db, user.username)
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(crud.get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Usuário já existe")
     user.username = user.username.lower()
-    hashed_password = auth.get_password_hash(user.password)
-    return crud.create_user(db, user, hashed_password)
+    try:
+        hashed_password = await auth.get_password_hash_async(user.password)
+    except HashingQueueFull:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente")
+    return await run_in_threadpool(crud.create_user, db, user, hashed_password)
 
 ### Endpoint de login
 @router.post("/token", response_model=schemas.Token)
@@ -78,38 +129,112 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     access_token = auth.create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/users/{user_id}/checkins/period/")
+@router.get("/users/{user_id}/checkins/period/", response_model=list[schemas.CheckIn])
 def get_checkins_by_period(
     user_id: int, 
     start_date: datetime, 
     end_date: datetime, 
+    request: Request,
+    response: Response,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
     db: Session = Depends(get_db)
 ):
-    return db.query(models.CheckIn).filter(
-        models.CheckIn.user_id == user_id,
-        models.CheckIn.timestamp >= start_date,
-        models.CheckIn.timestamp <= end_date
-    ).all()
+    not_modified = check_not_modified(request, response, db, [versions.user_checkins_key(user_id)])
+    if not_modified:
+        return not_modified
+    # Paginação por cursor: a próxima página vem no cabeçalho X-Next-Cursor
+    try:
+        checkins, next_cursor = crud.get_checkins_by_period(db, user_id, start_date, end_date, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return checkins
     
-### Endpoint para obter checkins do usuário (lista paginada)
+### Endpoint para obter checkins do usuário (lista paginada por cursor, mais recentes primeiro)
 @router.get("/users/{user_id}/checkins/", response_model=list[schemas.CheckIn])
-def get_checkins(user_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_all_checkins_by_user(db, user_id, skip, limit)
+def get_checkins(
+    user_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    db: Session = Depends(get_db)
+):
+    not_modified = check_not_modified(request, response, db, [versions.user_checkins_key(user_id)])
+    if not_modified:
+        return not_modified
+    try:
+        checkins, next_cursor = crud.get_all_checkins_by_user(db, user_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return checkins
+
+### Exportação (NDJSON/CSV) em streaming
+def _check_export_format(format: str):
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato inválido (use ndjson ou csv)")
+
+@router.get("/users/{user_id}/export")
+def export_user_data(
+    user_id: int,
+    format: str = "ndjson",
+    dataset: str = "checkins",
+    current_user: schemas.User = Depends(get_current_user_short_session)
+):
+    if user_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Não autorizado")
+    _check_export_format(format)
+    if dataset == "checkins":
+        statement = export.checkins_statement(user_id=user_id)
+    elif dataset == "weekly_points":
+        statement = export.weekly_points_statement(user_id=user_id)
+    else:
+        raise HTTPException(status_code=400, detail="Conjunto de dados inválido")
+    return export.streaming_export(database.SessionLocal, statement, format, f"user_{user_id}_{dataset}")
 
 ### Endpoint para obter checkins de uma semana (calendário)
 @router.get("/users/{user_id}/checkins/week/", response_model=list[schemas.CheckIn])
-def get_weekly_checkins(user_id: int, week_offset: int = 0, db: Session = Depends(get_db)):
+def get_weekly_checkins(request: Request, response: Response, user_id: int, week_offset: int = 0, db: Session = Depends(get_db)):
     # week_offset=0: semana atual, -1: semana passada, etc.
     today = datetime.now()
     # calcula o domingo da semana atual
     start_of_week = today - timedelta(days=today.weekday()+1)
     start_of_week = start_of_week + timedelta(weeks=week_offset)
     end_of_week = start_of_week + timedelta(days=6)
+    # A semana entra no ETag: o mesmo week_offset aponta para outra semana depois da virada
+    not_modified = check_not_modified(
+        request, response, db, [versions.user_checkins_key(user_id)], start_of_week.date()
+    )
+    if not_modified:
+        return not_modified
     return crud.get_checkins_by_user_between(db, user_id, start_of_week, end_of_week)
 
+def user_payload(user):
+    """Campos de schemas.User como dict, para respostas guardadas no cache."""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "status": user.status,
+        "points": user.points,
+        "profile_image": user.profile_image
+    }
+
+def points_ranking_cache_key(limit: int):
+    return f"ranking:top:{limit}", [cache.USERS_TAG, cache.POINTS_RANKING_TAG]
+
 @router.get("/ranking/", response_model=list[schemas.User])
-def get_ranking(limit: int = 10, db: Session = Depends(get_db)):
-    return db.query(models.User).order_by(models.User.points.desc()).limit(limit).all()
+def get_ranking(request: Request, response: Response, limit: int = 10, db: Session = Depends(get_db)):
+    not_modified = check_not_modified(request, response, db, [versions.USERS, versions.RANKING])
+    if not_modified:
+        return not_modified
+    key, tags = points_ranking_cache_key(limit)
+    return cache.response_cache.get_or_set(
+        key, tags, lambda: [user_payload(u) for u in crud.get_ranking(db, limit)]
+    )
 
 @router.put("/users/me", response_model=schemas.User)
 def update_profile(
@@ -127,9 +252,15 @@ def update_profile(
             shutil.copyfileobj(file.file, f)
         backend_url = os.getenv("BACKEND_URL", "http://localhost:8000")
         current_user.profile_image = f"https://ultimoingresso.com.br/api/static/profile_images/{filename}"
+    previous_username = current_user.username
     if username:
         current_user.username = username
+    crud.sync_leaderboard_profile(db, current_user)
+    versions.bump(db, versions.USERS)
     db.commit()
+    cache.response_cache.invalidate(cache.USERS_TAG)
+    # Tokens antigos carregam o username anterior: não podem continuar resolvendo pelo cache
+    auth.user_id_cache.delete(previous_username.lower())
     db.refresh(current_user)
     return current_user
 
@@ -155,8 +286,10 @@ def create_challenge(
         approved=True
     )
     db.add(participant)
+    versions.bump(db, versions.challenge_key(db_challenge.id))
     db.commit()
     db.refresh(participant)
+    cache.response_cache.invalidate(cache.challenge_tag(db_challenge.id))
 
     return db_challenge
 
@@ -168,7 +301,19 @@ def list_challenges(db: Session = Depends(get_db), current_user: schemas.User =
     return db.query(models.Challenge).filter(models.Challenge.created_by == current_user.id).all()
 
 @router.get("/challenges/{challenge_id}", response_model=schemas.Challenge)
-def get_challenge(challenge_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+def get_challenge(
+    challenge_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    # O criador (schemas.User, com pontos) vem junto na resposta
+    not_modified = check_not_modified(
+        request, response, db, [versions.USERS, versions.RANKING, versions.challenge_key(challenge_id)]
+    )
+    if not_modified:
+        return not_modified
     challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
     if not challenge:
         raise HTTPException(status_code=404, detail="Desafio não encontrado")
@@ -191,6 +336,7 @@ def update_challenge(challenge_id: int, challenge: schemas.ChallengeCreate, db:
         data["duration_days"] = (data["end_date"].date() - data["start_date"].date()).days + 1
     for key, value in data.items():
         setattr(db_challenge, key, value)
+    versions.bump(db, versions.challenge_key(challenge_id))
     db.commit()
     db.refresh(db_challenge)
     return db_challenge
@@ -206,12 +352,13 @@ def delete_challenge(challenge_id: int, db: Session = Depends(get_db), current_u
     if challenge.start_date <= datetime.utcnow():
         raise HTTPException(status_code=400, detail="Desafio já iniciado não pode ser excluído")
     db.delete(challenge)
+    versions.bump(db, versions.challenge_key(challenge_id))
     db.commit()
+    cache.response_cache.invalidate(cache.challenge_tag(challenge_id))
     return {"detail": "Desafio excluído com sucesso"}
 
 
-@router.get("/challenges/{challenge_id}/participants", response_model=list[schemas.ChallengeParticipantResponse])
-def get_challenge_participants(challenge_id: int, db: Session = Depends(get_db)):
+def load_challenge_participants(db: Session, challenge_id: int):
     # Carrega os registros de participação aprovados, incluindo o usuário
     participants = db.query(models.ChallengeParticipant)\
         .options(joinedload(models.ChallengeParticipant.user))\
@@ -219,7 +366,30 @@ def get_challenge_participants(challenge_id: int, db: Session = Depends(get_db))
             models.ChallengeParticipant.challenge_id == challenge_id,
             models.ChallengeParticipant.approved == True
         ).all()
-    return participants
+    return [
+        {
+            "id": p.id,
+            "user": user_payload(p.user),
+            "joined_at": p.joined_at,
+            "progress": p.progress,
+            "submission_image": p.submission_image,
+            "approved": p.approved
+        }
+        for p in participants
+    ]
+
+@router.get("/challenges/{challenge_id}/participants", response_model=list[schemas.ChallengeParticipantResponse])
+def get_challenge_participants(challenge_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = check_not_modified(
+        request, response, db, [versions.USERS, versions.RANKING, versions.CHALLENGES, versions.challenge_key(challenge_id)]
+    )
+    if not_modified:
+        return not_modified
+    return cache.response_cache.get_or_set(
+        f"challenge:{challenge_id}:participants",
+        [cache.USERS_TAG, cache.CHALLENGES_TAG, cache.challenge_tag(challenge_id)],
+        lambda: load_challenge_participants(db, challenge_id)
+    )
 
 
 
@@ -266,12 +436,20 @@ def approve_participant(
     if not participant:
         raise HTTPException(status_code=404, detail="Participação não encontrada")
     participant.approved = True
+    versions.bump(db, versions.challenge_key(challenge_id))
     db.commit()
+    cache.response_cache.invalidate(cache.challenge_tag(challenge_id))
     db.refresh(participant)
     return participant
 
 @router.get("/challenges/{challenge_id}/activity")
-def get_challenge_activity(challenge_id: int, limit: int = 10, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+def get_challenge_activity(
+    challenge_id: int,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
     # Verifica se o desafio existe
     challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
     if not challenge:
@@ -287,83 +465,62 @@ def get_challenge_activity(challenge_id: int, limit: int = 10, db: Session = Dep
     if not participation and challenge.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Você não participa deste desafio")
     
-    # SOLUÇÃO TEMPORÁRIA:
-    # Como seus check-ins atuais não têm challenge_id, buscaremos check-ins gerais 
-    # e assumiremos que pertencem ao desafio para propósitos de demonstração
-    recent_checkins = db.query(models.CheckIn).filter(
-        models.CheckIn.user_id == current_user.id
-    ).order_by(models.CheckIn.timestamp.desc()).limit(limit).all()
+    # Check-ins do desafio de todos os participantes, já com o usuário (uma consulta)
+    try:
+        rows, next_cursor = crud.get_challenge_activity(db, challenge_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
     
     # Formata os resultados
-    activity = []
-    for checkin in recent_checkins:
-        # Busca o usuário relacionado ao check-in
-        user = db.query(models.User).filter(models.User.id == checkin.user_id).first()
-        activity.append({
+    activity = [
+        {
             "id": checkin.id,
             "user_id": checkin.user_id,
-            "username": user.username if user else "Usuário desconhecido",
-            "profile_image": user.profile_image if user else None,
+            "challenge_id": checkin.challenge_id,
+            "username": username or "Usuário desconhecido",
+            "profile_image": profile_image,
             "timestamp": checkin.timestamp,
             "duration": checkin.duration,
             "description": checkin.description,
             "type": "checkin"
-        })
-    
-    # Limita ao número solicitado
-    return activity
+        }
+        for checkin, username, profile_image in rows
+    ]
     
-@router.get("/challenges/{challenge_id}/ranking")
-def challenge_ranking(challenge_id: int, period: str = "weekly", db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    participation = db.query(models.ChallengeParticipant).filter(
-        models.ChallengeParticipant.challenge_id == challenge_id,
-        models.ChallengeParticipant.user_id == current_user.id,
-        models.ChallengeParticipant.approved == True
-    ).first()
-    if not participation:
-        raise HTTPException(status_code=403, detail="Você não participa deste desafio")
+    return {"items": activity, "next_cursor": next_cursor}
     
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
-    if not challenge:
-        raise HTTPException(status_code=404, detail="Desafio não encontrado")
-
-    participants = db.query(models.ChallengeParticipant).filter(
-        models.ChallengeParticipant.challenge_id == challenge_id,
-        models.ChallengeParticipant.approved == True
-    ).options(joinedload(models.ChallengeParticipant.user)).all()
-
+def challenge_ranking_range(period: str, start: datetime = None, end: datetime = None):
+    """Intervalo de contagem do ranking; start/end explícitos têm prioridade sobre o período."""
+    now = datetime.utcnow()
+    if start or end:
+        if not start:
+            raise HTTPException(status_code=400, detail="Informe o início do intervalo (start)")
+        end = end or now
+        if end < start:
+            raise HTTPException(status_code=400, detail="Intervalo inválido")
+        return start, end
     if period == "weekly":
-        today = datetime.utcnow().date()
-        start_of_week = today - timedelta(days=today.weekday() + 1)  # Domingo
-        start_dt = datetime.combine(start_of_week, datetime.min.time())
-        end_dt = datetime.utcnow()
-
-        checkins = db.query(models.CheckIn).filter(
-            models.CheckIn.challenge_id == challenge_id,
-            models.CheckIn.timestamp >= start_dt,
-            models.CheckIn.timestamp <= end_dt
-        ).all()
-        checkin_counts = {}
-        for c in checkins:
-            checkin_counts[c.user_id] = checkin_counts.get(c.user_id, 0) + 1
-
-        ranked = sorted(participants, key=lambda p: checkin_counts.get(p.user_id, 0), reverse=True)
-    else:  # overall
-        ranked = sorted(participants, key=lambda p: p.progress, reverse=True)
-
+        # Semana inteira (domingo a sábado): lida direto de ChallengePoints
+        return crud.get_week_boundaries(now)
+    if period == "monthly":
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), now
+    if period == "overall":
+        return None, None
+    raise HTTPException(status_code=400, detail="Período inválido")
+
+def challenge_ranking_payload(ranked, title: str):
     current_rank = 1
     previous_score = None
     podium = []
     others = []
-    for i, p in enumerate(ranked):
-        score = checkin_counts.get(p.user_id, 0) if period == "weekly" else p.progress
+    for i, (user_id, username, profile_image, score) in enumerate(ranked):
         if i > 0 and score < previous_score:
             current_rank = i + 1
         previous_score = score
         user_data = {
-            "id": p.user.id,
-            "username": p.user.username,
-            "profile_image": p.user.profile_image,
+            "id": user_id,
+            "username": username,
+            "profile_image": profile_image,
             "weekly_score": score,
             "rank": current_rank
         }
@@ -372,7 +529,73 @@ def challenge_ranking(challenge_id: int, period: str = "weekly", db: Session = D
         else:
             others.append(user_data)
 
-    return {"podium": podium, "others": others, "title": challenge.title}
+    return {"podium": podium, "others": others, "title": title}
+
+@router.get("/challenges/{challenge_id}/ranking")
+def challenge_ranking(
+    challenge_id: int,
+    period: str = "weekly",
+    start: datetime = None,
+    end: datetime = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    participation = db.query(models.ChallengeParticipant).filter(
+        models.ChallengeParticipant.challenge_id == challenge_id,
+        models.ChallengeParticipant.user_id == current_user.id,
+        models.ChallengeParticipant.approved == True
+    ).first()
+    if not participation:
+        raise HTTPException(status_code=403, detail="Você não participa deste desafio")
+    
+    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+    if not challenge:
+        raise HTTPException(status_code=404, detail="Desafio não encontrado")
+
+    start, end = challenge_ranking_range(period, start, end)
+
+    # Contagem por participante feita no banco (uma consulta agrupada)
+    ranked = crud.get_challenge_ranking(db, challenge_id, start, end)
+    return challenge_ranking_payload(ranked, challenge.title)
+
+@router.get("/challenges/{challenge_id}/history", response_model=list[schemas.ChallengePeriodPoints])
+def challenge_points_history(
+    challenge_id: int,
+    user_id: int = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """Check-ins e pontos por semana de um participante (padrão: o usuário atual)."""
+    participation = db.query(models.ChallengeParticipant).filter(
+        models.ChallengeParticipant.challenge_id == challenge_id,
+        models.ChallengeParticipant.user_id == current_user.id,
+        models.ChallengeParticipant.approved == True
+    ).first()
+    if not participation:
+        raise HTTPException(status_code=403, detail="Você não participa deste desafio")
+    return crud.get_challenge_points_history(db, challenge_id, user_id or current_user.id)
+
+@router.get("/challenges/{challenge_id}/export")
+def export_challenge_checkins(
+    challenge_id: int,
+    format: str = "ndjson",
+    current_user: schemas.User = Depends(get_current_user_short_session)
+):
+    # Sessão só para as verificações: o gerador da exportação abre a sua
+    with database.SessionLocal() as db:
+        challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+        if not challenge:
+            raise HTTPException(status_code=404, detail="Desafio não encontrado")
+        participation = db.query(models.ChallengeParticipant).filter(
+            models.ChallengeParticipant.challenge_id == challenge_id,
+            models.ChallengeParticipant.user_id == current_user.id,
+            models.ChallengeParticipant.approved == True
+        ).first()
+    if not participation and challenge.created_by != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Você não participa deste desafio")
+    _check_export_format(format)
+    statement = export.checkins_statement(challenge_id=challenge_id)
+    return export.streaming_export(database.SessionLocal, statement, format, f"challenge_{challenge_id}_checkins")
 
 @router.post("/challenges/{challenge_id}/checkin", response_model=schemas.CheckIn)
 def create_challenge_checkin(
@@ -403,12 +626,40 @@ def create_challenge_checkin(
     checkin_data = checkin.dict()
     checkin_data["challenge_id"] = challenge_id
     db_checkin = models.CheckIn(**checkin_data)
+    if db_checkin.timestamp is None:
+        # Necessário para achar a semana em ChallengePoints (mesmo valor do server_default)
+        db_checkin.timestamp = datetime.utcnow()
     db.add(db_checkin)
+    # Check-in de desafio também conta na semana do ranking geral (como no recálculo e em delete_checkin)
+    crud.update_weekly_points(db, current_user.id, db_checkin.timestamp, +1)
+    # Atualiza os pontos do desafio (semana em ChallengePoints e totais) na mesma transação
+    crud.update_challenge_points(db, current_user.id, challenge_id, db_checkin.timestamp, +1)
+    versions.bump(db, versions.user_checkins_key(current_user.id))
     db.commit()
+    versions.bump_after_commit(db, versions.RANKING)
+    crud.invalidate_ranking_cache(db_checkin.timestamp)
+    cache.response_cache.invalidate(cache.challenge_tag(challenge_id))
     db.refresh(db_checkin)
     
-    # Atualiza os pontos do desafio
-    crud.update_challenge_points(db, current_user.id, challenge_id)
+    # Publica no canal do desafio com o mesmo formato do feed de atividades
+    events.publish(events.challenge_topic(challenge_id), "checkin", {
+        "id": db_checkin.id,
+        "user_id": current_user.id,
+        "challenge_id": challenge_id,
+        "username": current_user.username,
+        "profile_image": current_user.profile_image,
+        "timestamp": db_checkin.timestamp,
+        "duration": db_checkin.duration,
+        "description": db_checkin.description,
+        "type": "checkin"
+    })
+    
+    # Notifica os outros participantes fora da requisição (insert em lote no worker)
+    notifications.dispatch_challenge_checkin(
+        challenge_id,
+        current_user.id,
+        f"{current_user.username} fez um check-in no desafio '{challenge.title}'"
+    )
     
     return db_checkin
 
@@ -462,7 +713,9 @@ def delete_challenge_participant(
     if not (participant.user_id == current_user.id or challenge.created_by == current_user.id):
         raise HTTPException(status_code=403, detail="Não autorizado")
     db.delete(participant)
+    versions.bump(db, versions.challenge_key(participant.challenge_id))
     db.commit()
+    cache.response_cache.invalidate(cache.challenge_tag(participant.challenge_id))
     return {"detail": "Participação removida com sucesso"}
 
 
@@ -487,79 +740,79 @@ def all_challenge_invitations(db: Session = Depends(get_db), current_user: schem
     return response
 
 @router.post("/admin/recalculate-points", status_code=200)
-def recalculate_points(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+def recalculate_points(since: datetime = None, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Acesso negado")
-    crud.recalculate_all_points(db)
-    return {"detail": "Points recalculated successfully"}
+    # since: reconstrói apenas as semanas a partir da que contém essa data
+    rebuilt = crud.recalculate_all_points(db, since=since)
+    return {"detail": "Points recalculated successfully", "weeks_rebuilt": rebuilt}
 
 @router.post("/admin/recalculate-challenge-points", status_code=200)
-def recalculate_challenge_points(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+def recalculate_challenge_points(dry_run: bool = False, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    # dry_run: só relata o que mudaria, sem gravar
+    report = crud.recalculate_all_challenge_points(db, dry_run=dry_run)
+    detail = "Challenge points diff computed" if dry_run else "Challenge points recalculated successfully"
+    return {"detail": detail, **report.as_dict()}
+
+@router.post("/admin/import/checkins")
+def import_checkins(
+    file: UploadFile = File(...),
+    format: str = "ndjson",
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """Importação em lote (NDJSON/CSV); a pontuação é refeita uma vez por semana/desafio afetado."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    if format not in bulk_import.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato inválido (use ndjson ou csv)")
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    report = bulk_import.import_checkins(db, lines, format)
+    logger.info(f"Import by {current_user.username}: {report.imported} check-ins, {report.rejected} rejected")
+    return report.as_dict()
+
+@router.get("/admin/export")
+def export_all(
+    format: str = "ndjson",
+    dataset: str = "checkins",
+    current_user: schemas.User = Depends(get_current_user_short_session)
+):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Acesso negado")
-    crud.recalculate_all_challenge_points(db)
-    return {"detail": "Challenge points recalculated successfully"}
+    _check_export_format(format)
+    if dataset == "checkins":
+        statement = export.checkins_statement()
+    elif dataset == "weekly_points":
+        statement = export.weekly_points_statement()
+    else:
+        raise HTTPException(status_code=400, detail="Conjunto de dados inválido")
+    return export.streaming_export(database.SessionLocal, statement, format, f"all_{dataset}")
 
-@router.get("/ranking/weekly")
-def weekly_ranking(db: Session = Depends(get_db)):
+def current_week_range():
     today = datetime.utcnow()
     start_of_week = today - timedelta(days=(today.weekday() + 1) % 7)
     start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
     end_of_week = start_of_week + timedelta(days=6, hours=23, minutes=59, seconds=59, microseconds=999999)
-    
-    logger.debug(f"Week range: {start_of_week} to {end_of_week}")
-    
-    weekly_data = db.query(models.WeeklyPoints).filter(
-        models.WeeklyPoints.week_start == start_of_week,
-        models.WeeklyPoints.checkin_count > 0
-    ).all()
-    
-    logger.debug(f"Weekly data: {[(wp.user_id, wp.checkin_count) for wp in weekly_data]}")
-    
-    if not weekly_data:
-        return {
-            "podium": [],
-            "others": [],
-            "week_range": {"start": start_of_week.strftime("%Y-%m-%d"), "end": end_of_week.strftime("%Y-%m-%d")}
+    return start_of_week, end_of_week
+
+def weekly_ranking_cache_key(start_of_week: datetime):
+    tags = [cache.USERS_TAG, cache.WEEKS_RANKING_TAG, cache.week_tag(start_of_week)]
+    return f"ranking:week:{start_of_week:%Y-%m-%d}", tags
+
+def weekly_ranking_payload(leaderboard, start_of_week: datetime, end_of_week: datetime):
+    # Limitar o rank ao máximo de 3, mesmo com empates: todos ficam no pódio
+    podium_data = [
+        {
+            "id": entry.user_id,
+            "username": entry.username,
+            "profile_image": entry.profile_image,
+            "weekly_score": entry.weekly_score,
+            "rank": min(entry.rank, 3)
         }
-    
-    display_scores = {wp.user_id: wp.checkin_count for wp in weekly_data}
-    user_ids = list(display_scores.keys())
-    users = db.query(models.User).filter(models.User.id.in_(user_ids)).all()
-    
-    logger.debug(f"Users found: {[(user.id, user.username) for user in users]}")
-    
-    ranking_list = []
-    for user in users:
-        weekly_count = display_scores.get(user.id, 0)
-        if weekly_count > 0:
-            ranking_list.append({
-                "id": user.id,
-                "username": user.username,
-                "profile_image": user.profile_image,
-                "weekly_score": weekly_count,
-                "rank": 0
-            })
-    
-    logger.debug(f"Ranking list before sorting: {ranking_list}")
-    
-    ranking_list.sort(key=lambda x: x["weekly_score"], reverse=True)
-    
-    # Atribui ranks, considerando empates, e ajusta para pódio até 3º lugar
-    current_rank = 1
-    previous_score = None
-    podium_data = []
-    
-    for i, user_data in enumerate(ranking_list):
-        if i > 0 and user_data["weekly_score"] < previous_score:
-            current_rank = i + 1
-        # Limitar o rank ao máximo de 3, mesmo com empates
-        user_data["rank"] = min(current_rank, 3)
-        previous_score = user_data["weekly_score"]
-        podium_data.append(user_data)
-    
-    logger.debug(f"Podium: {podium_data}")
-    logger.debug(f"Others: []")  # Nenhum "Others", todos no pódio
+        for entry in leaderboard
+    ]
     
     return {
         "podium": podium_data,
@@ -567,9 +820,25 @@ def weekly_ranking(db: Session = Depends(get_db)):
         "week_range": {"start": start_of_week.strftime("%Y-%m-%d"), "end": end_of_week.strftime("%Y-%m-%d")}
     }
 
-@router.get("/ranking/overall")
-def overall_ranking(db: Session = Depends(get_db)):
-    users = db.query(models.User).order_by(models.User.weeks_won.desc()).all()
+@router.get("/ranking/weekly")
+def weekly_ranking(request: Request, response: Response, db: Session = Depends(get_db)):
+    start_of_week, end_of_week = current_week_range()
+    not_modified = check_not_modified(request, response, db, [versions.USERS, versions.RANKING], start_of_week)
+    if not_modified:
+        return not_modified
+    logger.debug(f"Week range: {start_of_week} to {end_of_week}")
+    
+    # Ranking materializado (crud.refresh_weekly_leaderboard), já ordenado e com empates
+    key, tags = weekly_ranking_cache_key(start_of_week)
+    return cache.response_cache.get_or_set(
+        key, tags,
+        lambda: weekly_ranking_payload(crud.get_weekly_leaderboard(db, start_of_week), start_of_week, end_of_week)
+    )
+
+def overall_ranking_cache_key():
+    return "ranking:overall", [cache.USERS_TAG, cache.OVERALL_RANKING_TAG]
+
+def overall_ranking_payload(users):
     data = [
         {
             "id": u.id,
@@ -582,11 +851,31 @@ def overall_ranking(db: Session = Depends(get_db)):
     ]
     return {"overall": data}
 
+@router.get("/ranking/overall")
+def overall_ranking(request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = check_not_modified(request, response, db, [versions.USERS, versions.RANKING])
+    if not_modified:
+        return not_modified
+    key, tags = overall_ranking_cache_key()
+    return cache.response_cache.get_or_set(
+        key, tags,
+        lambda: overall_ranking_payload(db.query(models.User).order_by(models.User.weeks_won.desc()).all())
+    )
+
 @router.post("/checkin/", response_model=schemas.CheckIn)
 def create_checkin(checkin: schemas.CheckInCreate, current_user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if checkin.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Não autorizado")
-    return crud.create_checkin(db, checkin)
+    db_checkin = crud.create_checkin(db, checkin)
+    events.publish(events.user_topic(current_user.id), "checkin", {
+        "id": db_checkin.id,
+        "user_id": db_checkin.user_id,
+        "challenge_id": db_checkin.challenge_id,
+        "timestamp": db_checkin.timestamp,
+        "duration": db_checkin.duration,
+        "description": db_checkin.description
+    })
+    return db_checkin
 
 @router.put("/checkins/{checkin_id}", response_model=schemas.CheckIn)
 def update_checkin(checkin_id: int, update: schemas.CheckInUpdate, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
@@ -609,10 +898,73 @@ def delete_checkin(checkin_id: int, db: Session = Depends(get_db), current_user:
 
 # Notificações
 @router.get("/notifications/", response_model=list[schemas.Notification])
-def get_notifications(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
-    return db.query(models.Notification).filter(
-        models.Notification.user_id == current_user.id
-    ).order_by(models.Notification.created_at.desc()).all()
+def get_notifications(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    unread_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    not_modified = check_not_modified(
+        request, response, db, [versions.NOTIFICATIONS, versions.user_notifications_key(current_user.id)]
+    )
+    if not_modified:
+        return not_modified
+    # Paginação por cursor: a próxima página vem no cabeçalho X-Next-Cursor
+    try:
+        items, next_cursor = notifications.get_inbox(db, current_user.id, limit, cursor, unread_only)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+@router.get("/notifications/unread-count")
+def get_unread_count(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    not_modified = check_not_modified(
+        request, response, db, [versions.NOTIFICATIONS, versions.user_notifications_key(current_user.id)]
+    )
+    if not_modified:
+        return not_modified
+    return {"unread_count": notifications.unread_count(db, current_user.id)}
+
+@router.put("/notifications/read-all")
+def mark_all_notifications_read(db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    return {"updated": notifications.mark_all_read(db, current_user.id)}
+
+@router.get("/events/stream")
+def stream_events(request: Request, token: str):
+    """Server-Sent Events com as notificações do usuário e a atividade dos seus desafios.
+
+    A sessão do banco só vive durante a autenticação e a consulta dos desafios: o stream
+    pode ficar aberto por horas e não pode segurar uma conexão do pool.
+    """
+    db = database.SessionLocal()
+    try:
+        # EventSource não envia cabeçalhos: o token vem na query string
+        current_user = get_current_user(token, db)
+        challenge_ids = [
+            challenge_id for challenge_id, in db.query(models.ChallengeParticipant.challenge_id).filter(
+                models.ChallengeParticipant.user_id == current_user.id,
+                models.ChallengeParticipant.approved == True
+            )
+        ]
+        user_id = current_user.id
+    finally:
+        db.close()
+    topics = [events.user_topic(user_id)] + [events.challenge_topic(c) for c in challenge_ids]
+    return StreamingResponse(
+        events.sse_stream(request, topics),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.put("/notifications/{notification_id}/read", response_model=schemas.Notification)
 def mark_notification_read(notification_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
@@ -625,6 +977,7 @@ def mark_notification_read(notification_id: int, db: Session = Depends(get_db),
         raise HTTPException(status_code=404, detail="Notificação não encontrada")
     
     notification.read = True
+    versions.bump(db, versions.user_notifications_key(current_user.id))
     db.commit()
     db.refresh(notification)
     return notification
@@ -646,42 +999,21 @@ def create_notification(db: Session, user_id: int, message: str, type: str, rela
         message=message
     )
     db.add(notification)
+    versions.bump(db, versions.user_notifications_key(user_id))
     db.commit()
     db.refresh(notification)
+    events.publish(events.user_topic(user_id), "notification", {
+        "id": notification.id,
+        "user_id": notification.user_id,
+        "related_user_id": notification.related_user_id,
+        "challenge_id": notification.challenge_id,
+        "type": notification.type,
+        "message": notification.message,
+        "read": notification.read,
+        "created_at": notification.created_at
+    })
     return notification
 
-# Modificar a rota de check-in para acionar notificações
-@router.post("/challenges/{challenge_id}/checkin", response_model=schemas.CheckIn)
-def create_challenge_checkin(
-    challenge_id: int,
-    checkin: schemas.CheckInCreate,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
-):
-    # O código existente para criar check-in...
-    
-    # Após criar o check-in, buscar o desafio e outros participantes
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
-    if challenge:
-        # Notificar outros participantes
-        participants = db.query(models.ChallengeParticipant).filter(
-            models.ChallengeParticipant.challenge_id == challenge_id,
-            models.ChallengeParticipant.user_id != current_user.id,
-            models.ChallengeParticipant.approved == True
-        ).all()
-        
-        for participant in participants:
-            create_notification(
-                db,
-                participant.user_id,
-                f"{current_user.username} fez um check-in no desafio '{challenge.title}'",
-                "checkin",
-                related_user_id=current_user.id,
-                challenge_id=challenge_id
-            )
-    
-    return db_checkin  # Retorne o check-in criado
-
 @router.post("/challenges/{challenge_id}/rules", response_model=schemas.ChallengeRules)
 def create_challenge_rules(
     challenge_id: int,
@@ -712,8 +1044,19 @@ def create_challenge_rules(
         # Criar novas regras
         db_rules = models.ChallengeRules(challenge_id=challenge_id, **rules.dict())
         db.add(db_rules)
-    
+    db.flush()
+
+    # Novas regras mudam os pontos já calculados: recalcula os participantes aprovados
+    participant_ids = [
+        user_id for user_id, in db.query(models.ChallengeParticipant.user_id).filter(
+            models.ChallengeParticipant.challenge_id == challenge_id,
+            models.ChallengeParticipant.approved == True
+        )
+    ]
+    crud.rescore_challenge_participants(db, [(user_id, challenge_id) for user_id in participant_ids])
+    versions.bump(db, versions.challenge_key(challenge_id))
     db.commit()
+    cache.response_cache.invalidate(cache.challenge_tag(challenge_id))
     db.refresh(db_rules)
     return db_rules
 
@@ -731,56 +1074,3 @@ def get_challenge_rules(
         raise HTTPException(status_code=404, detail="Regras não encontradas")
     
     return rules
-
-# Função para calcular pontos com base nas regras específicas do desafio
-def calculate_challenge_points(checkin_count: int, rules: models.ChallengeRules) -> int:
-    """Calcula pontos baseado nas regras específicas do desafio."""
-    if not rules or checkin_count < rules.min_threshold:
-        return 0
-    
-    base_points = rules.min_points
-    additional_count = max(0, checkin_count - rules.min_threshold)
-    additional_points = (additional_count // rules.additional_unit) * rules.additional_points
-    
-    return base_points + additional_points
-
-# Modificação na função update_weekly_points em crud.py
-def update_challenge_points(db: Session, user_id: int, challenge_id: int):
-    """Atualiza a pontuação do usuário em um desafio específico."""
-    # Buscar o desafio e suas regras
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
-    if not challenge:
-        return
-    
-    rules = db.query(models.ChallengeRules).filter(
-        models.ChallengeRules.challenge_id == challenge_id
-    ).first()
-    
-    # Buscar a participação do usuário
-    participant = db.query(models.ChallengeParticipant).filter(
-        models.ChallengeParticipant.challenge_id == challenge_id,
-        models.ChallengeParticipant.user_id == user_id
-    ).first()
-    
-    if not participant:
-        return
-    
-    # Contar checkins do desafio
-    checkin_count = db.query(models.CheckIn).filter(
-        models.CheckIn.user_id == user_id,
-        models.CheckIn.challenge_id == challenge_id
-    ).count()
-    
-    # Calcular pontos
-    if rules:
-        challenge_points = calculate_challenge_points(checkin_count, rules)
-    else:
-        # Fallback para a regra padrão
-        challenge_points = calculate_weekly_points(checkin_count)
-    
-    # Atualizar pontos do participante
-    participant.progress = checkin_count
-    participant.challenge_points = challenge_points
-    db.commit()
-    
-    return participant
\ No newline at end of file
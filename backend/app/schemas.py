@@ -42,7 +42,7 @@ class CheckIn(CheckInBase):
     id: int
     user_id: int
     timestamp: datetime
-    challenge_id: int
+    challenge_id: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -88,6 +88,15 @@ class ChallengeRules(ChallengeRulesBase):
 class ChallengeCreate(ChallengeBase):
     pass
 
+class ChallengePeriodPoints(BaseModel):
+    period_start: datetime
+    period_end: datetime
+    checkin_count: int
+    points: int
+
+    class Config:
+        orm_mode = True
+
 class Challenge(ChallengeBase):
     id: int
     code: str
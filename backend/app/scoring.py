@@ -0,0 +1,83 @@
+# backend/app/scoring.py
+"""Pontuação de check-ins por período (semana do ranking geral e períodos dos desafios).
+
+Uma regra tem quatro parâmetros: abaixo de ``min_threshold`` check-ins o período vale 0;
+ao atingir vale ``min_points`` e cada ``additional_unit`` check-ins além do mínimo somam
+``additional_points``. A pontuação semanal padrão é a regra (MIN_TRAINING_DAYS, 10, 1, 3).
+
+score() pontua um período; score_many() pontua listas inteiras de uma vez, com NumPy
+quando disponível (uma passada vetorizada) e em Python puro caso contrário. Os
+parâmetros podem ser um valor único ou uma lista do mesmo tamanho das contagens.
+"""
+from typing import NamedTuple
+
+from .config import MIN_TRAINING_DAYS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele vale o laço em Python
+    np = None
+
+# Abaixo disso o custo de converter para array não compensa
+NUMPY_MIN_SIZE = 64
+
+class ScoringRule(NamedTuple):
+    min_threshold: int
+    min_points: int
+    additional_unit: int
+    additional_points: int
+
+WEEKLY_RULE = ScoringRule(MIN_TRAINING_DAYS, 10, 1, 3)
+
+def rule_for(rules) -> ScoringRule:
+    """Regra de um ChallengeRules (ou schema equivalente); sem regras vale a semanal padrão."""
+    if not rules:
+        return WEEKLY_RULE
+    return ScoringRule(rules.min_threshold, rules.min_points, rules.additional_unit, rules.additional_points)
+
+def score(checkin_count: int, rule: ScoringRule = WEEKLY_RULE) -> int:
+    checkin_count = checkin_count or 0
+    if checkin_count < rule.min_threshold:
+        return 0
+    if rule.additional_unit <= 0:
+        return rule.min_points
+    extra = (checkin_count - rule.min_threshold) // rule.additional_unit
+    return rule.min_points + extra * rule.additional_points
+
+def _broadcast(value, size: int):
+    return value if isinstance(value, (list, tuple)) else [value] * size
+
+def score_python(counts, min_threshold, min_points, additional_unit, additional_points) -> list:
+    size = len(counts)
+    return [
+        score(count, ScoringRule(*params))
+        for count, *params in zip(
+            counts,
+            _broadcast(min_threshold, size),
+            _broadcast(min_points, size),
+            _broadcast(additional_unit, size),
+            _broadcast(additional_points, size),
+        )
+    ]
+
+def score_array(counts, min_threshold, min_points, additional_unit, additional_points):
+    """Versão vetorizada (exige NumPy); devolve um array int64."""
+    counts = np.asarray(counts, dtype=np.int64)
+    min_threshold = np.asarray(min_threshold, dtype=np.int64)
+    min_points = np.asarray(min_points, dtype=np.int64)
+    additional_unit = np.asarray(additional_unit, dtype=np.int64)
+    additional_points = np.asarray(additional_points, dtype=np.int64)
+
+    # Unidade <= 0 não soma pontos extras (evita a divisão por zero)
+    safe_unit = np.where(additional_unit > 0, additional_unit, 1)
+    extra = np.where(additional_unit > 0, (counts - min_threshold) // safe_unit, 0)
+    return np.where(counts >= min_threshold, min_points + extra * additional_points, 0)
+
+def score_many(counts, rule: ScoringRule = WEEKLY_RULE, **params) -> list:
+    """Pontua uma lista de contagens; ``params`` substitui campos da regra por valores ou listas por linha."""
+    counts = [count or 0 for count in counts]
+    values = rule._replace(**params)
+    if np is not None and len(counts) >= NUMPY_MIN_SIZE:
+        # tolist() devolve int do Python, que os drivers do banco aceitam
+        return score_array(counts, *values).tolist()
+    return score_python(counts, *values)
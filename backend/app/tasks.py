@@ -1,15 +1,76 @@
 # backend/app/tasks.py
 from celery import Celery
-from datetime import datetime, timedelta
-from database import SessionLocal
-from config import MIN_TRAINING_DAYS
-from models import CheckIn, WeeklyUpdate, User
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
+
+# O pacote app é resolvido pelo PYTHONPATH da imagem (ver Dockerfile)
+from app.database import SessionLocal
+from app import crud, notifications, versions, cache
 
 celery = Celery('tasks', broker='redis://redis:6379/0')
 celery.config_from_object('celeryconfig')
 
 @celery.task
 def update_weekly_ranking():
-    ""
\ No newline at end of file
+    """Fechamento semanal: soma weeks_won dos vencedores das semanas encerradas ainda não fechadas."""
+    db = SessionLocal()
+    try:
+        weeks = crud.close_weeks(db)
+        return {"weeks": [week.strftime("%Y-%m-%d") for week in weeks]}
+    finally:
+        db.close()
+
+@celery.task
+def check_points_consistency():
+    """Confere WeeklyPoints/User.points e o ranking da semana e corrige eventuais desvios."""
+    db = SessionLocal()
+    try:
+        drift = crud.check_points_consistency(db, repair=True)
+        return {key: len(value) for key, value in drift.items()}
+    finally:
+        db.close()
+
+@celery.task
+def notify_challenge_checkin(challenge_id, related_user_id, message):
+    """Fan-out das notificações de check-in de desafio (insert em lote)."""
+    db = SessionLocal()
+    try:
+        return notifications.notify_challenge_checkin(db, challenge_id, related_user_id, message)
+    finally:
+        db.close()
+
+@celery.task
+def prune_notifications():
+    """Retenção: apaga notificações lidas mais antigas que NOTIFICATION_RETENTION_DAYS."""
+    db = SessionLocal()
+    try:
+        return notifications.prune_read_notifications(db)
+    finally:
+        db.close()
+
+def main():
+    """Uso local, sem worker: PYTHONPATH=.. python tasks.py close-weeks [--rebuild]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tarefas periódicas do gym-checkin")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    close = subcommands.add_parser("close-weeks", help="fecha as semanas encerradas (atualiza weeks_won)")
+    close.add_argument("--rebuild", action="store_true",
+                       help="recalcula weeks_won do zero a partir das semanas já fechadas")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            crud.refresh_weeks_won(db)
+            versions.bump(db, versions.RANKING)
+            db.commit()
+            cache.response_cache.invalidate(cache.OVERALL_RANKING_TAG)
+            print("weeks_won recalculado a partir das semanas fechadas")
+        weeks = crud.close_weeks(db)
+        print(f"{len(weeks)} semanas fechadas")
+        for week in weeks:
+            print(f"  {week:%Y-%m-%d}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# backend/app/versions.py
+"""Contadores de versão por recurso para respostas condicionais (ETag / Last-Modified).
+
+As escritas chamam bump() antes do commit, na mesma transação dos dados; as rotas de
+leitura comparam o ETag derivado das versões com o If-None-Match antes de consultar.
+Ficam no banco (tabela data_versions) para valerem entre workers e após reinícios.
+Chaves alteradas a cada check-in (RANKING) usam bump_after_commit().
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Chaves dos recursos
+USERS = "users"              # username/foto aparecem nos rankings e listas
+RANKING = "ranking"          # pontos, ranking semanal e geral
+CHALLENGES = "challenges"    # todos os desafios de uma vez (recálculos)
+NOTIFICATIONS = "notifications"  # todas as caixas de entrada (limpeza periódica)
+
+def challenge_key(challenge_id: int) -> str:
+    return f"challenge:{challenge_id}"
+
+def user_checkins_key(user_id: int) -> str:
+    return f"user:{user_id}:checkins"
+
+def user_notifications_key(user_id: int) -> str:
+    return f"user:{user_id}:notifications"
+
+def bump_statement(dialect_name: str, keys):
+    """UPSERT que incrementa (ou cria com 1) a versão de cada chave."""
+    insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    statement = insert(models.DataVersion).values(
+        [{"key": key, "version": 1, "updated_at": now} for key in sorted(set(keys))]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[models.DataVersion.key],
+        set_={"version": models.DataVersion.version + 1, "updated_at": now}
+    )
+
+def bump(db, *keys):
+    """Marca os recursos como alterados. Não faz commit: vale junto com a transação da escrita."""
+    if keys:
+        db.execute(bump_statement(db.get_bind().dialect.name, keys))
+
+async def bump_async(db, *keys):
+    if keys:
+        connection = await db.connection()
+        await db.execute(bump_statement(connection.dialect.name, keys))
+
+def bump_after_commit(db, *keys):
+    """bump() em uma transação própria e curta, logo depois do commit da escrita.
+
+    Para chaves quentes: no Postgres o UPSERT trava a linha até o fim da transação, e
+    dentro da transação de cada check-in serializaria todas elas. Como a invalidação do
+    cache, é melhor esforço: uma falha aqui não desfaz a escrita já confirmada.
+    """
+    try:
+        bump(db, *keys)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception(f"Falha ao atualizar as versões {keys}")
+
+async def bump_after_commit_async(db, *keys):
+    try:
+        await bump_async(db, *keys)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        logger.exception(f"Falha ao atualizar as versões {keys}")
+
+def versions_statement(keys):
+    return select(models.DataVersion.key, models.DataVersion.version, models.DataVersion.updated_at).where(
+        models.DataVersion.key.in_(list(keys))
+    )
+
+def validators(rows, keys, *extra):
+    """ETag (fraco) e Last-Modified a partir das linhas de data_versions.
+
+    ``extra`` entra no ETag junto com as versões (ex.: a URL, a semana corrente).
+    """
+    found = {key: (version, updated_at) for key, version, updated_at in rows}
+    raw = "|".join(
+        [str(part) for part in extra] + [f"{key}={found.get(key, (0, None))[0]}" for key in keys]
+    )
+    etag = f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+    timestamps = [updated_at for _, updated_at in found.values() if updated_at is not None]
+    return etag, max(timestamps) if timestamps else None
+
+def current(db, keys, *extra):
+    return validators(db.execute(versions_statement(keys)).all(), keys, *extra)
+
+async def current_async(db, keys, *extra):
+    result = await db.execute(versions_statement(keys))
+    return validators(result.all(), keys, *extra)
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+def is_fresh(headers, etag: str, last_modified: datetime = None) -> bool:
+    """True quando o cliente já tem a versão atual (If-None-Match tem prioridade sobre If-Modified-Since)."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        # Comparação fraca: W/"x" e "x" são equivalentes
+        weak = {tag[2:] if tag.startswith("W/") else tag for tag in candidates}
+        return "*" in candidates or etag[2:] in weak
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def not_modified(request, response, etag: str, last_modified: datetime = None):
+    """Grava ETag/Last-Modified na resposta; devolve um 304 pronto quando o cliente já tem a versão."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_fresh(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,92 @@
+# backend/tests/conftest.py
+"""Fixtures compartilhadas: banco SQLite temporário por teste e a API sobre ele.
+
+O pytest.ini coloca backend/ e backend/app no sys.path (models.py importa
+``database`` sem o pacote), então os testes importam tudo via ``app.*``.
+"""
+import os
+from datetime import datetime, timedelta
+
+# Antes de importar a aplicação: sem Redis, sem Celery e com o perfil de teste
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("APP_ENV", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ["RESPONSE_CACHE_REDIS_URL"] = ""
+os.environ["EVENTS_REDIS_URL"] = ""
+os.environ["CELERY_BROKER_URL"] = ""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, cache, database, models, routes
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'gymcheckin.db'}"
+
+@pytest.fixture
+def engine(database_url):
+    engine = database.create_db_engine(database_url)
+    models.Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(engine, monkeypatch):
+    """sessionmaker do banco do teste, também usado pelas rotas (database.SessionLocal)."""
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+    # Caches do processo não podem vazar entre bancos de testes diferentes
+    monkeypatch.setattr(cache, "response_cache", cache.ResponseCache(redis_url=""))
+    auth.user_id_cache.clear()
+    return factory
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+@pytest.fixture
+def make_user(db):
+    def make_user(username: str, **fields):
+        user = models.User(username=username, password_hash="x", points=0, weeks_won=0, **fields)
+        db.add(user)
+        db.commit()
+        return user
+    return make_user
+
+@pytest.fixture
+def make_challenge(db):
+    """Desafio com regras (opcionais) e os participantes informados já aprovados."""
+    def make_challenge(creator, participants=(), rules=None, **fields):
+        start = fields.pop("start_date", datetime(2025, 1, 5))
+        challenge = models.Challenge(
+            title=fields.pop("title", "Desafio"), modality="academia", target=20, start_date=start,
+            duration_days=90, end_date=start + timedelta(days=89), created_by=creator.id, **fields
+        )
+        db.add(challenge)
+        db.flush()
+        if rules is not None:
+            db.add(models.ChallengeRules(challenge_id=challenge.id, **rules._asdict()))
+        for user in (creator, *participants):
+            db.add(models.ChallengeParticipant(challenge_id=challenge.id, user_id=user.id, approved=True))
+        db.commit()
+        return challenge
+    return make_challenge
+
+def auth_headers(user) -> dict:
+    return {"Authorization": f"Bearer {auth.create_access_token(data={'sub': user.username})}"}
+
+@pytest.fixture
+def app(session_factory):
+    app = FastAPI()
+    app.include_router(routes.router)
+    return app
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,70 @@
+# backend/tests/test_async_routes.py
+"""Rotas async (DATABASE_ASYNC=1) respondem igual às síncronas sobre o mesmo banco."""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import async_routes, crud, database, models, routes
+from app.config import MIN_TRAINING_DAYS
+from conftest import auth_headers
+
+@pytest.fixture
+def async_client(database_url, session_factory):
+    async_engine = create_async_engine(database.to_async_url(database_url))
+    factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_async_db():
+        async with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_routes.router)
+    app.include_router(routes.router)
+    app.dependency_overrides[database.get_async_db] = get_async_db
+    with TestClient(app) as client:
+        yield client
+        client.portal.call(async_engine.dispose)
+
+def test_async_checkins_update_points_like_sync(async_client, client, db, make_user):
+    ana = make_user("ana")
+    for _ in range(MIN_TRAINING_DAYS + 1):
+        response = async_client.post("/checkin/", json={"user_id": ana.id}, headers=auth_headers(ana))
+        assert response.status_code == 200
+
+    assert crud.find_points_drift(db) == {"weeks": [], "users": []}
+    assert async_client.get("/ranking/").json() == client.get("/ranking/").json()
+    assert async_client.get("/ranking/weekly").json() == client.get("/ranking/weekly").json()
+    assert async_client.get("/ranking/").json()[0]["points"] == 13
+
+def test_async_history_pagination_and_etag(async_client, client, db, make_user):
+    ana = make_user("ana")
+    base = datetime(2025, 3, 2, 8)
+    db.add_all([models.CheckIn(user_id=ana.id, timestamp=base + timedelta(hours=i // 2)) for i in range(7)])
+    db.commit()
+
+    url = f"/users/{ana.id}/checkins/"
+    pages = []
+    cursor = None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = async_client.get(url, params=params)
+        assert response.json() == client.get(url, params=params).json()
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert len({checkin_id for page in pages for checkin_id in page}) == 7
+
+    etag = client.get(url).headers["ETag"]
+    assert async_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+def test_async_unread_count(async_client, db, make_user):
+    ana = make_user("ana")
+    db.add(models.Notification(user_id=ana.id, type="invite", message="oi"))
+    db.commit()
+    response = async_client.get("/notifications/unread-count", headers=auth_headers(ana))
+    assert response.json() == {"unread_count": 1}
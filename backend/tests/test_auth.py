@@ -0,0 +1,55 @@
+# backend/tests/test_auth.py
+"""Login com bcrypt no executor dedicado, rehash de custo e cache de username -> id."""
+import asyncio
+
+import bcrypt
+import pytest
+
+from app import auth, models
+from app.hashing import HashingExecutor, HashingQueueFull
+from conftest import auth_headers
+
+def login(client, username, password):
+    return client.post("/token", data={"username": username, "password": password})
+
+def test_register_and_login(client):
+    response = client.post("/register/", json={"username": "Ana", "password": "s3nha"})
+    assert response.status_code == 200
+    assert response.json()["username"] == "ana"
+    assert client.post("/register/", json={"username": "ana", "password": "x"}).status_code == 400
+
+    assert login(client, "ana", "errada").status_code == 400
+    response = login(client, "ANA", "s3nha")
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert auth.decode_token(token).username == "ana"
+
+def test_login_rehashes_a_different_cost(client, db, make_user):
+    old_hash = bcrypt.hashpw(b"s3nha", bcrypt.gensalt(5)).decode()
+    ana = make_user("ana")
+    ana.password_hash = old_hash
+    db.commit()
+
+    assert login(client, "ana", "s3nha").status_code == 200
+    db.expire_all()
+    new_hash = db.get(models.User, ana.id).password_hash
+    assert new_hash != old_hash
+    assert new_hash.split("$")[2] == f"{auth.BCRYPT_ROUNDS:02d}"
+    assert login(client, "ana", "s3nha").status_code == 200
+
+def test_full_hashing_queue_is_rejected():
+    executor = HashingExecutor(workers=1, max_pending=0)
+    with pytest.raises(HashingQueueFull):
+        asyncio.run(executor.run(sum, [1, 2]))
+    assert executor.metrics()["rejected"] == 1
+
+def test_renamed_user_old_token_stops_resolving(client, make_user):
+    ana = make_user("ana")
+    old_headers = auth_headers(ana)
+    assert client.get("/achievements/", headers=old_headers).status_code == 200
+    assert auth.user_id_cache.get("ana") == ana.id
+
+    assert client.put("/users/me", params={"username": "anna"}, headers=old_headers).status_code == 200
+    assert client.get("/achievements/", headers=old_headers).status_code == 404
+    ana.username = "anna"
+    assert client.get("/achievements/", headers=auth_headers(ana)).status_code == 200
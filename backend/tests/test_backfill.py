@@ -0,0 +1,73 @@
+# backend/tests/test_backfill.py
+"""Backfill retomável: checkpoint por lote, retomada depois de falha e troca de escopo."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import backfill, crud, models
+
+WEEK = datetime(2025, 3, 2)  # domingo
+
+class FailingBackfill(backfill.ChallengePointsBackfill):
+    """Falha no lote que contém ``fail_on`` (uma vez)."""
+
+    def __init__(self, fail_on: int, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_on = fail_on
+        self.batches = []
+
+    def process_batch(self, db, keys):
+        self.batches.append(list(keys))
+        if self.fail_on in keys:
+            self.fail_on = None
+            raise RuntimeError("queda no meio do backfill")
+        return super().process_batch(db, keys)
+
+@pytest.fixture
+def challenges(db, make_user, make_challenge):
+    ana = make_user("ana")
+    challenges = [make_challenge(ana, title=f"Desafio {i}") for i in range(5)]
+    db.add_all([
+        models.CheckIn(user_id=ana.id, challenge_id=challenge.id, timestamp=WEEK + timedelta(days=day))
+        for challenge in challenges for day in range(challenge.id)
+    ])
+    db.commit()
+    return challenges
+
+def test_incomplete_job_fails_on_creation():
+    class NoBatches(backfill.Backfill):
+        name = "incompleto"
+
+        def next_keys(self, db, after, limit):
+            return []
+
+    with pytest.raises(TypeError):
+        NoBatches()
+
+def test_resumes_after_the_last_committed_batch(db, challenges):
+    job = FailingBackfill(fail_on=3)
+    with pytest.raises(RuntimeError):
+        backfill.run(db, job, batch_size=2)
+    checkpoint = db.get(models.BackfillCheckpoint, job.name)
+    assert (checkpoint.last_key, checkpoint.processed, checkpoint.finished_at) == (2, 2, None)
+    # O lote que falhou não deixou nada gravado
+    assert {row.challenge_id for row in db.query(models.ChallengePoints)} == {1, 2}
+
+    checkpoint = backfill.run(db, job, batch_size=2)
+    assert job.batches == [[1, 2], [3, 4], [3, 4], [5]]
+    assert checkpoint.processed == 5
+    assert checkpoint.finished_at is not None
+    assert crud.recalculate_all_challenge_points(db, dry_run=True).diffs == []
+
+    # Concluído: só roda de novo com restart
+    job.batches.clear()
+    backfill.run(db, job, batch_size=2)
+    assert job.batches == []
+    backfill.run(db, job, batch_size=2, restart=True)
+    assert job.batches == [[1, 2], [3, 4], [5]]
+
+def test_other_scope_starts_over(db, challenges):
+    backfill.run(db, backfill.ChallengePointsBackfill(challenge_id=2))
+    checkpoint = backfill.run(db, backfill.ChallengePointsBackfill(challenge_id=4))
+    assert checkpoint.processed == 1
+    assert {row.challenge_id for row in db.query(models.ChallengePoints)} == {2, 4}
@@ -0,0 +1,60 @@
+# backend/tests/test_bulk_import.py
+"""Importação em lote de check-ins (NDJSON/CSV) com a pontuação refeita no final."""
+import io
+import json
+from datetime import datetime
+
+from app import bulk_import, crud, models
+from app.scoring import ScoringRule
+from conftest import auth_headers
+
+def ndjson(records, trailer: str = ""):
+    return io.StringIO("".join(json.dumps(record) + "\n" for record in records) + trailer)
+
+def test_import_rescores_weeks_and_challenges(db, make_user, make_challenge):
+    ana, bia = make_user("ana"), make_user("bia")
+    challenge = make_challenge(ana, rules=ScoringRule(1, 2, 1, 1))
+    records = [
+        {"username": "ANA", "timestamp": f"2025-03-0{day}T10:00:00"} for day in range(2, 7)
+    ] + [
+        {"user_id": bia.id, "timestamp": "2025-03-03T09:00:00-03:00", "challenge_id": challenge.id},
+        {"user_id": ana.id, "timestamp": "2025-03-04T12:00:00Z", "challenge_id": challenge.id},
+        {"username": "ninguem", "timestamp": "2025-03-04T12:00:00"},
+        {"user_id": ana.id},
+    ]
+    report = bulk_import.import_checkins(db, ndjson(records, "{não é json\n"), "ndjson", batch_size=3)
+    assert (report.received, report.imported, report.rejected) == (10, 6, 4)
+    reasons = {error["line"]: error["error"] for error in report.errors}
+    assert reasons[6] == "usuário não participa do desafio (ou não foi aprovado)"
+    assert reasons[8] == "usuário não encontrado"
+
+    assert reasons[9] == "timestamp obrigatório"
+    assert reasons[10] == "linha inválida"
+
+    assert db.query(models.CheckIn).filter(models.CheckIn.user_id == bia.id).count() == 0
+    assert db.query(models.CheckIn).filter(models.CheckIn.challenge_id == challenge.id).count() == 1
+    assert crud.find_points_drift(db) == {"weeks": [], "users": []}
+    assert crud.recalculate_all_challenge_points(db, dry_run=True).diffs == []
+
+def test_csv_import_converts_timezones(db, make_user):
+    ana = make_user("ana")
+    lines = io.StringIO(
+        "user_id,timestamp,duration,description\n"
+        f"{ana.id},2025-03-08T23:30:00-03:00,45,corrida\n"
+    )
+    report = bulk_import.import_checkins(db, lines, "csv")
+    assert report.imported == 1
+    checkin = db.query(models.CheckIn).one()
+    # 23:30 de sábado em -03:00 já é domingo em UTC: conta na semana seguinte
+    assert checkin.timestamp.replace(tzinfo=None) == datetime(2025, 3, 9, 2, 30)
+    assert checkin.duration == 45
+    week = db.query(models.WeeklyPoints).one()
+    assert week.week_start == datetime(2025, 3, 9)
+
+def test_import_route_requires_admin(client, make_user):
+    ana, root = make_user("ana"), make_user("root", is_admin=True)
+    files = {"file": ("checkins.ndjson", f'{{"user_id": {ana.id}, "timestamp": "2025-03-02T10:00:00"}}\n')}
+    assert client.post("/admin/import/checkins", files=files, headers=auth_headers(ana)).status_code == 403
+    response = client.post("/admin/import/checkins", files=files, headers=auth_headers(root))
+    assert response.status_code == 200
+    assert response.json()["imported"] == 1
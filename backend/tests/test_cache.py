@@ -0,0 +1,85 @@
+# backend/tests/test_cache.py
+"""Cache de respostas com invalidação por tag e respostas condicionais (ETag) das leituras."""
+from app import cache
+from app.config import MIN_TRAINING_DAYS
+from conftest import auth_headers
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        def fail(*args):
+            raise ConnectionError("redis fora do ar")
+        return fail
+
+def test_invalidating_a_tag_drops_only_its_entries():
+    response_cache = cache.ResponseCache(redis_url="")
+    calls = []
+
+    def build(value):
+        calls.append(value)
+        return {"value": value}
+
+    assert response_cache.get_or_set("a", ["t1"], lambda: build("a")) == {"value": "a"}
+    assert response_cache.get_or_set("b", ["t2"], lambda: build("b")) == {"value": "b"}
+    assert response_cache.get_or_set("a", ["t1"], lambda: build("a2")) == {"value": "a"}
+
+    response_cache.invalidate("t1")
+    assert response_cache.get_or_set("a", ["t1"], lambda: build("a3")) == {"value": "a3"}
+    assert response_cache.get_or_set("b", ["t2"], lambda: build("b2")) == {"value": "b"}
+    assert calls == ["a", "b", "a3"]
+
+def test_redis_failure_falls_back_to_memory():
+    response_cache = cache.ResponseCache(redis_url="")
+    response_cache.redis = BrokenRedis()
+    assert response_cache.get_or_set("a", ["t1"], lambda: 1) == 1
+    assert response_cache._redis_down_until > 0
+    assert response_cache.get_or_set("a", ["t1"], lambda: 2) == 1
+
+def test_ttl_cache_expires_and_evicts():
+    ttl_cache = cache.TTLCache(maxsize=2, ttl=60)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert (ttl_cache.get("a"), ttl_cache.get("b"), ttl_cache.get("c")) == (1, None, 3)
+    ttl_cache.set("d", 4, ttl=-1)
+    assert ttl_cache.get("d") is None
+
+def test_rankings_follow_checkins(client, make_user):
+    ana = make_user("ana")
+    weekly = client.get("/ranking/weekly")
+    ranking = client.get("/ranking/")
+    assert weekly.json()["podium"] == []
+    assert ranking.json()[0]["points"] == 0
+
+    # Sem escrita: 304 pelo ETag, e o cache responde igual
+    assert client.get("/ranking/weekly", headers={"If-None-Match": weekly.headers["ETag"]}).status_code == 304
+    assert client.get("/ranking/").json() == ranking.json()
+
+    for _ in range(MIN_TRAINING_DAYS):
+        assert client.post("/checkin/", json={"user_id": ana.id}, headers=auth_headers(ana)).status_code == 200
+
+    after = client.get("/ranking/weekly", headers={"If-None-Match": weekly.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != weekly.headers["ETag"]
+    assert [(row["username"], row["weekly_score"], row["rank"]) for row in after.json()["podium"]] == [
+        ("ana", MIN_TRAINING_DAYS, 1)
+    ]
+    assert client.get("/ranking/").json()[0]["points"] == 10
+    assert client.get("/ranking/overall").json()["overall"][0]["points"] == 10
+
+def test_participants_follow_approvals(client, db, make_user, make_challenge):
+    ana, bia = make_user("ana"), make_user("bia")
+    challenge = make_challenge(ana)
+    url = f"/challenges/{challenge.id}/participants"
+    assert [p["user"]["username"] for p in client.get(url).json()] == ["ana"]
+
+    participant = client.post(f"/challenges/{challenge.id}/join", headers=auth_headers(bia)).json()
+    approve = client.post(
+        f"/challenges/{challenge.id}/approve", json={"participant_id": participant["id"]}, headers=auth_headers(ana)
+    )
+    assert approve.status_code == 200
+    assert [p["user"]["username"] for p in client.get(url).json()] == ["ana", "bia"]
+
+    # Troca de username aparece nas listas já cacheadas
+    assert client.put("/users/me", params={"username": "beatriz"}, headers=auth_headers(bia)).status_code == 200
+    assert [p["user"]["username"] for p in client.get(url).json()] == ["ana", "beatriz"]
@@ -0,0 +1,116 @@
+# backend/tests/test_challenges.py
+"""Feed de atividade, ranking e notificações dos desafios."""
+from datetime import datetime, timedelta
+
+from app import models, notifications
+from conftest import auth_headers
+
+def challenge_checkin(client, challenge, user, timestamp=None):
+    payload = {"user_id": user.id}
+    if timestamp is not None:
+        payload["timestamp"] = timestamp.isoformat()
+    response = client.post(f"/challenges/{challenge.id}/checkin", json=payload, headers=auth_headers(user))
+    assert response.status_code == 200
+    return response.json()
+
+def test_activity_feed_pages_with_usernames(client, make_user, make_challenge):
+    ana, bia = make_user("ana"), make_user("bia")
+    challenge = make_challenge(ana, [bia])
+    base = datetime(2025, 3, 2, 7)
+    created = [
+        challenge_checkin(client, challenge, user, base + timedelta(hours=i))
+        for i, user in enumerate([ana, bia, ana, bia, ana])
+    ]
+
+    items = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/challenges/{challenge.id}/activity", params=params, headers=auth_headers(bia)).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert [item["id"] for item in items] == [checkin["id"] for checkin in reversed(created)]
+    assert [item["username"] for item in items] == ["ana", "bia", "ana", "bia", "ana"]
+
+def test_ranking_by_period(client, make_user, make_challenge):
+    ana, bia, caio = make_user("ana"), make_user("bia"), make_user("caio")
+    challenge = make_challenge(ana, [bia, caio])
+    now = datetime.utcnow()
+    for _ in range(2):
+        challenge_checkin(client, challenge, bia)
+    challenge_checkin(client, challenge, ana)
+    # Fora da semana atual: só conta no ranking geral
+    for days in (8, 9, 10):
+        challenge_checkin(client, challenge, ana, now - timedelta(days=days))
+
+    def ranking(**params):
+        body = client.get(f"/challenges/{challenge.id}/ranking", params=params, headers=auth_headers(caio)).json()
+        return [(row["username"], row["weekly_score"], row["rank"]) for row in body["podium"] + body["others"]]
+
+    assert ranking() == [("bia", 2, 1), ("ana", 1, 2), ("caio", 0, 3)]
+    assert ranking(period="overall") == [("ana", 4, 1), ("bia", 2, 2), ("caio", 0, 3)]
+    start = (now - timedelta(days=11)).isoformat()
+    end = (now - timedelta(days=7)).isoformat()
+    assert ranking(start=start, end=end) == [("ana", 3, 1), ("bia", 0, 2), ("caio", 0, 2)]
+    assert client.get(f"/challenges/{challenge.id}/ranking", params={"period": "x"},
+                      headers=auth_headers(caio)).status_code == 400
+
+def test_checkin_notifies_the_other_participants(client, db, make_user, make_challenge):
+    ana, bia, caio = make_user("ana"), make_user("bia"), make_user("caio")
+    challenge = make_challenge(ana, [bia])
+    # caio entrou, mas não foi aprovado
+    db.add(models.ChallengeParticipant(challenge_id=challenge.id, user_id=caio.id, approved=False))
+    db.commit()
+
+    count = client.get("/notifications/unread-count", headers=auth_headers(bia))
+    assert count.json() == {"unread_count": 0}
+    challenge_checkin(client, challenge, ana)
+    notifications.local_queue.join()
+
+    inbox = {
+        user.username: [(n.type, n.related_user_id) for n in db.query(models.Notification).filter_by(user_id=user.id)]
+        for user in (ana, bia, caio)
+    }
+    assert inbox == {"ana": [], "bia": [("checkin", ana.id)], "caio": []}
+    stale = client.get("/notifications/unread-count", headers={
+        **auth_headers(bia), "If-None-Match": count.headers["ETag"]
+    })
+    assert stale.status_code == 200
+    assert stale.json() == {"unread_count": 1}
+
+    assert client.put("/notifications/read-all", headers=auth_headers(bia)).json() == {"updated": 1}
+    assert client.get("/notifications/unread-count", headers=auth_headers(bia)).json() == {"unread_count": 0}
+
+def test_prune_removes_only_old_read_notifications(db, make_user):
+    ana = make_user("ana")
+    old = datetime.utcnow() - timedelta(days=notifications.NOTIFICATION_RETENTION_DAYS + 1)
+    db.add_all([
+        models.Notification(user_id=ana.id, type="invite", message="velha lida", read=True, created_at=old),
+        models.Notification(user_id=ana.id, type="invite", message="velha não lida", read=False, created_at=old),
+        models.Notification(user_id=ana.id, type="invite", message="nova lida", read=True),
+    ])
+    db.commit()
+    assert notifications.prune_read_notifications(db, batch_size=1) == 1
+    assert sorted(n.message for n in db.query(models.Notification)) == ["nova lida", "velha não lida"]
+
+def test_new_rules_rescore_participants(client, db, make_user, make_challenge):
+    ana, bia = make_user("ana"), make_user("bia")
+    challenge = make_challenge(ana, [bia])
+    week = datetime(2025, 3, 2)
+    for day in range(3):
+        challenge_checkin(client, challenge, bia, week + timedelta(days=day))
+    url = f"/challenges/{challenge.id}/participants"
+    before = client.get(url)
+
+    rules = {"min_threshold": 2, "min_points": 5, "additional_unit": 1, "additional_points": 2}
+    response = client.post(f"/challenges/{challenge.id}/rules", json=rules, headers=auth_headers(ana))
+    assert response.status_code == 200
+
+    db.expire_all()
+    period = db.query(models.ChallengePoints).filter_by(challenge_id=challenge.id, user_id=bia.id).one()
+    assert (period.checkin_count, period.points) == (3, 7)
+    participant = db.query(models.ChallengeParticipant).filter_by(challenge_id=challenge.id, user_id=bia.id).one()
+    assert (participant.progress, participant.challenge_points) == (3, 7)
+    assert client.get(url, headers={"If-None-Match": before.headers["ETag"]}).status_code == 200
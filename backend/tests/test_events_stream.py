@@ -0,0 +1,83 @@
+# backend/tests/test_events_stream.py
+"""Streams SSE abertos não podem segurar conexões do pool do banco.
+
+Sobe a API em um uvicorn de verdade, abre mais streams do que o pool comporta e
+confirma que uma rota comum continua respondendo.
+"""
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+from app import auth, database, events, models, routes
+
+POOL_SIZE = 2
+STREAMS = POOL_SIZE + 3
+
+@pytest.fixture
+def engine(database_url):
+    # Pool pequeno e sem overflow: um stream que segurasse a conexão esgotaria o pool
+    engine = database.create_db_engine(database_url, pool_size=POOL_SIZE, max_overflow=0, pool_timeout=2)
+    models.Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def server(engine, make_user, monkeypatch):
+    monkeypatch.setattr(events, "EVENTS_HEARTBEAT_SECONDS", 0.2)
+    make_user("streamer")
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    uvicorn_server = uvicorn.Server(config)
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not uvicorn_server.started:
+        assert time.monotonic() < deadline, "uvicorn não subiu"
+        time.sleep(0.05)
+    port = uvicorn_server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}", engine
+    uvicorn_server.should_exit = True
+    thread.join(timeout=10)
+
+def test_open_streams_do_not_hold_pool_connections(server):
+    base_url, engine = server
+    token = auth.create_access_token(data={"sub": "streamer"})
+    with httpx.Client(base_url=base_url, timeout=10) as client:
+        streams = []
+        try:
+            for _ in range(STREAMS):
+                stream = client.stream("GET", "/events/stream", params={"token": token})
+                response = stream.__enter__()
+                streams.append(stream)
+                assert response.status_code == 200
+                # Primeira linha do stream: o handler já rodou e devolveu a resposta
+                assert next(response.iter_lines()).startswith("retry:")
+
+            assert engine.pool.checkedout() == 0
+            response = client.get("/ranking/", timeout=5)
+            assert response.status_code == 200
+        finally:
+            for stream in streams:
+                stream.__exit__(None, None, None)
+
+def test_redis_publish_falls_back_and_backs_off(monkeypatch):
+    # Porta fechada: a conexão falha na hora em vez de segurar a escrita
+    broker = events.RedisBroker("redis://127.0.0.1:1/0")
+    delivered, attempts = [], []
+    monkeypatch.setattr(broker, "dispatch", lambda topic, message: delivered.append(topic))
+    publish = broker._redis.publish
+    monkeypatch.setattr(broker._redis, "publish", lambda *args: attempts.append(args) or publish(*args))
+
+    started = time.monotonic()
+    broker.publish("user:1", "{}")
+    broker.publish("user:2", "{}")
+    assert time.monotonic() - started < events.REDIS_RETRY_SECONDS
+    # Só a primeira tentativa vai ao Redis; as duas são entregues neste processo
+    assert len(attempts) == 1
+    assert delivered == ["user:1", "user:2"]
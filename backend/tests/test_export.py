@@ -0,0 +1,72 @@
+# backend/tests/test_export.py
+"""Exportação em streaming (NDJSON/CSV) de check-ins e pontos semanais."""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import crud, export, schemas
+from conftest import auth_headers
+
+WEEK = datetime(2025, 3, 2)  # domingo
+
+def test_export_is_streamed_in_batches(session_factory, db, make_user):
+    ana = make_user("ana")
+    for day in range(5):
+        crud.create_checkin(db, schemas.CheckInCreate(user_id=ana.id, timestamp=WEEK + timedelta(days=day)))
+    chunks = list(export.iter_export(session_factory, export.checkins_statement(user_id=ana.id), "csv", batch_size=2))
+    # Cabeçalho + três lotes (2, 2, 1)
+    assert [chunk.count("\n") for chunk in chunks] == [1, 2, 2, 1]
+
+def test_user_export_ndjson_and_csv(client, db, make_user):
+    ana = make_user("ana")
+    for day in range(5):
+        crud.create_checkin(db, schemas.CheckInCreate(user_id=ana.id, timestamp=WEEK + timedelta(days=day)))
+
+    response = client.get(f"/users/{ana.id}/export", headers=auth_headers(ana))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="user_' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["timestamp"][:10] for row in rows] == [f"2025-03-0{day}" for day in range(2, 7)]
+
+    response = client.get(
+        f"/users/{ana.id}/export", params={"format": "csv", "dataset": "weekly_points"}, headers=auth_headers(ana)
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["week_start"], row["checkin_count"], row["points"]) for row in rows] == [
+        ("2025-03-02T00:00:00", "5", "16")
+    ]
+
+def test_export_permissions_and_validation(client, make_user, make_challenge):
+    ana, bia, root = make_user("ana"), make_user("bia"), make_user("root", is_admin=True)
+    challenge = make_challenge(ana)
+    assert client.get(f"/users/{ana.id}/export", headers=auth_headers(bia)).status_code == 403
+    assert client.get(f"/users/{ana.id}/export", headers=auth_headers(root)).status_code == 200
+    assert client.get(f"/users/{ana.id}/export", params={"format": "xml"}, headers=auth_headers(ana)).status_code == 400
+    assert client.get(f"/users/{ana.id}/export", params={"dataset": "x"}, headers=auth_headers(ana)).status_code == 400
+    assert client.get(f"/challenges/{challenge.id}/export", headers=auth_headers(bia)).status_code == 403
+    assert client.get(f"/challenges/{challenge.id}/export", headers=auth_headers(ana)).status_code == 200
+    assert client.get("/admin/export", headers=auth_headers(ana)).status_code == 403
+    assert client.get("/admin/export", headers=auth_headers(root)).status_code == 200
+
+def test_export_holds_a_single_pool_connection(client, engine, db, make_user, make_challenge):
+    ana = make_user("ana", is_admin=True)
+    challenge = make_challenge(ana)
+    crud.create_checkin(db, schemas.CheckInCreate(user_id=ana.id, timestamp=WEEK))
+    urls = [f"/users/{ana.id}/export", f"/challenges/{challenge.id}/export", "/admin/export"]
+    headers = auth_headers(ana)
+    db.rollback()
+    checked_out = []
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(*args):
+        checked_out.append(engine.pool.checkedout())
+
+    # Só o gerador fica com conexão durante o stream; a autenticação já devolveu a sua
+    for url in urls:
+        checked_out.clear()
+        assert client.get(url, headers=headers).status_code == 200
+        assert checked_out and max(checked_out) == 1, url
@@ -0,0 +1,88 @@
+# backend/tests/test_metrics.py
+"""Instrumentação das requisições (LoggingMiddleware) e o endpoint /metrics."""
+import logging
+import time
+
+import pytest
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import database, metrics
+from app.logger_middleware import LoggingMiddleware
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+@pytest.fixture
+def instrumented(app, registry):
+    app.add_middleware(LoggingMiddleware)
+    return app
+
+def series(registry, name: str):
+    return [line for line in registry.render().splitlines() if line.startswith(name)]
+
+def test_requests_are_recorded_by_route_template(instrumented, registry, make_user, make_challenge):
+    ana = make_user("ana")
+    challenge = make_challenge(ana)
+    with TestClient(instrumented) as client:
+        client.get("/ranking/")
+        client.get(f"/challenges/{challenge.id}/participants")
+        client.get("/nao-existe")
+
+    counts = series(registry, "http_request_duration_seconds_count")
+    assert 'http_request_duration_seconds_count{method="GET",route="/ranking/",status="200"} 1' in counts
+    assert ('http_request_duration_seconds_count{method="GET",route="/challenges/{challenge_id}/participants",'
+            'status="200"} 1') in counts
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in counts
+    # As consultas SQL da requisição entram no histograma da rota
+    query_sums = series(registry, 'http_request_db_queries_sum{method="GET",route="/ranking/"}')
+    assert query_sums and float(query_sums[0].split()[-1]) >= 2
+
+def test_slow_requests_are_counted_and_logged(app, registry, caplog):
+    app.add_middleware(LoggingMiddleware, slow_request_seconds=0)
+    with TestClient(app) as client, caplog.at_level(logging.WARNING, logger="debug.middleware"):
+        client.get("/ranking/")
+    assert series(registry, "http_slow_requests_total") == [
+        'http_slow_requests_total{method="GET",route="/ranking/"} 1'
+    ]
+    assert any("Slow request: GET /ranking/" in record.message for record in caplog.records)
+
+def test_streaming_responses_are_timed_to_the_first_chunk(app, registry, caplog):
+    def chunks():
+        yield "primeiro\n"
+        time.sleep(0.3)
+        yield "segundo\n"
+
+    app.add_api_route("/stream", lambda: StreamingResponse(chunks(), media_type="text/plain"))
+    app.add_middleware(LoggingMiddleware, slow_request_seconds=0.2)
+    with TestClient(app) as client, caplog.at_level(logging.WARNING, logger="debug.middleware"):
+        assert client.get("/stream").text == "primeiro\nsegundo\n"
+
+    total = series(registry, 'http_request_duration_seconds_sum{method="GET",route="/stream"')
+    assert total and float(total[0].split()[-1]) < 0.2
+    assert series(registry, "http_slow_requests_total") == []
+    assert not any("Slow request" in record.message for record in caplog.records)
+
+def test_metrics_needs_the_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "segredo")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer outro"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer segredo"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+
+def test_metrics_without_token_is_hidden_outside_tests(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 200
+    monkeypatch.setattr(database, "APP_ENV", "production")
+    assert client.get("/metrics").status_code == 404
+
+def test_metrics_scrape_is_not_recorded_behind_root_path(instrumented, registry):
+    with TestClient(instrumented, root_path="/api") as client:
+        assert client.get("/api/metrics").status_code == 200
+        client.get("/api/ranking/")
+    routes = {line.split('route="')[1].split('"')[0] for line in series(registry, "http_request_duration_seconds_count")}
+    assert routes == {"/ranking/"}
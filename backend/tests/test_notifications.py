@@ -0,0 +1,60 @@
+# backend/tests/test_notifications.py
+"""Caixa de entrada paginada por cursor e eventos das notificações."""
+from app import events, models, notifications, routes
+from conftest import auth_headers
+
+def inbox_pages(client, user, limit, **params):
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, limit=limit, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/notifications/", params=query, headers=auth_headers(user))
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+        assert len(pages) <= 10, "a paginação não avança"
+
+def test_inbox_pages_through_same_second_notifications(client, db, make_user):
+    ana, bia = make_user("ana"), make_user("bia")
+    # fan_out grava tudo no mesmo segundo (e em um único INSERT por chamada)
+    for i in range(7):
+        notifications.fan_out(db, [ana.id, bia.id], f"mensagem {i}", "checkin", related_user_id=bia.id)
+    db.commit()
+
+    pages = inbox_pages(client, ana, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    ids = [notification_id for page in pages for notification_id in page]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 7
+
+def test_unread_only_pages(client, db, make_user):
+    ana = make_user("ana")
+    for i in range(5):
+        notifications.fan_out(db, [ana.id], f"mensagem {i}", "checkin")
+    db.commit()
+    first = inbox_pages(client, ana, limit=2)[0]
+    client.put(f"/notifications/{first[0]}/read", headers=auth_headers(ana))
+
+    pages = inbox_pages(client, ana, limit=2, unread_only=True)
+    ids = [notification_id for page in pages for notification_id in page]
+    assert len(ids) == 4
+    assert first[0] not in ids
+
+def test_fan_out_events_match_create_notification(db, make_user, make_challenge, monkeypatch):
+    ana, bia, caio = make_user("ana"), make_user("bia"), make_user("caio")
+    challenge = make_challenge(ana, [bia, caio])
+    published = []
+    monkeypatch.setattr(events, "publish", lambda topic, event_type, data: published.append((topic, data)))
+
+    single = routes.create_notification(db, ana.id, "oi", "invite")
+    assert notifications.notify_challenge_checkin(db, challenge.id, ana.id, "treinou") == 2
+
+    (_, expected), *fanned = published
+    assert expected["id"] == single.id
+    assert [topic for topic, _ in fanned] == [events.user_topic(bia.id), events.user_topic(caio.id)]
+    for _, data in fanned:
+        assert data.keys() == expected.keys()
+        stored = db.get(models.Notification, data["id"])
+        assert (stored.user_id, stored.read, stored.created_at) == (data["user_id"], False, data["created_at"])
@@ -0,0 +1,91 @@
+# backend/tests/test_pagination.py
+"""Paginação por cursor e respostas condicionais do histórico de check-ins."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models, pagination
+from conftest import auth_headers
+
+def add_checkins(db, user, timestamps):
+    checkins = [models.CheckIn(user_id=user.id, timestamp=timestamp) for timestamp in timestamps]
+    db.add_all(checkins)
+    db.commit()
+    return [checkin.id for checkin in checkins]
+
+def fetch_all(client, url, limit, **params):
+    """Segue o X-Next-Cursor até o fim; devolve as páginas (ids) na ordem recebida."""
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, limit=limit)
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get(url, params=query)
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+        assert len(pages) <= 50, "a paginação não avança"
+
+def test_cursor_round_trip():
+    timestamp = datetime(2025, 3, 2, 10, 30, 15, 123456)
+    assert pagination.decode_cursor(pagination.encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm9waXBl", ""])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(cursor)
+
+def test_history_pages_cover_every_checkin_once(client, db, make_user):
+    user = make_user("ana")
+    base = datetime(2025, 3, 2, 8)
+    # Empates de timestamp (mesmo segundo) são desempatados pelo id
+    timestamps = [base + timedelta(hours=i // 3) for i in range(11)]
+    ids = add_checkins(db, user, timestamps)
+
+    pages = fetch_all(client, f"/users/{user.id}/checkins/", limit=4)
+    assert [len(page) for page in pages] == [4, 4, 3]
+    expected = [checkin_id for _, checkin_id in sorted(zip(timestamps, ids), reverse=True)]
+    assert [checkin_id for page in pages for checkin_id in page] == expected
+
+def test_period_pages_are_chronological(client, db, make_user):
+    user = make_user("bia")
+    base = datetime(2025, 3, 2, 8)
+    ids = add_checkins(db, user, [base + timedelta(days=i) for i in range(7)])
+    add_checkins(db, user, [base + timedelta(days=30)])
+
+    pages = fetch_all(
+        client, f"/users/{user.id}/checkins/period/", limit=3,
+        start_date=base.isoformat(), end_date=(base + timedelta(days=6)).isoformat()
+    )
+    assert [checkin_id for page in pages for checkin_id in page] == ids
+
+def test_bad_cursor_returns_400(client, make_user):
+    user = make_user("caio")
+    response = client.get(f"/users/{user.id}/checkins/", params={"cursor": "not-base64!"})
+    assert response.status_code == 400
+
+def test_page_size_is_capped(client, make_user):
+    user = make_user("davi")
+    response = client.get(f"/users/{user.id}/checkins/", params={"limit": pagination.MAX_PAGE_SIZE + 1})
+    assert response.status_code == 422
+
+def test_history_etag_changes_only_after_a_checkin(client, make_user):
+    user = make_user("eva")
+    url = f"/users/{user.id}/checkins/"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    # Outro recurso do mesmo usuário (outra página) tem outro ETag
+    assert client.get(url, params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 200
+
+    response = client.post("/checkin/", json={"user_id": user.id}, headers=auth_headers(user))
+    assert response.status_code == 200
+    after = client.get(url, headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+    assert [item["id"] for item in after.json()] == [response.json()["id"]]
@@ -0,0 +1,137 @@
+# backend/tests/test_points.py
+"""Pontos semanais e de desafios mantidos por deltas batem com os recálculos completos."""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+
+from app import crud, models, schemas
+from app.scoring import ScoringRule
+from conftest import auth_headers
+
+WEEK = datetime(2025, 3, 2)  # domingo
+
+def weekly_rows(db):
+    return sorted(
+        (row.user_id, row.week_start, row.checkin_count, row.points)
+        for row in db.query(models.WeeklyPoints).filter(models.WeeklyPoints.checkin_count > 0)
+    )
+
+def challenge_rows(db):
+    return sorted(
+        (row.challenge_id, row.user_id, row.period_start, row.checkin_count, row.points)
+        for row in db.query(models.ChallengePoints)
+    )
+
+def totals(db):
+    return sorted((user.id, user.points) for user in db.query(models.User))
+
+def checkin(db, user, timestamp):
+    return crud.create_checkin(db, schemas.CheckInCreate(user_id=user.id, timestamp=timestamp))
+
+def test_week_boundaries_run_sunday_to_saturday():
+    start, end = crud.get_week_boundaries(datetime(2025, 3, 5, 18, 30))
+    assert start == WEEK
+    assert end == datetime(2025, 3, 8, 23, 59, 59, 999999)
+    assert crud.get_week_boundaries(WEEK)[0] == WEEK
+
+def test_week_keys_are_naive_utc():
+    # timestamptz lido do Postgres volta com fuso; a chave da semana não
+    aware = datetime(2025, 3, 2, 1, 0, tzinfo=timezone(timedelta(hours=3)))
+    start, end = crud.get_week_boundaries(aware)
+    assert start == WEEK - timedelta(days=7) and start.tzinfo is None and end.tzinfo is None
+
+    class PostgresSession:
+        def get_bind(self):
+            return create_engine("postgresql+psycopg://")
+
+    expr = crud.week_start_expr(PostgresSession(), models.CheckIn.timestamp)
+    assert "timezone(" in str(expr.compile(dialect=postgresql.dialect()))
+    # Colunas sem fuso (week_start, period_start) ficam como estão
+    expr = crud.week_start_expr(PostgresSession(), models.WeeklyPoints.week_start)
+    assert "timezone(" not in str(expr.compile(dialect=postgresql.dialect()))
+
+def test_deltas_match_full_recalculation(db, make_user):
+    ana, bia = make_user("ana"), make_user("bia")
+    created = [checkin(db, ana, WEEK + timedelta(days=day)) for day in range(5)]
+    created += [checkin(db, bia, WEEK + timedelta(days=7 + day)) for day in range(3)]
+    crud.delete_checkin(db, created[0])
+    # Move um check-in da Ana para a semana seguinte
+    crud.update_checkin(db, created[1], schemas.CheckInUpdate(
+        duration=None, description=None, timestamp=WEEK + timedelta(days=8)
+    ))
+
+    assert crud.find_points_drift(db) == {"weeks": [], "users": []}
+    incremental = (weekly_rows(db), totals(db))
+    assert incremental[0] == [
+        (ana.id, WEEK, 3, 10),
+        (ana.id, WEEK + timedelta(days=7), 1, 0),
+        (bia.id, WEEK + timedelta(days=7), 3, 10),
+    ]
+
+    crud.recalculate_all_points(db)
+    assert (weekly_rows(db), totals(db)) == incremental
+
+def test_drift_is_detected_and_repaired(db, make_user):
+    ana = make_user("ana")
+    for day in range(4):
+        checkin(db, ana, WEEK + timedelta(days=day))
+    db.query(models.WeeklyPoints).update({models.WeeklyPoints.checkin_count: 1})
+    db.commit()
+
+    drift = crud.check_points_consistency(db)
+    assert drift["weeks"] == [(ana.id, WEEK)]
+    assert crud.find_points_drift(db) == {"weeks": [], "users": []}
+    assert weekly_rows(db) == [(ana.id, WEEK, 4, 13)]
+
+def test_challenge_checkins_match_recalculation(client, db, make_user, make_challenge):
+    ana, bia = make_user("ana"), make_user("bia")
+    challenge = make_challenge(ana, [bia], rules=ScoringRule(2, 5, 1, 2))
+    for user, days in ((ana, (0, 1, 2, 8)), (bia, (1, 9))):
+        for day in days:
+            response = client.post(
+                f"/challenges/{challenge.id}/checkin",
+                json={"user_id": user.id, "timestamp": (WEEK + timedelta(days=day)).isoformat()},
+                headers=auth_headers(user)
+            )
+            assert response.status_code == 200
+    delete = client.delete(f"/checkins/{response.json()['id']}", headers=auth_headers(bia))
+    assert delete.status_code == 204
+
+    db.expire_all()
+    assert challenge_rows(db) == [
+        (challenge.id, ana.id, WEEK, 3, 7),
+        (challenge.id, ana.id, WEEK + timedelta(days=7), 1, 0),
+        (challenge.id, bia.id, WEEK, 1, 0),
+    ]
+    participants = {p.user_id: (p.progress, p.challenge_points) for p in db.query(models.ChallengeParticipant)}
+    assert participants == {ana.id: (4, 9), bia.id: (1, 0)}
+    # Check-ins de desafio também contam no ranking geral
+    assert crud.find_points_drift(db) == {"weeks": [], "users": []}
+
+    report = crud.recalculate_all_challenge_points(db, dry_run=True)
+    assert report.diffs == []
+
+def test_challenge_recalculation_repairs_and_reports(db, make_user, make_challenge):
+    ana = make_user("ana")
+    challenges = [make_challenge(ana, title=f"Desafio {i}") for i in range(5)]
+    for challenge in challenges:
+        db.add_all([
+            models.CheckIn(user_id=ana.id, challenge_id=challenge.id, timestamp=WEEK + timedelta(days=day))
+            for day in range(challenge.id)
+        ])
+    db.commit()
+
+    dry_run = crud.recalculate_all_challenge_points(db, dry_run=True, chunk_size=2)
+    assert dry_run.chunks == 3
+    assert dry_run.periods_inserted == 5
+    assert challenge_rows(db) == []
+
+    report = crud.recalculate_all_challenge_points(db, chunk_size=2)
+    assert report.as_dict()["periods_inserted"] == 5
+    assert [row[3] for row in challenge_rows(db)] == [1, 2, 3, 4, 5]
+    progress = sorted(p.progress for p in db.query(models.ChallengeParticipant))
+    assert progress == [1, 2, 3, 4, 5]
+
+    # Rodar de novo não muda nada
+    assert crud.recalculate_all_challenge_points(db, chunk_size=2).diffs == []
@@ -0,0 +1,49 @@
+# backend/tests/test_scoring.py
+"""Regras de pontuação por período (scoring.py)."""
+import pytest
+
+from app import scoring
+from app.config import MIN_TRAINING_DAYS
+from app.scoring import ScoringRule
+
+@pytest.mark.parametrize("count, expected", [
+    (0, 0),
+    (None, 0),
+    (MIN_TRAINING_DAYS - 1, 0),
+    (MIN_TRAINING_DAYS, 10),
+    (MIN_TRAINING_DAYS + 1, 13),
+    (MIN_TRAINING_DAYS + 3, 19),
+])
+def test_weekly_rule(count, expected):
+    assert scoring.score(count) == expected
+
+def test_additional_unit_groups_extra_checkins():
+    rule = ScoringRule(2, 5, 2, 4)
+    assert [scoring.score(count, rule) for count in range(7)] == [0, 0, 5, 5, 9, 9, 13]
+
+def test_non_positive_unit_only_scores_the_minimum():
+    rule = ScoringRule(1, 7, 0, 100)
+    assert [scoring.score(count, rule) for count in range(4)] == [0, 7, 7, 7]
+
+def test_rule_for_falls_back_to_the_weekly_rule():
+    assert scoring.rule_for(None) == scoring.WEEKLY_RULE
+
+@pytest.mark.parametrize("size", [5, scoring.NUMPY_MIN_SIZE * 3])
+def test_score_many_matches_score(size):
+    counts = [i % 9 for i in range(size)]
+    rule = ScoringRule(3, 10, 2, 4)
+    assert scoring.score_many(counts, rule) == [scoring.score(count, rule) for count in counts]
+
+def test_score_many_accepts_one_rule_per_row():
+    rules = [ScoringRule(1, 2, 1, 1), ScoringRule(4, 15, 1, 5), ScoringRule(2, 5, 2, 4)]
+    counts = [3, 5, 6]
+    params = dict(zip(ScoringRule._fields, (list(column) for column in zip(*rules))))
+    assert scoring.score_many(counts, **params) == [
+        scoring.score(count, rule) for count, rule in zip(counts, rules)
+    ]
+
+@pytest.mark.skipif(scoring.np is None, reason="NumPy não instalado")
+def test_vectorized_matches_python_loop():
+    counts = [i % 11 for i in range(1000)]
+    params = (3, 10, 2, 4)
+    assert scoring.score_array(counts, *params).tolist() == scoring.score_python(counts, *params)
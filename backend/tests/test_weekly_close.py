@@ -0,0 +1,51 @@
+# backend/tests/test_weekly_close.py
+"""Fechamento semanal idempotente (crud.close_weeks)."""
+from datetime import datetime, timedelta
+
+from app import crud, models, schemas
+from app.config import MIN_TRAINING_DAYS
+
+WEEK = datetime(2025, 3, 2)  # domingo
+
+def add_week(db, user, week_start, count):
+    for day in range(count):
+        crud.create_checkin(db, schemas.CheckInCreate(user_id=user.id, timestamp=week_start + timedelta(days=day)))
+
+def weeks_won(db):
+    return {user.username: user.weeks_won for user in db.query(models.User)}
+
+def test_close_weeks_counts_each_week_once(db, make_user):
+    ana, bia, caio = make_user("ana"), make_user("bia"), make_user("caio")
+    add_week(db, ana, WEEK, MIN_TRAINING_DAYS + 1)
+    add_week(db, bia, WEEK, MIN_TRAINING_DAYS)
+    # Empate na segunda semana: os dois vencem
+    add_week(db, ana, WEEK + timedelta(days=7), MIN_TRAINING_DAYS)
+    add_week(db, bia, WEEK + timedelta(days=7), MIN_TRAINING_DAYS)
+    # Abaixo do mínimo ninguém vence
+    add_week(db, caio, WEEK + timedelta(days=14), MIN_TRAINING_DAYS - 1)
+
+    now = WEEK + timedelta(days=22)
+    assert crud.close_weeks(db, now=now) == [WEEK, WEEK + timedelta(days=7), WEEK + timedelta(days=14)]
+    assert weeks_won(db) == {"ana": 2, "bia": 1, "caio": 0}
+
+    # Segunda execução (ou concorrente) não conta de novo
+    assert crud.close_weeks(db, now=now) == []
+    assert weeks_won(db) == {"ana": 2, "bia": 1, "caio": 0}
+
+def test_current_week_stays_open(db, make_user):
+    ana = make_user("ana")
+    add_week(db, ana, WEEK, MIN_TRAINING_DAYS)
+    assert crud.close_weeks(db, now=WEEK + timedelta(days=3)) == []
+    assert db.query(models.WeeklyUpdate).count() == 0
+
+def test_rebuild_follows_edits_to_closed_weeks(db, make_user):
+    ana, bia = make_user("ana"), make_user("bia")
+    add_week(db, ana, WEEK, MIN_TRAINING_DAYS + 1)
+    add_week(db, bia, WEEK, MIN_TRAINING_DAYS)
+    crud.close_weeks(db, now=WEEK + timedelta(days=8))
+    assert weeks_won(db) == {"ana": 1, "bia": 0}
+
+    # Um check-in da Ana some e a semana fechada vira empate
+    crud.delete_checkin(db, db.query(models.CheckIn).filter(models.CheckIn.user_id == ana.id).first())
+    crud.recalculate_all_points(db)
+    assert weeks_won(db) == {"ana": 1, "bia": 1}
@@ -0,0 +1,82 @@
+# backend/tests/test_weekly_leaderboard.py
+"""O ranking semanal mantido pelos deltas do check-in bate com a reconstrução completa."""
+import random
+import threading
+from datetime import datetime, timedelta
+
+from app import crud, models, schemas
+
+USERS = 12
+
+def snapshot(db):
+    return sorted(
+        (row.week_start, row.user_id, row.rank, row.weekly_score, row.username)
+        for row in db.query(models.WeeklyLeaderboard)
+    )
+
+def test_incremental_leaderboard_matches_rebuild(db, make_user):
+    rng = random.Random(7)
+    weeks = [crud.get_week_boundaries(datetime(2025, 3, 2) + timedelta(weeks=i))[0] for i in range(3)]
+    users = [make_user(f"user{i}") for i in range(1, USERS + 1)]
+
+    for _ in range(400):
+        user = rng.choice(users)
+        timestamp = rng.choice(weeks) + timedelta(hours=rng.randint(0, 24 * 7 - 1))
+        # Mais inclusões que remoções, com remoções também em semanas zeradas
+        crud.update_weekly_points(db, user.id, timestamp, rng.choice((1, 1, 1, -1)))
+        db.commit()
+
+    incremental = snapshot(db)
+    assert incremental
+    assert len({(week, user_id) for week, user_id, *_ in incremental}) == len(incremental)
+
+    crud.refresh_weekly_leaderboard(db, since=weeks[0])
+    db.commit()
+    assert snapshot(db) == incremental
+
+def test_removal_from_missing_week_is_skipped(db, make_user):
+    ana = make_user("ana")
+    crud.update_weekly_points(db, ana.id, datetime(2025, 3, 4), -1)
+    db.commit()
+    assert db.query(models.WeeklyPoints).count() == 0
+    assert snapshot(db) == []
+
+def test_concurrent_checkins_are_not_lost(session_factory, make_user):
+    users = [make_user(f"user{i}") for i in range(3)]
+    week = datetime(2025, 3, 2)
+    errors = []
+
+    def writer(user):
+        try:
+            for day in range(10):
+                with session_factory() as session:
+                    crud.update_weekly_points(session, user.id, week + timedelta(days=day % 7), +1)
+                    session.commit()
+        except Exception as e:
+            errors.append(e)
+
+    # Duas threads por usuário: a mesma linha de WeeklyPoints disputada
+    threads = [threading.Thread(target=writer, args=(user,)) for user in users * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    with session_factory() as session:
+        counts = dict(session.query(models.WeeklyPoints.user_id, models.WeeklyPoints.checkin_count))
+        assert counts == {user.id: 20 for user in users}
+        assert crud.find_leaderboard_drift(session, week) == []
+
+def test_consistency_check_repairs_current_week_ranks(db, make_user):
+    ana, bia = make_user("ana"), make_user("bia")
+    now = datetime.utcnow()
+    for user, count in ((ana, 2), (bia, 1)):
+        for _ in range(count):
+            crud.create_checkin(db, schemas.CheckInCreate(user_id=user.id, timestamp=now))
+    db.query(models.WeeklyLeaderboard).filter_by(user_id=bia.id).update({models.WeeklyLeaderboard.rank: 1})
+    db.commit()
+
+    assert crud.check_points_consistency(db)["leaderboard"] == [bia.id]
+    assert [(row[1], row[2]) for row in snapshot(db)] == [(ana.id, 1), (bia.id, 2)]
+    assert crud.check_points_consistency(db)["leaderboard"] == []
@@ -42,12 +42,8 @@ const RecentActivityFeed = ({ challengeId, user }) => {
           const data = await res.json();
           console.log("Atividades recebidas:", data);
           
-          // CORREÇÃO: Filtrar apenas as atividades deste desafio específico
-          const filteredActivities = data.filter(activity => 
-            activity.challenge_id === parseInt(challengeId)
-          );
-          
-          setActivities(filteredActivities);
+          // O backend já retorna apenas os check-ins deste desafio (paginado por cursor)
+          setActivities(data.items);
         } else {
           console.error("Erro ao buscar atividades:", await res.text());
           setError("Erro ao carregar atividades");